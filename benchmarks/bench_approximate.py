@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+'''
+compare exact evaluation of a thin plate spline over the pixels of a
+tile with evaluation of its approximation by interpolation on lattices
+of different spacings, reporting the build time and the maximum error
+
+usage: PYTHONPATH=. python benchmarks/bench_approximate.py
+           [--size 4096] [--landmarks 1000] [--spacings 128 64 32]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def smooth_tps(num_landmarks, size, seed=0):
+    rng = np.random.RandomState(seed)
+    src = rng.uniform(0, size, size=(num_landmarks, 2))
+    # a smooth warp of a few pixels, as from a montage solve
+    k = 2 * np.pi / size
+    dst = src + 3. * np.column_stack([np.sin(k * src[:, 1]),
+                                      np.cos(k * src[:, 0])])
+    tf = renderapi.transform.ThinPlateSplineTransform()
+    tf.estimate(src, dst)
+    return tf
+
+
+def timed(f):
+    start = default_timer()
+    result = f()
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=4096)
+    parser.add_argument('--landmarks', type=int, default=1000)
+    parser.add_argument('--spacings', type=float, nargs='+',
+                        default=[128, 64, 32])
+    args = parser.parse_args()
+
+    tf = smooth_tps(args.landmarks, args.size)
+    yx = np.indices((args.size, args.size), dtype=float).reshape(2, -1)
+    pixels = np.ascontiguousarray(yx[::-1].T)
+    out = np.empty_like(pixels)
+    print('{0}x{0} pixels, {1} landmarks'.format(args.size, args.landmarks))
+    expected, t = timed(lambda: tf.tform(pixels))
+    print('  exact                          {:8.3f} s'.format(t))
+    for order in [1, 3]:
+        for spacing in args.spacings:
+            approx, t_build = timed(lambda: tf.approximate(
+                (0, 0, args.size - 1, args.size - 1), spacing=spacing,
+                order=order))
+            _, t = timed(lambda: approx.tform(pixels, out=out))
+            error = np.sqrt(((out - expected) ** 2).sum(axis=1)).max()
+            print('  order {} spacing {:4.0f}  build {:6.3f} s'
+                  '  tform {:6.3f} s  max_error {:.1e}  actual {:.1e}'.format(
+                      order, spacing, t_build, t, approx.max_error, error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+'''
+compare the time to compute transformed tile boundaries one tile at
+a time with TileSpec.bbox_transformed and for all tiles at once with
+renderapi.tilespec.bbox_transformed_batch, for tiles with a shared
+reference lens correction followed by a per-tile affine
+
+usage: PYTHONPATH=. python benchmarks/bench_bbox_transformed.py [--tiles N]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def make_tiles(num_tiles, seed=0):
+    rng = np.random.RandomState(seed)
+    lens = renderapi.transform.Polynomial2DTransform(
+        params=np.array([[10., 1., 0.01, 1e-6, 2e-6, 0.],
+                         [-5., 0., 1.02, 0., 1e-6, 3e-6]]),
+        transformId='lens_correction')
+    tilespecs = [renderapi.tilespec.TileSpec(
+        tileId=str(i), width=3840, height=3840, tforms=[
+            renderapi.transform.ReferenceTransform(refId='lens_correction'),
+            renderapi.transform.AffineModel(
+                M00=np.cos(t), M01=-np.sin(t), M10=np.sin(t),
+                M11=np.cos(t), B0=x, B1=y)])
+        for i, (t, x, y) in enumerate(zip(
+            rng.uniform(-0.01, 0.01, num_tiles),
+            rng.uniform(0, 1e6, num_tiles),
+            rng.uniform(0, 1e6, num_tiles)))]
+    return tilespecs, [lens]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=100000)
+    parser.add_argument('--ndiv_inner', type=int, default=2)
+    args = parser.parse_args()
+
+    tilespecs, references = make_tiles(args.tiles)
+    start = default_timer()
+    for ts in tilespecs:
+        ts.bbox_transformed(ndiv_inner=args.ndiv_inner,
+                            reference_tforms=references)
+    t_loop = default_timer() - start
+    start = default_timer()
+    renderapi.tilespec.bbox_transformed_batch(
+        tilespecs, ndiv_inner=args.ndiv_inner, reference_tforms=references)
+    t_batch = default_timer() - start
+    print('{} tiles, ndiv_inner {}'.format(args.tiles, args.ndiv_inner))
+    print('  bbox_transformed        {:8.3f} s'.format(t_loop))
+    print('  bbox_transformed_batch  {:8.3f} s'.format(t_batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+'''
+micro-benchmark of the overhead of the renderaccess and
+renderclientaccess decorators compared to calling the undecorated
+function directly
+
+usage: PYTHONPATH=. python benchmarks/bench_decorators.py [--number N]
+'''
+import argparse
+import timeit
+
+import renderapi
+from renderapi.render import renderaccess
+from renderapi.client.utils import renderclientaccess
+
+
+def get_tile_spec(stack, tile, host=None, port=None, owner=None,
+                  project=None, session=None, render=None, **kwargs):
+    return tile
+
+
+decorated = renderaccess(get_tile_spec)
+client_decorated = renderclientaccess(get_tile_spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    render = renderapi.render.Render(
+        host='http://renderhost', port=8080, owner='owner',
+        project='project', client_scripts='/path/to/client_scripts')
+    client = renderapi.render.RenderClient(
+        client_script='/path/to/run_ws_client.sh', memGB='1G',
+        validate_client=False, host='http://renderhost', port=8080,
+        owner='owner', project='project',
+        client_scripts='/path/to/client_scripts')
+    kwargs = dict(host='http://renderhost', port=8080, owner='owner',
+                  project='project', session=render.session)
+
+    calls = [
+        ('direct', lambda: get_tile_spec('stack', 'tile', **kwargs)),
+        ('renderaccess', lambda: decorated('stack', 'tile', **kwargs)),
+        ('renderaccess render=',
+         lambda: decorated('stack', 'tile', render=render)),
+        ('renderaccess positional', lambda: decorated(
+            'stack', 'tile', 'http://renderhost', 8080, 'owner',
+            'project', render.session)),
+        ('renderclientaccess render=',
+         lambda: client_decorated('stack', 'tile', render=client)),
+    ]
+    direct = None
+    for name, call in calls:
+        t = timeit.timeit(call, number=args.number) / args.number
+        direct = t if direct is None else direct
+        print('{:<28} {:8.3f} us/call  (+{:.3f} us)'.format(
+            name, t * 1e6, (t - direct) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
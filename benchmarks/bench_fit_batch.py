@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+'''
+compare the time to fit a model per set of point matches one set at
+a time with estimate and for all sets at once with fit_batch, for the
+affine, rigid and similarity models
+
+usage: PYTHONPATH=. python benchmarks/bench_fit_batch.py
+           [--sets N] [--points_per_set N]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def make_sets(num_sets, points_per_set, seed=0):
+    rng = np.random.RandomState(seed)
+    counts = rng.randint(points_per_set // 2, points_per_set * 3 // 2,
+                         size=num_sets)
+    src = rng.uniform(0, 3840., size=(counts.sum(), 2))
+    dst = src + np.repeat(rng.normal(0, 100., size=(num_sets, 2)),
+                          counts, axis=0)
+    dst += rng.normal(0, 1., size=src.shape)
+    return src, dst, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sets', type=int, default=10000)
+    parser.add_argument('--points_per_set', type=int, default=100)
+    args = parser.parse_args()
+
+    src, dst, counts = make_sets(args.sets, args.points_per_set)
+    splits = np.cumsum(counts)[:-1]
+    src_sets = np.split(src, splits)
+    dst_sets = np.split(dst, splits)
+    print('{} sets, {} points'.format(args.sets, len(src)))
+    for transformclass in [renderapi.transform.AffineModel,
+                           renderapi.transform.RigidModel,
+                           renderapi.transform.SimilarityModel]:
+        start = default_timer()
+        for s, d in zip(src_sets, dst_sets):
+            transformclass().estimate(s, d)
+        t_loop = default_timer() - start
+        start = default_timer()
+        transformclass.fit_batch(src, dst, counts)
+        t_batch = default_timer() - start
+        print('  {:16s} estimate {:8.3f} s  fit_batch {:8.3f} s'.format(
+            transformclass.__name__, t_loop, t_batch))
+
+
+if __name__ == '__main__':
+    main()
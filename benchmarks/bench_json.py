@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+'''
+benchmark encode/decode throughput of the json backends in
+renderapi.utils on tilespec and point match payloads
+
+usage: PYTHONPATH=. python benchmarks/bench_json.py [--tiles N] [--matches N]
+'''
+import argparse
+import copy
+import json
+import os
+import timeit
+
+import numpy as np
+
+import renderapi
+from renderapi import utils
+
+TILESPECS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', 'test', 'test_files', 'tilespecs.json')
+
+
+def make_resolvedtiles(num_tiles):
+    with open(TILESPECS_FILE, 'r') as f:
+        ts_json = json.load(f)
+    tilespecs = []
+    for i in range(num_tiles):
+        d = copy.deepcopy(ts_json[i % len(ts_json)])
+        d['tileId'] = '{}.{}'.format(d['tileId'], i)
+        tilespecs.append(renderapi.tilespec.TileSpec(json=d))
+    return renderapi.resolvedtiles.ResolvedTiles(tilespecs=tilespecs)
+
+
+def make_matches(num_matches, num_points=200):
+    rng = np.random.RandomState(0)
+    return [{'pGroupId': '1.0', 'qGroupId': '2.0',
+             'pId': 'p{}'.format(i), 'qId': 'q{}'.format(i),
+             'matches': {'p': rng.rand(2, num_points).tolist(),
+                         'q': rng.rand(2, num_points).tolist(),
+                         'w': np.ones(num_points).tolist()}}
+            for i in range(num_matches)]
+
+
+def bench(name, payload, number):
+    size = len(utils.json_dumps(payload))
+    print('{} ({:.1f} MB)'.format(name, size / 1e6))
+    baseline = timeit.timeit(
+        lambda: utils.renderdumps(payload), number=number) / number
+    print('  {:<10} encode {:8.1f} MB/s'.format(
+        'renderdumps', size / baseline / 1e6))
+    for backend in utils.available_json_backends():
+        utils.set_json_backend(backend)
+        s = utils.json_dumps(payload)
+        enc = timeit.timeit(
+            lambda: utils.json_dumps(payload), number=number) / number
+        dec = timeit.timeit(
+            lambda: utils.json_loads(s), number=number) / number
+        print('  {:<10} encode {:8.1f} MB/s  decode {:8.1f} MB/s'.format(
+            backend, size / enc / 1e6, size / dec / 1e6))
+    utils.set_json_backend()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=10000)
+    parser.add_argument('--matches', type=int, default=2000)
+    parser.add_argument('--number', type=int, default=3)
+    args = parser.parse_args()
+    bench('ResolvedTiles with {} tiles'.format(args.tiles),
+          make_resolvedtiles(args.tiles), args.number)
+    bench('{} point matches'.format(args.matches),
+          make_matches(args.matches), args.number)
+
+
+if __name__ == '__main__':
+    main()
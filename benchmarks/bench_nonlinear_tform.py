@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+'''
+measure the throughput of NonLinearCoordinateTransform.tform for lens
+corrections of dimensions 3 to 6, compared with normalizing each term of
+the expansion and accumulating it into the result as the transform
+did previously
+
+usage: PYTHONPATH=. python benchmarks/bench_nonlinear_tform.py
+           [--points 1e6 1e7] [--dimensions 3 4 5 6] [--legacy_max 1e7]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def legacy_tform(tf, points):
+    dst = np.zeros(points.shape)
+    x = points[:, 0]
+    y = points[:, 1]
+    pidx = 0
+    for i in range(1, tf.dimension + 1):
+        for j in range(i, -1, -1):
+            f = ((np.power(x, j) * np.power(y, i - j) - tf.normMean[pidx]) /
+                 tf.normVar[pidx])
+            dst += f[:, None] * tf.beta[pidx]
+            pidx += 1
+    dst += 100.0 * tf.beta[-1]
+    return dst
+
+
+def lens_correction(dimension, size=3840.):
+    tf = renderapi.transform.NonLinearCoordinateTransform()
+    tf.dimension = dimension
+    tf.length = (dimension + 1) * (dimension + 2) // 2
+    tf.width = tf.height = int(size)
+    xx, yy = np.meshgrid(np.linspace(0, size, 64), np.linspace(0, size, 64))
+    src = np.column_stack([xx.ravel(), yy.ravel()])
+    # barrel distortion of a few pixels at the corners
+    r = src - size / 2
+    dst = src + r * (np.sum(r ** 2, axis=1, keepdims=True) / size ** 2) * 1e-3
+    tf.estimate(src, dst, return_params=False)
+    return tf
+
+
+def timed(f):
+    start = default_timer()
+    result = f()
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=float, nargs='+',
+                        default=[1e6, 1e7])
+    parser.add_argument('--dimensions', type=int, nargs='+',
+                        default=[3, 4, 5, 6])
+    parser.add_argument('--legacy_max', type=float, default=1e7,
+                        help='largest number of points for legacy timing')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    for n in [int(n) for n in args.points]:
+        points = rng.uniform(0, 3840., size=(n, 2))
+        out = np.empty_like(points)
+        for dimension in args.dimensions:
+            tform = lens_correction(dimension)
+            _, t = timed(lambda: tform.tform(points, out=out))
+            line = '{:>11d} points  dimension {}  tform {:7.3f} s  '
+            line += '{:6.1f} Mpts/s'
+            line = line.format(n, dimension, t, n / t / 1e6)
+            if n <= args.legacy_max:
+                expected, t_legacy = timed(
+                    lambda: legacy_tform(tform, points))
+                line += '  legacy {:7.3f} s  max diff {:.1e}'.format(
+                    t_legacy, np.abs(out - expected).max())
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
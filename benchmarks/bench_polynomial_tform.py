@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+'''
+measure the throughput of Polynomial2DTransform.tform for polynomials
+of orders 2 to 5, compared with evaluating each term with powers
+computed from scratch as the transform did previously
+
+usage: PYTHONPATH=. python benchmarks/bench_polynomial_tform.py
+           [--points 1e6 1e7 1e8] [--orders 2 3 4 5] [--legacy_max 1e7]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def legacy_tform(params, points):
+    dst = np.zeros(points.shape)
+    x = points[:, 0]
+    y = points[:, 1]
+    o = int((-3 + np.sqrt(9 - 4 * (2 - len(params.ravel())))) / 2)
+    pidx = 0
+    for j in range(o + 1):
+        for i in range(j + 1):
+            dst[:, 0] += params[0, pidx] * x ** (j - i) * y ** i
+            dst[:, 1] += params[1, pidx] * x ** (j - i) * y ** i
+            pidx += 1
+    return dst
+
+
+def random_params(order, rng, size=3840.):
+    params = np.zeros((2, (order + 1) * (order + 2) // 2))
+    params[:, 1:3] = np.eye(2)
+    for j in range(2, order + 1):
+        row = j * (j + 1) // 2
+        # terms of each order displace points by about a pixel
+        params[:, row:row + j + 1] = rng.normal(
+            scale=size ** (1 - j), size=(2, j + 1))
+    return params
+
+
+def timed(f):
+    start = default_timer()
+    result = f()
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=float, nargs='+',
+                        default=[1e6, 1e7])
+    parser.add_argument('--orders', type=int, nargs='+',
+                        default=[2, 3, 4, 5])
+    parser.add_argument('--legacy_max', type=float, default=1e7,
+                        help='largest number of points for legacy timing')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    for n in [int(n) for n in args.points]:
+        points = rng.uniform(0, 3840., size=(n, 2))
+        out = np.empty_like(points)
+        for order in args.orders:
+            tform = renderapi.transform.Polynomial2DTransform(
+                params=random_params(order, rng))
+            _, t = timed(lambda: tform.tform(points, out=out))
+            line = '{:>11d} points  order {}  tform {:7.3f} s  {:6.1f} Mpts/s'
+            line = line.format(n, order, t, n / t / 1e6)
+            if n <= args.legacy_max:
+                expected, t_legacy = timed(
+                    lambda: legacy_tform(tform.params, points))
+                line += '  legacy {:7.3f} s  max diff {:.1e}'.format(
+                    t_legacy, np.abs(out - expected).max())
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+'''
+measure the build time and query throughput of
+renderapi.spatial_index.SpatialIndex over a montage of overlapping tiles
+
+usage: PYTHONPATH=. python benchmarks/bench_spatial_index.py [--tiles N]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+from renderapi.spatial_index import SpatialIndex
+
+
+def make_montage(num_tiles, size=3840., overlap=0.1, jitter=50., seed=0):
+    rng = np.random.RandomState(seed)
+    side = int(np.ceil(np.sqrt(num_tiles)))
+    step = size * (1 - overlap)
+    ij = np.indices((side, side)).reshape(2, -1).T[:num_tiles]
+    xy = ij * step + rng.uniform(-jitter, jitter, size=ij.shape)
+    return np.hstack([xy, xy + size])
+
+
+def timed(f, *args):
+    start = default_timer()
+    result = f(*args)
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000000)
+    args = parser.parse_args()
+
+    boxes = make_montage(args.tiles)
+    rng = np.random.RandomState(1)
+    lo, hi = boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)
+    points = rng.uniform(lo, hi, size=(args.queries, 2))
+    queries = np.hstack([points, points + 1000.])
+
+    index, t_build = timed(SpatialIndex, boxes)
+    (_, found), t_boxes = timed(index.query_boxes, queries)
+    (_, hits), t_points = timed(index.query_points, points)
+    pairs, t_pairs = timed(index.overlapping_pairs)
+    t_single = timed(lambda: [index.query_box(q) for q in queries[:1000]])[1]
+
+    print('{} tiles, grid {} cells of {:g}'.format(
+        args.tiles, index.shape, index.cell_size))
+    print('  build              {:8.3f} s'.format(t_build))
+    print('  query_boxes        {:8.0f} queries/s  ({} results)'.format(
+        args.queries / t_boxes, len(found)))
+    print('  query_points       {:8.0f} queries/s  ({} results)'.format(
+        args.queries / t_points, len(hits)))
+    print('  query_box          {:8.0f} queries/s'.format(1000 / t_single))
+    print('  overlapping_pairs  {:8.3f} s  ({} pairs)'.format(
+        t_pairs, len(pairs)))
+
+
+if __name__ == '__main__':
+    main()
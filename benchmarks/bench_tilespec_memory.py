@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+'''
+measure the memory held per tile by TileSpec objects deserialized
+from realistic tilespec json, compared with the json dictionaries
+they are created from
+
+usage: PYTHONPATH=. python benchmarks/bench_tilespec_memory.py [--tiles N]
+'''
+import argparse
+import copy
+import gc
+import json
+import tracemalloc
+
+import renderapi
+
+TILESPEC = {
+    'tileId': '20160710195316413_243774_7R_SID_01_redo_0_11_7_3_15_8.2266.0',
+    'layout': {'sectionId': '2266.0', 'temca': '3', 'camera': '0',
+               'imageRow': 11, 'imageCol': 7, 'stageX': 115071.0,
+               'stageY': 23073.7, 'rotation': 0.0, 'pixelsize': 4.0},
+    'z': 2266, 'minX': 1857, 'minY': -32318, 'maxX': 7275, 'maxY': -27014,
+    'width': 3840, 'height': 3840,
+    'minIntensity': 0, 'maxIntensity': 65535,
+    'mipmapLevels': {
+        str(level): {
+            'imageUrl': ('file:///nas/em/2016/reflections/section_2266/'
+                         'mipmaps/{}/tile.tif'.format(level)),
+            'maskUrl': ('file:///nas/em/2016/reflections/masks/'
+                        'mask_{}.tif'.format(level))}
+        for level in range(4)},
+    'transforms': {'type': 'list', 'specList': [
+        {'type': 'ref', 'refId': 'lens_correction_2016_07'},
+        {'type': 'leaf',
+         'className': 'mpicbg.trakem2.transform.AffineModel2D',
+         'dataString': ('-0.6433267575 0.7655917209 -0.7655917209 '
+                        '-0.6433267575 115071.0014383696 23073.7167961992')},
+        {'type': 'leaf',
+         'className': 'mpicbg.trakem2.transform.AffineModel2D',
+         'dataString': ('1.0000000000 0.0000000000 0.0000000000 '
+                        '1.0000000000 -16981.0000000000 -57152.0000000000')}]}
+}
+
+
+def make_tilespec_json(i):
+    d = copy.deepcopy(TILESPEC)
+    d['tileId'] = '{}.{}'.format(d['tileId'], i)
+    for level in d['mipmapLevels'].values():
+        level['imageUrl'] = level['imageUrl'].replace(
+            'tile.tif', 'tile_{:07d}.tif'.format(i))
+        level['maskUrl'] = level['maskUrl'].replace(
+            '.tif', '_{:07d}.tif'.format(i % 4))
+    # round trip through json so that strings are not shared
+    return json.loads(json.dumps(d))
+
+
+def measure(make, num_tiles):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [make(i) for i in range(num_tiles)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return (after - before) / float(num_tiles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=20000)
+    args = parser.parse_args()
+
+    json_bytes = measure(make_tilespec_json, args.tiles)
+    tile_bytes = measure(lambda i: renderapi.tilespec.TileSpec(
+        json=make_tilespec_json(i)), args.tiles)
+    print('{} tiles'.format(args.tiles))
+    print('  json dict     {:8.0f} bytes/tile'.format(json_bytes))
+    print('  TileSpec      {:8.0f} bytes/tile'.format(tile_bytes))
+
+
+if __name__ == '__main__':
+    main()
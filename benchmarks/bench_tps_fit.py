@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+'''
+measure the time to fit thin plate splines directly to increasing
+numbers of landmarks, and to match many more points within tolerances
+with ThinPlateSplineTransform.estimate_decimated
+
+usage: PYTHONPATH=. python benchmarks/bench_tps_fit.py
+           [--landmarks 500 1000 2000] [--points 50000] [--tols 1 0.1]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+
+
+def warp(points, size=4000.):
+    k = 2 * np.pi / size
+    return (points * 1.01 + [5., 3.] + 20. * np.column_stack(
+        [np.sin(k * points[:, 1]), np.cos(1.5 * k * points[:, 0])]) +
+        5. * np.column_stack([np.sin(3 * k * points[:, 0] + 1),
+                              np.cos(2 * k * points[:, 1])]))
+
+
+def timed(f):
+    start = default_timer()
+    result = f()
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--landmarks', type=int, nargs='+',
+                        default=[500, 1000, 2000])
+    parser.add_argument('--points', type=int, default=50000)
+    parser.add_argument('--tols', type=float, nargs='+', default=[1., 0.1])
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    for n in args.landmarks:
+        src = rng.uniform(0, 4000., size=(n, 2))
+        tf = renderapi.transform.ThinPlateSplineTransform()
+        _, t = timed(lambda: tf.estimate(src, warp(src)))
+        print('estimate            {:6d} landmarks  {:8.3f} s'.format(n, t))
+
+    src = rng.uniform(0, 4000., size=(args.points, 2))
+    dst = warp(src)
+    test = rng.uniform(0, 4000., size=(10000, 2))
+    for tol in args.tols:
+        tf = renderapi.transform.ThinPlateSplineTransform()
+        landmarks, t = timed(lambda: tf.estimate_decimated(src, dst, tol=tol))
+        error = np.sqrt(((tf.tform(test) - warp(test)) ** 2).sum(axis=1))
+        print('estimate_decimated  {:6d} points  tol {:g}  {:8.3f} s  '
+              '{} landmarks  max error elsewhere {:.3f}'.format(
+                  args.points, tol, t, len(landmarks), error.max()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+'''
+compare the time and accuracy of inverting a thin plate spline by
+gradient descent and by Newton iteration from affine and lattice
+initial estimates, for warps with increasing rotation and scale
+
+usage: PYTHONPATH=. python benchmarks/bench_tps_inverse.py
+           [--points N] [--landmarks N] [--scales 1.0 1.1 1.5]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+
+import renderapi
+from renderapi.errors import EstimationError
+
+
+def warp_tps(num_landmarks, scale, theta, size=4000., seed=0):
+    rng = np.random.RandomState(seed)
+    src = rng.uniform(0, size, size=(num_landmarks, 2))
+    R = scale * np.array([[np.cos(theta), -np.sin(theta)],
+                          [np.sin(theta), np.cos(theta)]])
+    k = 2 * np.pi / size
+    dst = src.dot(R.T) + 20. * np.column_stack(
+        [np.sin(k * src[:, 1]), np.cos(k * src[:, 0])])
+    tf = renderapi.transform.ThinPlateSplineTransform()
+    tf.estimate(src, dst)
+    return tf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--landmarks', type=int, default=1000)
+    parser.add_argument('--scales', type=float, nargs='+',
+                        default=[1.0, 1.1, 1.5])
+    parser.add_argument('--theta', type=float, default=0.3)
+    args = parser.parse_args()
+
+    points = np.random.RandomState(1).uniform(0, 4000., (args.points, 2))
+    for scale in args.scales:
+        tf = warp_tps(args.landmarks, scale, args.theta)
+        mapped = tf.tform(points)
+        print('{} points, {} landmarks, scale {:g}, rotation {:g}'.format(
+            args.points, args.landmarks, scale, args.theta))
+        for label, kwargs in [
+                ('gradient_descent', dict(method='gradient_descent')),
+                ('newton affine', dict(method='newton', initial='affine')),
+                ('newton grid', dict(method='newton', initial='grid'))]:
+            start = default_timer()
+            try:
+                inverse = tf.inverse_tform(mapped, **kwargs)
+            except EstimationError as e:
+                print('  {:18s} failed after {:7.3f} s: {}'.format(
+                    label, default_timer() - start, e))
+                continue
+            t = default_timer() - start
+            error = np.sqrt(((inverse - points) ** 2).sum(axis=1)).max()
+            print('  {:18s} {:7.3f} s  max error {:.1e}'.format(
+                label, t, error))
+
+
+if __name__ == '__main__':
+    main()
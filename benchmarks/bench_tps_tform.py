@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+'''
+measure the throughput of ThinPlateSplineTransform.tform for different
+numbers of landmarks, memory budgets and threads, compared with
+evaluating the kernel for all points at once with cdist and a masked
+log as the transform did previously
+
+usage: PYTHONPATH=. python benchmarks/bench_tps_tform.py
+           [--points 1e5] [--landmarks 100 1000 10000]
+           [--budgets 4e6 1.6e7 6.4e7] [--threads 1 2 4] [--legacy_max 1e8]
+'''
+import argparse
+from timeit import default_timer
+
+import numpy as np
+import scipy.spatial
+
+import renderapi
+
+
+def legacy_tform(tf, points):
+    disp = scipy.spatial.distance.cdist(
+        points, tf.srcPts.transpose(), metric='sqeuclidean')
+    disp *= np.ma.log(np.sqrt(disp)).filled(0.0)
+    return (points + disp.dot(tf.dMtxDat.transpose()) +
+            points.dot(tf.aMtx.T) + tf.bVec)
+
+
+def random_tps(num_landmarks, size=4000., seed=0):
+    rng = np.random.RandomState(seed)
+    tf = renderapi.transform.ThinPlateSplineTransform()
+    tf.ndims = 2
+    tf.nLm = num_landmarks
+    tf.srcPts = rng.uniform(0, size, size=(2, num_landmarks))
+    tf.dMtxDat = rng.normal(0, 1e-3 / num_landmarks, size=(2, num_landmarks))
+    tf.aMtx = rng.normal(0, 0.01, size=(2, 2))
+    tf.bVec = rng.normal(0, 10., size=2)
+    return tf
+
+
+def timed(f):
+    start = default_timer()
+    result = f()
+    return result, default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=float, default=1e5)
+    parser.add_argument('--landmarks', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--budgets', type=float, nargs='+',
+                        default=[4e6, 1.6e7, 6.4e7])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--legacy_max', type=float, default=1e8,
+                        help='largest points x landmarks for legacy timing')
+    args = parser.parse_args()
+
+    n = int(args.points)
+    points = np.random.RandomState(1).uniform(0, 4000., size=(n, 2))
+    out = np.empty_like(points)
+    for num_landmarks in args.landmarks:
+        tf = random_tps(num_landmarks)
+        print('{} points, {} landmarks'.format(n, num_landmarks))
+        if n * num_landmarks <= args.legacy_max:
+            expected, t = timed(lambda: legacy_tform(tf, points))
+            print('  legacy                      {:8.3f} s'.format(t))
+        else:
+            expected = None
+        for budget in [int(b) for b in args.budgets]:
+            for threads in args.threads:
+                _, t = timed(lambda: tf.tform(
+                    points, out=out, memory_budget=budget, threads=threads))
+                line = '  budget {:5.0f} MB  threads {}  {:8.3f} s'.format(
+                    budget / 1e6, threads, t)
+                if expected is not None:
+                    line += '  max diff {:.1e}'.format(
+                        np.abs(out - expected).max())
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
 from tilespec import TileSpec,Transform,AffineModel,ResolvedTileSpecCollection, ResolvedTileSpecMap
 from renderapi import Render
+from renderapi.spatial_index import SpatialIndex
 import os
 import json
 import numpy as np
-from rtree import index as rindex
 import networkx as nx
 import argparse
 import pathos.multiprocessing as mp
@@ -20,15 +20,14 @@ def process_section(z,
     distance_threshold=DEFAULT_DISTANCE_THRESHOLD,
     edge_threshold=DEFAULT_EDGE_THRESHOLD):
 
-    ridx = rindex.Index() #setup an Rtree to find overlapping tiles
     G=nx.Graph() #setup a graph to store overlapping tiles
     Gpos = {} #dictionary to store positions of tiles
     
     #get all the tilespecs for this z from prestitched stack
     pre_tilespecs = render.get_tile_specs_from_z(prestitchedStack,z)
-    #insert them into the Rtree with their bounding boxes to assist in finding overlaps
-    #label them by order in pre_tilespecs
-    [ridx.insert(i,(ts.minX,ts.minY,ts.maxX,ts.maxY)) for i,ts in enumerate(pre_tilespecs)]
+    #index their bounding boxes to assist in finding overlaps
+    #indices refer to the order in pre_tilespecs
+    ridx = SpatialIndex.from_tilespecs(pre_tilespecs)
     
     post_tilespecs = []
     #loop over each tile in this z to make graph
@@ -37,7 +36,7 @@ def process_section(z,
         post_tilespecs.append(render.get_tile_spec(poststitchedStack,ts.tileId))
         
         #get the list of overlapping nodes
-        nodes=list(ridx.intersection((ts.minX,ts.minY,ts.maxX,ts.maxY)))
+        nodes=list(ridx.query_box(ts.bbox))
         nodes.remove(i) #remove itself
         [G.add_edge(i,node) for node in nodes] #add these nodes to the undirected graph
         
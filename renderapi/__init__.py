@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import sys
 
 from . import render
 from . import tilespec
@@ -10,10 +11,22 @@ from . import transform
 from . import pointmatch
 from . import coordinate
 from . import resolvedtiles
+from . import tilespec_table
+from . import spatial_index
+from . import session
+from . import cache
+from . import metrics
 from .render import connect
 from .render import Render
 
 __version__ = "2.4.0"
 __all__ = ['render', 'client', 'tilespec', 'errors',
            'stack', 'image', 'pointmatch', 'coordinate',
-           'connect', 'transform', 'resolvedtiles', 'Render']
+           'connect', 'transform', 'resolvedtiles', 'Render', 'session',
+           'cache', 'metrics', 'tilespec_table',
+           'spatial_index']
+
+# the asyncio client needs async/await syntax
+if sys.version_info >= (3, 5):
+    from . import aio
+    __all__.append('aio')
@@ -0,0 +1,677 @@
+#!/usr/bin/env python
+'''
+asyncio versions of frequently used render api calls
+
+These functions mirror the signatures of their blocking counterparts
+but are coroutines which make requests through an
+:class:`aiohttp.ClientSession`, so that a single event loop can keep
+many requests to render in flight at once.  aiohttp is an optional
+dependency which is only required to create a client session.
+
+Examples
+--------
+>>> render = renderapi.connect('server', 8080, 'me', 'my_project')
+>>> async def get_sections(stack, zvalues):
+...     async with renderapi.aio.client_session(render) as session:
+...         return await asyncio.gather(*[
+...             renderapi.aio.get_tile_specs_from_z(
+...                 stack, z, render=render, session=session)
+...             for z in zvalues])
+'''
+import asyncio
+import io
+import logging
+import weakref
+from timeit import default_timer
+
+import numpy as np
+from PIL import Image
+from urllib3.util.retry import RequestHistory
+
+from .errors import RenderError
+from .image import IMAGE_FORMATS
+from .render import Render, format_baseurl, format_preamble
+from .pointmatch import add_merge_collections
+from .resolvedtiles import ResolvedTiles
+from .session import DEFAULT_POOL_MAXSIZE, make_retry
+from .tilespec import TileSpec
+from .utils import (NullHandler, argspec_decorator, jbool, json_dumps,
+                    json_loads, record_call, evict_cached,
+                    _compress_payload)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# settings of the sessions created by client_session
+_session_settings = weakref.WeakKeyDictionary()
+
+
+class _SessionSettings(object):
+    """compression, retry, cache and call hook settings of a client
+    session, with the attributes of a
+    :class:`renderapi.session.RenderSession` read by
+    :mod:`renderapi.utils`"""
+    def __init__(self, compress_threshold=None, compress_level=None,
+                 max_retries=0, backoff_factor=None, retry_jitter=None,
+                 retry_statuses=None, cache=None, call_hooks=None,
+                 **kwargs):
+        self.compress_threshold = compress_threshold
+        self.compress_level = (6 if compress_level is None
+                               else compress_level)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_jitter = retry_jitter
+        self.retry_statuses = retry_statuses
+        self.cache = cache
+        # not copied, so that hooks added to the render object are called
+        self.call_hooks = [] if call_hooks is None else call_hooks
+
+
+def _settings(session):
+    # sessions not created by client_session may carry settings
+    #   as attributes like a RenderSession
+    return _session_settings.get(session, session)
+
+
+class _Response(object):
+    """the parts of a response read by
+    :func:`renderapi.utils.record_call`, like a
+    :class:`requests.Response`, and the seconds taken to read it"""
+    def __init__(self, url, status, content, duration, retries=None):
+        self.url = url
+        self.status_code = status
+        self.content = content
+        self.duration = duration
+        self.elapsed = None
+        self.raw = _Raw(retries)
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+class _Raw(object):
+    def __init__(self, retries):
+        self.retries = retries
+
+
+async def _request(session, method, request_url, **kwargs):
+    """make a request, retrying it according to the max_retries,
+    backoff_factor, retry_jitter and retry_statuses settings of the
+    session as :class:`renderapi.session.RenderSession` does
+
+    Parameters
+    ----------
+    session : aiohttp.ClientSession
+        client session
+    method : str
+        http method
+    request_url : str
+        url
+    **kwargs
+        keyword arguments of the request
+
+    Returns
+    -------
+    _Response
+        the last response
+    """
+    settings = _settings(session)
+    max_retries = getattr(settings, 'max_retries', 0)
+    retry = (make_retry(max_retries,
+                        getattr(settings, 'backoff_factor', None),
+                        getattr(settings, 'retry_jitter', None),
+                        getattr(settings, 'retry_statuses', None))
+             if max_retries else None)
+    start = default_timer()
+    while True:
+        error = status = None
+        try:
+            async with session.request(method, request_url, **kwargs) as r:
+                content = await r.read()
+                status, url = r.status, r.url
+        except Exception as e:
+            if (retry is None or aiohttp is None or
+                    not isinstance(e, aiohttp.ClientConnectionError)):
+                raise
+            error = e
+        if error is None and (retry is None or
+                              not retry.is_retry(method, status)):
+            break
+        new_retry = retry.new(
+            total=retry.total - 1,
+            history=retry.history + (RequestHistory(
+                method, request_url, error, status, None),))
+        if new_retry.is_exhausted():
+            if error is not None:
+                raise error
+            # the last response, as urllib3 returns it
+            break
+        retry = new_retry
+        logger.info('retrying {} {} after {}'.format(
+            method, request_url, error or status))
+        await asyncio.sleep(retry.get_backoff_time())
+    return _Response(url, status, content, default_timer() - start, retry)
+
+
+def client_session(render=None, **kwargs):
+    """create an :class:`aiohttp.ClientSession` with a connection pool
+    sized according to the session settings of a render object.
+    Requests made through it are compressed, retried, evicted from the
+    cache and reported to call hooks according to the same settings.
+
+    Parameters
+    ----------
+    render : renderapi.render.Render, optional
+        render connect object whose :attr:`Render.session_kwargs`
+        define pool size and keep-alive behavior
+    **kwargs
+        keyword arguments passed to :class:`aiohttp.ClientSession`
+
+    Returns
+    -------
+    aiohttp.ClientSession
+        client session to be used as an async context manager
+
+    Raises
+    ------
+    ImportError
+        if aiohttp is not installed
+    """
+    if aiohttp is None:
+        raise ImportError('renderapi.aio requires aiohttp')
+    session_kwargs = ({} if render is None
+                      else getattr(render, 'session_kwargs', {}))
+    maxsize = session_kwargs.get('pool_maxsize') or DEFAULT_POOL_MAXSIZE
+    connector = aiohttp.TCPConnector(
+        limit=maxsize, limit_per_host=maxsize,
+        force_close=not session_kwargs.get('keep_alive', True))
+    session = aiohttp.ClientSession(connector=connector, **kwargs)
+    _session_settings[session] = _SessionSettings(**session_kwargs)
+    return session
+
+
+@argspec_decorator
+async def renderaccess(f, argspec, *args, **kwargs):
+    """asynchronous version of :func:`renderapi.render.renderaccess`
+
+    Fills in host, port, owner, and project from a :class:`Render`
+    object.  Functions called without a session will make their
+    request through a temporary :func:`client_session`.
+
+    Parameters
+    ----------
+    f : coroutine function
+        function to decorate
+
+    Returns
+    -------
+    coroutine function
+        decorated function
+    """
+    args, kwargs = argspec(args, kwargs)
+    render = kwargs.get('render')
+    if render is not None:
+        if not isinstance(render, Render):
+            raise ValueError(
+                'invalid Render object type {} specified!'.format(
+                    type(render)))
+        kwargs = render.make_kwargs(**kwargs)
+    if kwargs.get('session') is None:
+        async with client_session(render) as session:
+            kwargs['session'] = session
+            return await f(*args, **kwargs)
+    return await f(*args, **kwargs)
+
+
+async def get_json(session, request_url, params=None, **kwargs):
+    """asynchronous GET request with RenderError handling
+
+    Parameters
+    ----------
+    session : aiohttp.ClientSession
+        client session
+    request_url : str
+        url
+    params : dict
+        request parameters
+
+    Returns
+    -------
+    dict
+        json response from server
+
+    Raises
+    ------
+    RenderError
+        if cannot get json successfully
+    """
+    r = await _request(session, 'GET', request_url, params=params)
+    if r.status_code != 200:
+        record_call(_settings(session), 'GET', request_url, r, r.duration)
+        message = "request to {} returned error code {} with message {}"
+        raise RenderError(message.format(r.url, r.status_code, r.text))
+    start = default_timer()
+    try:
+        return json_loads(r.content)
+    except Exception as e:
+        logger.error(e)
+        raise RenderError(r.text)
+    finally:
+        record_call(_settings(session), 'GET', request_url, r, r.duration,
+                    decode_time=default_timer() - start)
+
+
+def _encode_payload(settings, d, headers):
+    """serialize and, as configured in settings, compress a payload"""
+    payload = json_dumps(d) if d is not None else None
+    return _compress_payload(settings, payload, headers)
+
+
+async def put_json(session, request_url, d, params=None):
+    """asynchronous PUT request with RenderError handling
+
+    Parameters
+    ----------
+    session : aiohttp.ClientSession
+        client session
+    request_url : str
+        url
+    d : obj
+        data payload (will be serialized with
+        :func:`renderapi.utils.json_dumps` in the default executor
+        of the event loop)
+    params : dict
+        request parameters
+
+    Returns
+    -------
+    bytes
+        content of server response
+
+    Raises
+    ------
+    RenderError
+        if cannot put
+    """
+    headers = {"content-type": "application/json"}
+    if d is None:
+        headers['Accept'] = "application/json"
+    # serializing and compressing large payloads would block the loop
+    payload = await asyncio.get_event_loop().run_in_executor(
+        None, _encode_payload, _settings(session), d, headers)
+    r = await _request(session, 'PUT', request_url, data=payload,
+                       params=params, headers=headers)
+    record_call(_settings(session), 'PUT', request_url, r, r.duration,
+                bytes_sent=len(payload or b''))
+    evict_cached(_settings(session), request_url)
+    if r.status_code not in [200, 201, 204]:
+        raise RenderError(
+            'put to {} returned status code {} with message {}'.format(
+                r.url, r.status_code, r.text))
+    return r.content
+
+
+@renderaccess
+async def get_tile_specs_from_z(stack, z, host=None, port=None,
+                                owner=None, project=None, session=None,
+                                render=None, **kwargs):
+    """asynchronous :func:`renderapi.tilespec.get_tile_specs_from_z`
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    z : float
+        render z
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    :obj:`list` of :class:`renderapi.tilespec.TileSpec`
+        list of TileSpec objects from that stack at that z
+        (None if there are none)
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + '/z/%f/tile-specs' % (z)
+    logger.debug(request_url)
+    tilespecs_json = await get_json(session, request_url)
+    if len(tilespecs_json) == 0:
+        return None
+    return [TileSpec(json=tilespec_json)
+            for tilespec_json in tilespecs_json]
+
+
+@renderaccess
+async def get_resolved_tiles_from_z(stack, z, host=None, port=None,
+                                    owner=None, project=None, session=None,
+                                    render=None, **kwargs):
+    """asynchronous :func:`renderapi.resolvedtiles.get_resolved_tiles_from_z`
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    z : float
+        render z
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    :class:`renderapi.resolvedtiles.ResolvedTiles`
+        ResolvedTiles object containing tilespecs and transforms
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + '/z/%f/resolvedTiles' % (z)
+    logger.debug(request_url)
+    d = await get_json(session, request_url)
+    return ResolvedTiles(json=d)
+
+
+@renderaccess
+async def put_tilespecs(stack, resolved_tiles=None, deriveData=True,
+                        tilespecs=None, shared_transforms=None,
+                        host=None, port=None, owner=None, project=None,
+                        session=None, render=None, **kwargs):
+    """asynchronous :func:`renderapi.resolvedtiles.put_tilespecs`
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    resolved_tiles : renderapi.resolvedtiles.ResolvedTiles
+        resolved tiles to upload
+    deriveData : bool
+        whether or not to calculate bounding boxes serverside
+    tilespecs : list[renderapi.tilespec.Tilespec]
+        list of tilespecs to upload
+    shared_transforms : list[renderapi.transform.Transform]
+        list of shared transforms to upload
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    bytes
+        content of server response
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + '/resolvedTiles'
+    qparams = {} if deriveData is None else {'deriveData': jbool(deriveData)}
+    logger.debug(request_url)
+    if resolved_tiles is None:
+        if tilespecs is None:
+            raise RenderError("need to pass resolved_tiles or tilespecs")
+        resolved_tiles = ResolvedTiles(tilespecs=tilespecs,
+                                       transformList=shared_transforms)
+    return await put_json(session, request_url, resolved_tiles, qparams)
+
+
+@renderaccess
+async def get_matches_within_group(matchCollection, groupId,
+                                   mergeCollections=None, owner=None,
+                                   host=None, port=None, session=None,
+                                   render=None, **kwargs):
+    """asynchronous :func:`renderapi.pointmatch.get_matches_within_group`
+
+    Parameters
+    ----------
+    matchCollection : str
+        matchCollection name
+    groupId : str
+        groupId to query
+    mergeCollections : :obj:`list` of :obj:`str` or None
+        other matchCollections to aggregate into answer
+    owner : unicode
+        matchCollection owner (fallback to render.DEFAULT_OWNER)
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    :obj:`list` of :obj:`dict`
+        list of matches (see matches definition)
+    """
+    request_url = format_baseurl(host, port) + \
+        "/owner/%s/matchCollection/%s/group/%s/matchesWithinGroup" % (
+            owner, matchCollection, groupId)
+    request_url = add_merge_collections(request_url, mergeCollections)
+    return await get_json(session, request_url)
+
+
+@renderaccess
+async def get_matches_outside_group(matchCollection, groupId,
+                                    mergeCollections=None, owner=None,
+                                    host=None, port=None, session=None,
+                                    render=None, **kwargs):
+    """asynchronous :func:`renderapi.pointmatch.get_matches_outside_group`
+
+    Parameters
+    ----------
+    matchCollection : str
+        matchCollection name
+    groupId : str
+        groupId to query
+    mergeCollections : :obj:`list` of :obj:`str` or None
+        other matchCollections to aggregate into answer
+    owner : unicode
+        matchCollection owner (fallback to render.DEFAULT_OWNER)
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    :obj:`list` of :obj:`dict`
+        list of matches (see matches definition)
+    """
+    request_url = format_baseurl(host, port) + \
+        "/owner/%s/matchCollection/%s/group/%s/matchesOutsideGroup" % (
+            owner, matchCollection, groupId)
+    request_url = add_merge_collections(request_url, mergeCollections)
+    return await get_json(session, request_url)
+
+
+@renderaccess
+async def import_matches(matchCollection, data, owner=None, host=None,
+                         port=None, session=None, render=None, **kwargs):
+    """asynchronous :func:`renderapi.pointmatch.import_matches`
+
+    Parameters
+    ----------
+    matchCollection : str
+        matchCollection name
+    data : :obj:`list` of :obj:`dict`
+        list of matches to import (see matches definition)
+    owner : unicode
+        matchCollection owner (fallback to render.DEFAULT_OWNER)
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    bytes
+        content of server response
+    """
+    request_url = format_baseurl(host, port) + \
+        "/owner/%s/matchCollection/%s/matches" % (owner, matchCollection)
+    logger.debug(request_url)
+    return await put_json(session, request_url, data)
+
+
+@renderaccess
+async def get_bb_image(stack, z, x, y, width, height, scale=1.0,
+                       channel=None, minIntensity=None, maxIntensity=None,
+                       binaryMask=None, filter=None,
+                       maxTileSpecsToRender=None, host=None, port=None,
+                       owner=None, project=None, img_format=None,
+                       session=None, render=None, **kwargs):
+    """asynchronous :func:`renderapi.image.get_bb_image`
+
+    Parameters
+    ----------
+    stack : str
+        name of render stack to get image from
+    z : float
+        z value to render
+    x : int
+        leftmost point of bounding rectangle
+    y : int
+        topmost pont of bounding rectangle
+    width : int
+        number of units @scale=1.0 to right (+x() of bounding box to render
+    height : int
+        number of units @scale=1.0 down (+y) of bounding box to render
+    scale : float
+        scale to render image at (default 1.0)
+    channel : str
+        channel name to render
+    binaryMask : bool
+        whether to treat maskimage as binary
+    maxTileSpecsToRender : int
+        max number of tilespecs to render
+    filter : bool
+        whether to use server side filtering
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    numpy.array
+        [N,M,:] array of image data from render
+
+    Raises
+    ------
+    RenderError
+        if the request fails or the response cannot be read as an image
+    """
+    try:
+        image_ext = IMAGE_FORMATS[img_format]
+    except KeyError as e:  # pragma: no cover
+        raise ValueError('{} is not a valid render image format!'.format(e))
+
+    request_url = format_preamble(
+        host, port, owner, project, stack) + \
+        "/z/%d/box/%d,%d,%d,%d,%f/%s" % (
+        z, x, y, width, height, scale, image_ext)
+    qparams = {}
+    if minIntensity is not None:
+        qparams['minIntensity'] = minIntensity
+    if maxIntensity is not None:
+        qparams['maxIntensity'] = maxIntensity
+    if binaryMask is not None:
+        qparams['binaryMask'] = jbool(binaryMask)
+    if filter is not None:
+        qparams['filter'] = jbool(filter)
+    if maxTileSpecsToRender is not None:
+        qparams['maxTileSpecsToRender'] = maxTileSpecsToRender
+    if channel is not None:
+        qparams['channels'] = channel
+
+    r = await _request(session, 'GET', request_url, params=qparams)
+    if r.status_code != 200:
+        record_call(_settings(session), 'GET', request_url, r, r.duration)
+        raise RenderError(
+            'request to {} returned error code {} with message {}'.format(
+                r.url, r.status_code, r.text))
+    start = default_timer()
+    try:
+        return np.asarray(Image.open(io.BytesIO(r.content)))
+    except Exception as e:
+        logger.error(e)
+        raise RenderError(r.text)
+    finally:
+        record_call(_settings(session), 'GET', request_url, r, r.duration,
+                    decode_time=default_timer() - start)
+
+
+@renderaccess
+async def world_to_local_coordinates_batch(stack, d, z, host=None,
+                                           port=None, owner=None,
+                                           project=None, session=None,
+                                           render=None, **kwargs):
+    """asynchronous
+    :func:`renderapi.coordinate.world_to_local_coordinates_batch`
+
+    Parameters
+    ----------
+    stack : str
+        stack to map coordinates
+    d : list[dict]
+        list of dictionary of world coordinates to map
+    z : float
+        z coordinate to map
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    list[list[dict]]
+        list of lists of dictionaries containing local positions
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + \
+        "/z/%s/world-to-local-coordinates" % (str(z))
+    return json_loads(await put_json(session, request_url, d))
+
+
+@renderaccess
+async def local_to_world_coordinates_batch(stack, d, z, host=None,
+                                           port=None, owner=None,
+                                           project=None, session=None,
+                                           render=None, **kwargs):
+    """asynchronous
+    :func:`renderapi.coordinate.local_to_world_coordinates_batch`
+
+    Parameters
+    ----------
+    stack : str
+        stack to map coordinates
+    d : list[dict]
+        list of dictionary of local coordinates to map
+    z : float
+        z coordinate to map from
+    render : renderapi.render.Render
+        render connect object
+    session : aiohttp.ClientSession
+        client session to connect with
+
+    Returns
+    -------
+    list[dict]
+        list of dictionaries containing world coordinates
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + \
+        "/z/%s/local-to-world-coordinates" % (str(z))
+    return json_loads(await put_json(session, request_url, d))
+
+
+__all__ = ['client_session', 'renderaccess',
+           'get_tile_specs_from_z', 'get_resolved_tiles_from_z',
+           'put_tilespecs', 'get_matches_within_group',
+           'get_matches_outside_group', 'import_matches', 'get_bb_image',
+           'world_to_local_coordinates_batch',
+           'local_to_world_coordinates_batch']
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+'''
+read-through cache of render responses for slow-changing
+stack metadata
+'''
+import collections
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from timeit import default_timer
+
+from .utils import NullHandler, json_dumps, json_loads, record_call
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 600
+DEFAULT_STATE_TTL = 30
+CACHEABLE_STATES = ('COMPLETE',)
+
+# os.replace is python 3.3+.  os.rename replaces existing files on posix,
+#   elsewhere on python 2 entries which are already on disk are kept.
+_replace = getattr(os, 'replace', os.rename)
+
+_stack_url_re = re.compile(
+    r'^(.*?/owner/[^/]+/project/[^/]+/stack/[^/?]+)')
+
+
+def stack_url(request_url):
+    """stack preamble of a request url
+
+    Parameters
+    ----------
+    request_url : str
+        url of request
+
+    Returns
+    -------
+    str or None
+        url of the stack the request refers to (as
+        :func:`renderapi.render.format_preamble`), or None
+        if the request does not refer to a stack
+    """
+    m = _stack_url_re.match(request_url)
+    return None if m is None else m.group(1)
+
+
+class ResponseCache(object):
+    """cache of json responses from render stack endpoints, keyed by
+    url and parameters.
+
+    Responses are only cached and served for stacks whose state is
+    COMPLETE.  The state of a stack is requested from render at most
+    every state_ttl seconds, and cached entries of a stack which is
+    found not to be COMPLETE are evicted.  Writes made through a
+    session with a cache evict the entries of the stack written to.
+
+    Attributes
+    ----------
+    max_entries : int
+        maximum number of responses held in memory
+    ttl : float or None
+        seconds after which cached responses expire (None for never)
+    state_ttl : float
+        seconds after which the state of a stack is requested again
+    directory : str or None
+        directory in which responses are also stored on disk
+        so that they can be shared between processes
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL,
+                 state_ttl=DEFAULT_STATE_TTL, directory=None):
+        """Initialize ResponseCache
+
+        Parameters
+        ----------
+        max_entries : int
+            maximum number of responses held in memory
+        ttl : float or None
+            seconds after which cached responses expire
+        state_ttl : float
+            seconds for which the state of a stack is trusted
+        directory : str, optional
+            directory in which to store responses on disk
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.state_ttl = state_ttl
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()
+        self._states = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # locks and in-memory entries are not shared between processes
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_entries'] = collections.OrderedDict()
+        state['_states'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(request_url, params=None):
+        """cache key for a request
+
+        Parameters
+        ----------
+        request_url : str
+            url of request
+        params : dict, optional
+            request parameters
+
+        Returns
+        -------
+        str
+            key identifying the request
+        """
+        if not params:
+            return request_url
+        return '{}?{}'.format(request_url, '&'.join(
+            '{}={}'.format(k, params[k]) for k in sorted(params)))
+
+    def _expiry(self):
+        return None if self.ttl is None else time.time() + self.ttl
+
+    def _disk_dir(self, scope):
+        return os.path.join(self.directory, hashlib.sha1(
+            scope.encode('utf-8')).hexdigest())
+
+    def _disk_path(self, scope, key):
+        return os.path.join(self._disk_dir(scope), hashlib.sha1(
+            key.encode('utf-8')).hexdigest())
+
+    def _disk_scopes(self):
+        """stack urls of the responses stored on disk"""
+        scopes = {}
+        try:
+            dirs = os.listdir(self.directory)
+        except (IOError, OSError):
+            return scopes
+        for d in dirs:
+            try:
+                with open(os.path.join(self.directory, d, 'scope')) as f:
+                    scopes[f.read()] = os.path.join(self.directory, d)
+            except (IOError, OSError):
+                pass
+        return scopes
+
+    def _read_disk(self, scope, key):
+        try:
+            with open(self._disk_path(scope, key), 'rb') as f:
+                header = json_loads(f.readline())
+                content = f.read()
+        except (IOError, OSError, ValueError):
+            return None
+        if header.get('key') != key:
+            return None
+        return header.get('expires'), content
+
+    def _write_disk(self, scope, key, expires, content):
+        d = self._disk_dir(scope)
+        try:
+            if not os.path.isdir(d):
+                os.makedirs(d)
+                with open(os.path.join(d, 'scope'), 'w') as f:
+                    f.write(scope)
+            # write atomically so that readers never see partial entries
+            fd, tmp = tempfile.mkstemp(dir=d)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_dumps({'key': key, 'expires': expires}))
+                f.write(b'\n')
+                f.write(content)
+            try:
+                _replace(tmp, self._disk_path(scope, key))
+            except OSError:
+                os.remove(tmp)
+                raise
+        except (IOError, OSError) as e:
+            logger.warning('cannot write cache entry for {}: {}'.format(
+                key, e))
+
+    def stack_state(self, session, scope):
+        """state of a stack, requested from render if the cached
+        state is older than state_ttl
+
+        Parameters
+        ----------
+        session : requests.Session
+            session with which to request stack metadata
+        scope : str
+            url of stack
+
+        Returns
+        -------
+        str or None
+            stack state, None if it could not be determined
+        """
+        now = time.time()
+        with self._lock:
+            state, checked = self._states.get(scope, (None, None))
+        if checked is not None and now - checked < self.state_ttl:
+            return state
+        start = default_timer()
+        r = session.get(scope)
+        record_call(session, 'GET', scope, r, default_timer() - start)
+        try:
+            state = (json_loads(r.content).get('state')
+                     if r.status_code == 200 else None)
+        except (ValueError, AttributeError):
+            state = None
+        with self._lock:
+            self._states[scope] = (state, now)
+        if state in CACHEABLE_STATES:
+            # the stack metadata response is itself cacheable
+            self._store(scope, self.make_key(scope), r.content)
+        else:
+            logger.debug('stack {} is {}, evicting cached responses'.format(
+                scope, state))
+            self.evict(scope, keep_state=True)
+        return state
+
+    def get(self, session, request_url, params=None):
+        """get a cached response
+
+        Parameters
+        ----------
+        session : requests.Session
+            session with which to check the state of the stack
+        request_url : str
+            url of request
+        params : dict, optional
+            request parameters
+
+        Returns
+        -------
+        bytes or None
+            cached response content or None if not cached
+        """
+        scope = stack_url(request_url)
+        if (scope is None or
+                self.stack_state(session, scope) not in CACHEABLE_STATES):
+            return None
+        key = self.make_key(request_url, params)
+        with self._lock:
+            # reinsert to mark as most recently used
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+        if entry is None and self.directory is not None:
+            entry = self._read_disk(scope, key)
+            if entry is not None:
+                self._store_memory(key, *entry)
+        if entry is not None and entry[0] is not None and (
+                entry[0] < time.time()):
+            with self._lock:
+                self._entries.pop(key, None)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[1]
+
+    def put(self, request_url, params, content):
+        """cache a response if its stack is known to be COMPLETE
+
+        Parameters
+        ----------
+        request_url : str
+            url of request
+        params : dict or None
+            request parameters
+        content : bytes
+            response content
+        """
+        scope = stack_url(request_url)
+        with self._lock:
+            state = self._states.get(scope, (None, None))[0]
+        if scope is not None and state in CACHEABLE_STATES:
+            self._store(scope, self.make_key(request_url, params), content)
+
+    def _store(self, scope, key, content):
+        expires = self._expiry()
+        self._store_memory(key, expires, content)
+        if self.directory is not None:
+            self._write_disk(scope, key, expires, content)
+
+    def _store_memory(self, key, expires, content):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, content)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, request_url, keep_state=False):
+        """evict cached responses affected by a request which
+        modifies render
+
+        Parameters
+        ----------
+        request_url : str
+            url of modifying request.  All responses for the same stack,
+            or with urls beginning with request_url if it does not refer
+            to a stack, are evicted.
+        keep_state : bool
+            whether to keep the cached state of the stack
+        """
+        scope = stack_url(request_url) or request_url
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(scope)]:
+                del self._entries[key]
+            if not keep_state:
+                for s in [s for s in self._states if s.startswith(scope)]:
+                    del self._states[s]
+        if self.directory is not None:
+            if stack_url(request_url) is not None:
+                shutil.rmtree(self._disk_dir(scope), ignore_errors=True)
+            else:
+                for s, d in self._disk_scopes().items():
+                    if s.startswith(scope):
+                        shutil.rmtree(d, ignore_errors=True)
+
+    def clear(self):
+        """remove all cached responses"""
+        with self._lock:
+            self._entries.clear()
+            self._states.clear()
+        if self.directory is not None:
+            for d in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, d),
+                              ignore_errors=True)
+
+
+__all__ = ['ResponseCache', 'stack_url']
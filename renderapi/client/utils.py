@@ -1,13 +1,12 @@
-from decorator import decorator
 import os
 
 from renderapi.errors import ClientScriptError
-from renderapi.utils import fitargspec
+from renderapi.utils import argspec_decorator
 from renderapi.render import RenderClient, Render
 
 
-@decorator
-def renderclientaccess(f, *args, **kwargs):
+@argspec_decorator
+def renderclientaccess(f, argspec, *args, **kwargs):
     """Decorator allowing functions asking for host, port, owner, project,
     client_script to default to a connection defined by :class:`RenderClient`
     object using its :func:`RenderClient.make_kwargs` method.
@@ -23,7 +22,7 @@ def renderclientaccess(f, *args, **kwargs):
     obj
         output of decorated function
     """
-    args, kwargs = fitargspec(f, args, kwargs)
+    args, kwargs = argspec(args, kwargs)
     render = kwargs.get('render')
     if render is not None:
         if not isinstance(render, RenderClient):
@@ -3,7 +3,8 @@
 coordinate mapping functions for render api
 '''
 from .render import format_preamble, renderaccess
-from .utils import NullHandler, renderdumps, renderdump, get_json
+from .utils import (NullHandler, renderdump, get_json, json_dumps,
+                    record_call)
 from .client import coordinateClient
 from .errors import RenderError
 import requests
@@ -11,6 +12,7 @@ import json
 import numpy as np
 import logging
 import tempfile
+from timeit import default_timer
 import os
 
 logger = logging.getLogger(__name__)
@@ -166,9 +168,18 @@ def world_to_local_coordinates_batch(stack, d, z, host=None,
     request_url = format_preamble(
         host, port, owner, project, stack) + \
         "/z/%s/world-to-local-coordinates" % (str(z))
-    r = session.put(request_url, data=renderdumps(d),
+    payload = json_dumps(d)
+    start = default_timer()
+    r = session.put(request_url, data=payload,
                     headers={"content-type": "application/json"})
-    return r.json()
+    duration = default_timer() - start
+    start = default_timer()
+    try:
+        return r.json()
+    finally:
+        record_call(session, 'PUT', request_url, r, duration,
+                    bytes_sent=len(payload),
+                    decode_time=default_timer() - start)
 
 
 @renderaccess
@@ -220,14 +231,22 @@ def local_to_world_coordinates_batch(stack, d, z, host=None,
     request_url = format_preamble(
         host, port, owner, project, stack) + \
         "/z/%s/local-to-world-coordinates" % (str(z))
-    r = session.put(request_url, data=renderdumps(d),
+    payload = json_dumps(d)
+    start = default_timer()
+    r = session.put(request_url, data=payload,
                     headers={"content-type": "application/json"})
+    duration = default_timer() - start
+    start = default_timer()
     try:
         return r.json()
     except Exception as e:
         logger.error(e)
         logger.error(r.text)
         raise RenderError(r.text)
+    finally:
+        record_call(session, 'PUT', request_url, r, duration,
+                    bytes_sent=len(payload),
+                    decode_time=default_timer() - start)
 
 
 def package_point_match_data_into_json(dataarray, tileId,
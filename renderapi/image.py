@@ -1,13 +1,14 @@
 #!/usr/bin/env python
 
 import io
+from timeit import default_timer
 import requests
 from PIL import Image
 import numpy as np
 import logging
 from .render import format_preamble, format_baseurl, renderaccess
 from .errors import RenderError
-from .utils import NullHandler, jbool, get_json, put_json
+from .utils import NullHandler, jbool, get_json, put_json, record_call
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
@@ -131,7 +132,10 @@ def get_bb_image(stack, z, x, y, width, height, scale=1.0,
     if channel is not None:
         qparams.update({'channels': channel})
 
+    start = default_timer()
     r = session.get(request_url, params=qparams)
+    duration = default_timer() - start
+    start = default_timer()
     try:
         image = np.asarray(Image.open(io.BytesIO(r.content)))
         return image
@@ -139,6 +143,9 @@ def get_bb_image(stack, z, x, y, width, height, scale=1.0,
         logger.error(e)
         logger.error(r.text)
         return RenderError(r.text)
+    finally:
+        record_call(session, 'GET', request_url, r, duration,
+                    decode_time=default_timer() - start)
 
 
 @renderaccess
@@ -256,7 +263,10 @@ def get_tile_image_data(stack, tileId, channel=None, normalizeForMatching=True,
         qparams['maxIntensity'] = maxIntensity
     logger.debug(request_url)
 
+    start = default_timer()
     r = session.get(request_url, params=qparams)
+    duration = default_timer() - start
+    start = default_timer()
     try:
         img = Image.open(io.BytesIO(r.content))
         array = np.asarray(img)
@@ -265,6 +275,9 @@ def get_tile_image_data(stack, tileId, channel=None, normalizeForMatching=True,
         logger.error(e)
         logger.error(r.text)
         return RenderError(r.text)
+    finally:
+        record_call(session, 'GET', request_url, r, duration,
+                    decode_time=default_timer() - start)
 
 
 @renderaccess
@@ -364,8 +377,15 @@ def get_section_image(stack, z, scale=1.0, channel=None,
     if maxIntensity is not None:
         qparams['maxIntensity'] = maxIntensity
 
+    start = default_timer()
     r = session.get(request_url, params=qparams)
-    return np.asarray(Image.open(io.BytesIO(r.content)))
+    duration = default_timer() - start
+    start = default_timer()
+    try:
+        return np.asarray(Image.open(io.BytesIO(r.content)))
+    finally:
+        record_call(session, 'GET', request_url, r, duration,
+                    decode_time=default_timer() - start)
 
 
 @renderaccess
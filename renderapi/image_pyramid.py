@@ -1,14 +1,23 @@
 from collections.abc import MutableMapping
 from .errors import RenderError
 import logging
-from .utils import NullHandler
+from .utils import NullHandler, _intern
 import warnings
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
-class MipMap:
+def _split_url(url):
+    """split a url into an interned directory prefix, which is
+    stored once for all urls in the same directory, and a file name"""
+    if url is None:
+        return None, None
+    i = url.rfind('/') + 1
+    return _intern(url[:i]), url[i:]
+
+
+class MipMap(object):
     """MipMap class to represent a image and its mask
 
     Attributes
@@ -24,6 +33,28 @@ class MipMap:
         self.imageUrl = imageUrl
         self.maskUrl = maskUrl
 
+    @property
+    def imageUrl(self):
+        """uri corresponding to image"""
+        if self._imageName is None:
+            return None
+        return self._imagePrefix + self._imageName
+
+    @imageUrl.setter
+    def imageUrl(self, url):
+        self._imagePrefix, self._imageName = _split_url(url)
+
+    @property
+    def maskUrl(self):
+        """uri corresponding to mask"""
+        if self._maskName is None:
+            return None
+        return self._maskPrefix + self._maskName
+
+    @maskUrl.setter
+    def maskUrl(self, url):
+        self._maskPrefix, self._maskName = _split_url(url)
+
     def to_dict(self):
         """
         Returns
@@ -1,3 +1,6 @@
+from .utils import _intern
+
+
 class Layout:
     """Layout class to describe acquisition settings
 
@@ -101,9 +104,10 @@ class Layout:
             dictionary to use to update
         """
         if d is not None:
-            self.sectionId = d.get('sectionId')
-            self.cameraId = d.get('camera')
-            self.scopeId = d.get('temca')
+            # identifiers shared by the tiles of a section or scope
+            self.sectionId = _intern(d.get('sectionId'))
+            self.cameraId = _intern(d.get('camera'))
+            self.scopeId = _intern(d.get('temca'))
             self.imageRow = d.get('imageRow')
             self.imageCol = d.get('imageCol')
             self.stageX = d.get('stageX')
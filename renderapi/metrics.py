@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+'''
+aggregation of per-endpoint latency and payload metrics of the
+http calls made to render
+'''
+import atexit
+import bisect
+import collections
+import json
+import logging
+import sys
+import threading
+
+from .utils import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# upper bounds in seconds of latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1., 2.5, 5., 10., 30., 60.)
+
+
+class Histogram(object):
+    """histogram of values in fixed buckets
+
+    Attributes
+    ----------
+    bounds : :obj:`list` of :obj:`float`
+        upper bounds of the buckets.  Values larger than the last bound
+        are counted in an overflow bucket.
+    counts : :obj:`list` of :obj:`int`
+        number of values in each bucket
+    count : int
+        number of values
+    total : float
+        sum of values
+    min : float or None
+        smallest value
+    max : float or None
+        largest value
+    """
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """add a value to the histogram
+
+        Parameters
+        ----------
+        value : float
+            value to add
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """approximate quantile of the values
+
+        Parameters
+        ----------
+        q : float
+            quantile in [0, 1]
+
+        Returns
+        -------
+        float or None
+            upper bound of the bucket containing the quantile (the
+            largest value for the overflow bucket), None if empty
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return (min(self.bounds[i], self.max)
+                        if i < len(self.bounds) else self.max)
+        return self.max
+
+    def to_dict(self):
+        """summary of the histogram
+
+        Returns
+        -------
+        dict
+            count, total, min, max, mean, p50, p90, p99, bounds and counts
+        """
+        return {'count': self.count, 'total': self.total,
+                'min': self.min, 'max': self.max, 'mean': self.mean,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99),
+                'bounds': self.bounds, 'counts': self.counts}
+
+    def format(self, width=40):
+        """text rendering of the non-empty buckets
+
+        Parameters
+        ----------
+        width : int
+            width of the largest bar in characters
+
+        Returns
+        -------
+        :obj:`list` of :obj:`str`
+            one line per bucket
+        """
+        if not self.count:
+            return []
+        nonzero = [i for i, c in enumerate(self.counts) if c]
+        peak = max(self.counts)
+        lines = []
+        for i in range(nonzero[0], nonzero[-1] + 1):
+            label = ('<= {:g}s'.format(self.bounds[i])
+                     if i < len(self.bounds)
+                     else '>  {:g}s'.format(self.bounds[-1]))
+            bar = '#' * int(round(width * self.counts[i] / float(peak)))
+            lines.append('{:>10} {:>7} {}'.format(label, self.counts[i], bar))
+        return lines
+
+
+class EndpointMetrics(object):
+    """metrics of the calls made to one endpoint
+
+    Attributes
+    ----------
+    count : int
+        number of calls
+    statuses : :class:`collections.Counter`
+        number of calls by response status
+    bytes_sent : int
+        total size of request bodies
+    bytes_received : int
+        total size of response bodies
+    retries : int
+        total number of retries
+    duration : :class:`Histogram`
+        seconds until the response body was read
+    ttfb : :class:`Histogram`
+        seconds until the response headers were received
+    decode_time : :class:`Histogram`
+        seconds spent decoding response bodies
+    """
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.count = 0
+        self.statuses = collections.Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.duration = Histogram(bounds)
+        self.ttfb = Histogram(bounds)
+        self.decode_time = Histogram(bounds)
+
+    def add(self, record):
+        """add a call record
+
+        Parameters
+        ----------
+        record : dict
+            call record (see :func:`renderapi.utils.record_call`)
+        """
+        self.count += 1
+        self.statuses[record['status']] += 1
+        self.bytes_sent += record['bytes_sent']
+        self.bytes_received += record['bytes_received']
+        self.retries += record['retries']
+        self.duration.add(record['duration'])
+        self.ttfb.add(record['ttfb'])
+        if record['decode_time'] is not None:
+            self.decode_time.add(record['decode_time'])
+
+    def to_dict(self):
+        """summary of the metrics
+
+        Returns
+        -------
+        dict
+            json serializable summary
+        """
+        return {'count': self.count,
+                'statuses': {str(k): v for k, v in self.statuses.items()},
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'retries': self.retries,
+                'duration': self.duration.to_dict(),
+                'ttfb': self.ttfb.to_dict(),
+                'decode_time': self.decode_time.to_dict()}
+
+
+class CallMetrics(object):
+    """call hook aggregating latency and payload metrics per endpoint.
+
+    Add an instance to the call hooks of a
+    :class:`renderapi.render.Render` object::
+
+        metrics = CallMetrics(export_path='render_calls.json')
+        render.add_call_hook(metrics)
+        ...
+        metrics.report()
+
+    Attributes
+    ----------
+    bounds : :obj:`list` of :obj:`float`
+        upper bounds of histogram buckets in seconds
+    endpoints : dict
+        :class:`EndpointMetrics` keyed by (method, endpoint template)
+    """
+    def __init__(self, bounds=DEFAULT_BUCKETS, export_path=None):
+        """Initialize CallMetrics
+
+        Parameters
+        ----------
+        bounds : :obj:`list` of :obj:`float`
+            upper bounds of histogram buckets in seconds
+        export_path : str, optional
+            json file to which to export the metrics at process exit
+        """
+        self.bounds = list(bounds)
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        if export_path is not None:
+            self.export_at_exit(export_path)
+
+    def __call__(self, record):
+        key = (record['method'], record['endpoint'])
+        with self._lock:
+            metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics(self.bounds)
+            metrics.add(record)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """discard all aggregated metrics"""
+        with self._lock:
+            self.endpoints = {}
+
+    def to_dict(self):
+        """summary of the metrics of all endpoints
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            summaries with method and endpoint keys, in order
+            of decreasing total duration
+        """
+        with self._lock:
+            items = sorted(self.endpoints.items(),
+                           key=lambda kv: -kv[1].duration.total)
+            return [dict(m.to_dict(), method=method, endpoint=endpoint)
+                    for (method, endpoint), m in items]
+
+    def report(self, file=None, histograms=True):
+        """print a summary and latency histograms of each endpoint
+
+        Parameters
+        ----------
+        file : file-like, optional
+            stream to print to (default sys.stdout)
+        histograms : bool
+            whether to print latency histograms
+        """
+        file = sys.stdout if file is None else file
+        for d in self.to_dict():
+            duration = d['duration']
+            file.write('{} {}\n'.format(d['method'], d['endpoint']))
+            file.write('  calls {}  statuses {}  retries {}  sent {} B  '
+                       'received {} B\n'.format(
+                           d['count'], d['statuses'], d['retries'],
+                           d['bytes_sent'], d['bytes_received']))
+            file.write('  duration total {:.3f}s  mean {:.4f}s  p50 {:.4f}s  '
+                       'p90 {:.4f}s  max {:.4f}s  mean ttfb {:.4f}s\n'.format(
+                           duration['total'], duration['mean'],
+                           duration['p50'], duration['p90'],
+                           duration['max'], d['ttfb']['mean']))
+            if d['decode_time']['count']:
+                file.write('  decode total {:.3f}s  mean {:.4f}s\n'.format(
+                    d['decode_time']['total'], d['decode_time']['mean']))
+            if histograms:
+                with self._lock:
+                    h = self.endpoints[(d['method'], d['endpoint'])].duration
+                    lines = h.format()
+                for line in lines:
+                    file.write('  ' + line + '\n')
+
+    def export_json(self, path):
+        """write the summary of all endpoints to a json file
+
+        Parameters
+        ----------
+        path : str
+            output json file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_at_exit(self, path):
+        """export the metrics to a json file when the process exits
+
+        Parameters
+        ----------
+        path : str
+            output json file
+        """
+        def export():
+            try:
+                self.export_json(path)
+            except (IOError, OSError) as e:
+                logger.warning('cannot export call metrics to {}: {}'.format(
+                    path, e))
+        atexit.register(export)
+
+
+__all__ = ['CallMetrics', 'EndpointMetrics', 'Histogram']
@@ -5,7 +5,8 @@ Point Match APIs
 import requests
 import logging
 from .render import format_baseurl, renderaccess
-from .utils import NullHandler, get_json, put_json, rest_delete
+from .utils import (NullHandler, get_json, get_json_iter, put_json,
+                    rest_delete)
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
@@ -281,6 +282,98 @@ def get_matches_within_group(matchCollection, groupId, mergeCollections=None,
     return get_json(session, request_url, stream=stream)
 
 
+@renderaccess
+def iter_matches_outside_group(matchCollection, groupId,
+                               mergeCollections=None, owner=None,
+                               host=None, port=None,
+                               session=requests.session(),
+                               render=None, **kwargs):
+    """iterate over the matches outside a groupId in a matchCollection,
+    decoding them one at a time as the response is streamed.
+    yields all matches where pGroupId == groupId and qGroupId != groupId
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    matchCollection : str
+        matchCollection name
+    groupId : str
+        groupId to query
+    mergeCollections : :obj:`list` of :obj:`str` or None
+        other matchCollections to aggregate into answer
+    owner : unicode
+        matchCollection owner (fallback to render.DEFAULT_OWNER)
+        (note match owner != stack owner always)
+    render : Render
+        Render connection object
+    session : requests.session.Session
+        requests session
+
+    Returns
+    -------
+    generator
+        generator of matches (see matches definition)
+
+    Raises
+    ------
+    RenderError
+        if cannot get a reponse from server
+    """
+    request_url = format_baseurl(host, port) + \
+        "/owner/%s/matchCollection/%s/group/%s/matchesOutsideGroup" % (
+            owner, matchCollection, groupId)
+    request_url = add_merge_collections(request_url, mergeCollections)
+
+    return get_json_iter(session, request_url)
+
+
+@renderaccess
+def iter_matches_within_group(matchCollection, groupId,
+                              mergeCollections=None, owner=None,
+                              host=None, port=None,
+                              session=requests.session(),
+                              render=None, **kwargs):
+    """iterate over the matches within a groupId in a matchCollection,
+    decoding them one at a time as the response is streamed.
+    yields all matches where pGroupId == groupId and qGroupId == groupId
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    matchCollection : str
+        matchCollection name
+    groupId : str
+        groupId to query
+    mergeCollections : :obj:`list` of :obj:`str` or None
+        other matchCollections to aggregate into answer
+    owner : unicode
+        matchCollection owner (fallback to render.DEFAULT_OWNER)
+        (note match owner != stack owner always)
+    render : Render
+        Render connection object
+    session : requests.session.Session
+        requests session
+
+    Returns
+    -------
+    generator
+        generator of matches (see matches definition)
+
+    Raises
+    ------
+    RenderError
+        if cannot get a reponse from server
+    """
+    request_url = format_baseurl(host, port) + \
+        "/owner/%s/matchCollection/%s/group/%s/matchesWithinGroup" % (
+            owner, matchCollection, groupId)
+    request_url = add_merge_collections(request_url, mergeCollections)
+
+    return get_json_iter(session, request_url)
+
+
 @renderaccess
 def get_matches_from_group_to_group(matchCollection, pgroup, qgroup,
                                     mergeCollections=None, stream=True,
@@ -1,15 +1,19 @@
 #!/usr/bin/env python
 import logging
 import os
+import threading
 import requests
-from .utils import defaultifNone, NullHandler, fitargspec, get_json
+from .utils import (defaultifNone, NullHandler, get_json,
+                    argspec_decorator)
 from .errors import ClientScriptError
-from decorator import decorator
+from .session import make_session
 from six.moves import input as raw_input
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
 
+_session_lock = threading.Lock()
+
 
 class Render(object):
     """Render object to store connection settings for render server.
@@ -30,17 +34,43 @@ class Render(object):
         render project to which make_kwargs will default
     DEFAULT_CLIENT_SCRIPTS : str
         render client scripts path to which make_kwargs will default
+    session_kwargs : dict
+        keyword arguments used to create this object's
+        :class:`renderapi.session.RenderSession`
 
     """
 
     def __init__(self, host=None, port=None, owner=None, project=None,
-                 client_scripts=None, **kwargs):
+                 client_scripts=None, session=None, pool_connections=None,
+                 pool_maxsize=None, pool_block=False, keep_alive=True,
+                 compress_threshold=None, compress_level=None,
+                 accept_encoding=None, max_retries=0, backoff_factor=None,
+                 retry_jitter=None, retry_statuses=None, cache=None,
+                 call_hooks=None, **kwargs):
         self.DEFAULT_HOST = host
         self.DEFAULT_PORT = port
         self.DEFAULT_PROJECT = project
         self.DEFAULT_OWNER = owner
         self.DEFAULT_CLIENT_SCRIPTS = client_scripts
 
+        self.session_kwargs = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+            'keep_alive': keep_alive,
+            'compress_threshold': compress_threshold,
+            'compress_level': compress_level,
+            'accept_encoding': accept_encoding,
+            'max_retries': max_retries,
+            'backoff_factor': backoff_factor,
+            'retry_jitter': retry_jitter,
+            'retry_statuses': retry_statuses,
+            'cache': cache,
+            'call_hooks': list(call_hooks or [])}
+        self._owns_session = session is None
+        self._session = session
+        self._session_pid = os.getpid()
+
         logger.debug('Render object created with '
                      'host={h}, port={p}, project={pr}, '
                      'owner={o}, scripts={s}'.format(
@@ -48,6 +78,69 @@ class Render(object):
                          pr=self.DEFAULT_PROJECT, o=self.DEFAULT_OWNER,
                          s=self.DEFAULT_CLIENT_SCRIPTS))
 
+    @property
+    def session(self):
+        """http session shared by all calls made with this object.
+        Created on first access from :attr:`session_kwargs` and recreated
+        in processes forked after its creation.
+
+        Returns
+        -------
+        requests.Session
+            session used by :func:`renderaccess` decorated functions
+        """
+        if self._owns_session and (
+                self._session is None or self._session_pid != os.getpid()):
+            with _session_lock:
+                if (self._session is None or
+                        self._session_pid != os.getpid()):
+                    self._session = make_session(**self.session_kwargs)
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._owns_session:
+            # connection pools are not shared between processes
+            state['_session'] = None
+        # call hooks aggregate in the process in which they were added
+        state['session_kwargs'] = dict(self.session_kwargs, call_hooks=[])
+        return state
+
+    def add_call_hook(self, hook):
+        """add a function to be called with a record of every http
+        call made with this object's session
+
+        Parameters
+        ----------
+        hook : callable
+            function taking a call record dict
+            (see :func:`renderapi.utils.record_call`), e.g. a
+            :class:`renderapi.metrics.CallMetrics`
+        """
+        hooks = self.session_kwargs['call_hooks']
+        hooks.append(hook)
+        session_hooks = getattr(self.session, 'call_hooks', None)
+        if session_hooks is None:
+            self.session.call_hooks = [hook]
+        elif session_hooks is not hooks:
+            session_hooks.append(hook)
+
+    def remove_call_hook(self, hook):
+        """remove a function added by :meth:`add_call_hook`
+
+        Parameters
+        ----------
+        hook : callable
+            hook to remove
+        """
+        hooks = self.session_kwargs['call_hooks']
+        if hook in hooks:
+            hooks.remove(hook)
+        session_hooks = getattr(self.session, 'call_hooks', None)
+        if session_hooks is not None and hook in session_hooks:
+            session_hooks.remove(hook)
+
     @property
     def DEFAULT_KWARGS(self):
         """"kwargs to which the render object falls back.  Depends on:
@@ -235,7 +328,12 @@ class RenderClient(Render):
 
 def connect(host=None, port=None, owner=None, project=None,
             client_scripts=None, client_script=None, memGB=None,
-            force_http=True, validate_client=True, web_only=False, **kwargs):
+            force_http=True, validate_client=True, web_only=False,
+            session=None, pool_connections=None, pool_maxsize=None,
+            pool_block=False, keep_alive=True, compress_threshold=None,
+            compress_level=None, accept_encoding=None, max_retries=0,
+            backoff_factor=None, retry_jitter=None, retry_statuses=None,
+            cache=None, call_hooks=None, **kwargs):
     """helper function to create a :class:`Render` instance, or
     :class:`RenderClient` if sufficent parameters are provided.
     Will default to using environment variables if not specified in call,
@@ -277,6 +375,47 @@ def connect(host=None, port=None, owner=None, project=None,
     web_only : bool
         whether to check environment variables/prompt user
         for client_scripts directory if not in arguments
+    session : requests.Session, optional
+        session to use for all requests made through the returned object.
+        If None, a :class:`renderapi.session.RenderSession` is created
+        from the pool parameters below.
+    pool_connections : int, optional
+        number of per-host connection pools to cache
+    pool_maxsize : int, optional
+        maximum number of connections to keep alive per host.
+        Should be at least the number of threads making requests.
+    pool_block : bool
+        whether to block when pool_maxsize connections are in use
+        rather than opening connections which are not reused
+    keep_alive : bool
+        whether to keep connections alive between requests
+    compress_threshold : int, optional
+        size in bytes above which json request bodies are uploaded
+        gzip compressed.  If None, request bodies are not compressed.
+    compress_level : int, optional
+        gzip compression level for request bodies
+    accept_encoding : str, optional
+        Accept-Encoding header to send to request compressed responses
+    max_retries : int
+        maximum number of times to retry a request which fails to
+        connect or, for idempotent methods (not POST), returns a status
+        in retry_statuses.  Default 0 does not retry.
+    backoff_factor : float, optional
+        seconds to wait before the second retry, doubling
+        with each further retry
+    retry_jitter : float, optional
+        fraction by which waits between retries are randomized
+    retry_statuses : :obj:`list` of :obj:`int`, optional
+        response status codes to retry
+        (default :data:`renderapi.session.DEFAULT_RETRY_STATUSES`)
+    cache : :class:`renderapi.cache.ResponseCache`, optional
+        read-through cache for stack metadata requests such as
+        :func:`renderapi.stack.get_z_values_for_stack`, which are
+        served from the cache while the stack is COMPLETE
+    call_hooks : :obj:`list` of callable, optional
+        functions called with a record of every http call, such as
+        :class:`renderapi.metrics.CallMetrics`
+        (see :meth:`Render.add_call_hook`)
 
     Returns
     -------
@@ -356,32 +495,52 @@ def connect(host=None, port=None, owner=None, project=None,
         else:
             memGB = str(os.environ['RENDER_CLIENT_HEAP'])
 
+    session_kwargs = {'session': session,
+                      'pool_connections': pool_connections,
+                      'pool_maxsize': pool_maxsize,
+                      'pool_block': pool_block,
+                      'keep_alive': keep_alive,
+                      'compress_threshold': compress_threshold,
+                      'compress_level': compress_level,
+                      'accept_encoding': accept_encoding,
+                      'max_retries': max_retries,
+                      'backoff_factor': backoff_factor,
+                      'retry_jitter': retry_jitter,
+                      'retry_statuses': retry_statuses,
+                      'cache': cache,
+                      'call_hooks': call_hooks}
     try:
         return RenderClient(client_script=client_script, memGB=memGB,
                             host=host, port=port,
                             owner=owner, project=project,
                             client_scripts=client_scripts,
-                            validate_client=validate_client)
+                            validate_client=validate_client,
+                            **session_kwargs)
     except ClientScriptError as e:
         logger.info(e)
         logger.warning(
             'Could not initiate render Client -- falling back to web')
         return Render(host=host, port=port, owner=owner, project=project,
-                      client_scripts=client_scripts)
+                      client_scripts=client_scripts, **session_kwargs)
 
 
-@decorator
-def renderaccess(f, *args, **kwargs):
+@argspec_decorator
+def renderaccess(f, argspec, *args, **kwargs):
     """Decorator allowing functions asking for host, port, owner, project
     to default to a connection defined by a :class:`Render` object
     using its :func:`RenderClient.make_kwargs` method.
 
     You can if you wish specify any of the arguments, in which case they
     will not be filled in by the default values, but you don't have to.
+    Functions accepting a session will use the :attr:`Render.session`
+    of the render object unless a session is specified.
 
     As such, the documentation omits describing the parameters which are
     natural to expect will be filled in by the renderaccess decorator.
 
+    The argument specification of the decorated function is
+    inspected once at decoration time.
+
     Parameters
     ----------
     f : func
@@ -396,11 +555,14 @@ def renderaccess(f, *args, **kwargs):
     >>> render = renderapi.render.connect('server',8080,'me','my_project')
     >>> stacks = renderapi.render.get_stacks_by_owner_project(render=render)
     """
-    args, kwargs = fitargspec(f, args, kwargs)
+    args, kwargs = argspec(args, kwargs)
     render = kwargs.get('render')
     if render is not None:
         if isinstance(render, Render):
-            return f(*args, **render.make_kwargs(**kwargs))
+            kwargs = render.make_kwargs(**kwargs)
+            if _uses_default_session(argspec, kwargs):
+                kwargs['session'] = render.session
+            return f(*args, **kwargs)
         else:
             raise ValueError(
                 'invalid Render object type {} specified!'.format(
@@ -409,6 +571,29 @@ def renderaccess(f, *args, **kwargs):
         return f(*args, **kwargs)
 
 
+def _uses_default_session(argspec, kwargs):
+    """check whether a call to a function would fall back
+    to its default session
+
+    Parameters
+    ----------
+    argspec : renderapi.utils.ArgSpecFitter
+        argspec of function which may take a session keyword argument
+    kwargs : dict
+        keyword arguments the function will be called with
+
+    Returns
+    -------
+    bool
+        True if the function accepts a session which
+        was not specified in kwargs
+    """
+    if 'session' not in argspec.defaults:
+        return argspec.varkw is not None and 'session' not in kwargs
+    default_session = argspec.defaults['session']
+    return kwargs.get('session', default_session) is default_session
+
+
 def format_baseurl(host, port):
     """format host and port to a standard template render-ws url
 
@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 from .tilespec import TileSpec
 from .transform import load_transform_json
-from .utils import NullHandler, put_json, jbool, get_json
+from .utils import NullHandler, put_json, jbool, get_json, iter_concurrent
 from .render import format_preamble, renderaccess
+from .stack import get_z_values_for_stack
 from .errors import RenderError
 import logging
 import requests
@@ -153,3 +154,54 @@ def get_resolved_tiles_from_z(stack, z, host=None, port=None,
     logger.debug(request_url)
     d = get_json(session, request_url)
     return ResolvedTiles(json=d)
+
+
+@renderaccess
+def iter_resolved_tiles_from_stack(stack, zValues=None, max_workers=8,
+                                   max_pending=None, ordered=True,
+                                   host=None, port=None, owner=None,
+                                   project=None, session=requests.session(),
+                                   render=None, **kwargs):
+    """iterate over the ResolvedTiles of a stack one z at a time,
+    fetching sections concurrently
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    zValues : :obj:`list` of :obj:`float`, optional
+        z values to get (default all z values in stack)
+    max_workers : int
+        number of sections to request concurrently
+    max_pending : int, optional
+        maximum number of sections fetched ahead of the
+        consumer (default 2 * max_workers)
+    ordered : bool
+        whether to yield sections in the order of zValues rather
+        than as they arrive
+    render : renderapi.render.Render
+        render connect object
+    session : requests.sessions.Session
+        sessions object to connect with
+
+    Yields
+    ------
+    tuple
+        (z, :obj:`ResolvedTiles`) for each section
+    """
+    if zValues is None:
+        zValues = get_z_values_for_stack(
+            stack, host=host, port=port, owner=owner, project=project,
+            session=session)
+
+    def get_section(z):
+        return get_resolved_tiles_from_z(
+            stack, z, host=host, port=port, owner=owner, project=project,
+            session=session)
+
+    for z, resolved_tiles in iter_concurrent(
+            get_section, zValues, max_workers=max_workers,
+            max_pending=max_pending, ordered=ordered):
+        yield z, resolved_tiles
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+'''
+configurable http sessions for communicating with render
+'''
+import logging
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .utils import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 100
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_ACCEPT_ENCODING = 'gzip, deflate'
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_RETRY_JITTER = 0.5
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# POST is not idempotent and so is only retried on connection errors
+IDEMPOTENT_METHODS = frozenset(
+    ['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'])
+
+
+class RenderRetry(Retry):
+    """:class:`urllib3.util.retry.Retry` with exponential backoff
+    randomized by a jitter fraction so that many clients retrying
+    after the same failure do not retry in lockstep.
+
+    Attributes
+    ----------
+    jitter : float
+        fraction by which each backoff time is randomly
+        lengthened or shortened
+    """
+    def __init__(self, *args, **kwargs):
+        self.jitter = kwargs.pop('jitter', 0)
+        super(RenderRetry, self).__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super(RenderRetry, self).new(**kwargs)
+        retry.jitter = self.jitter
+        return retry
+
+    def get_backoff_time(self):
+        """backoff time with jitter applied
+
+        Returns
+        -------
+        float
+            seconds to sleep before the next attempt
+        """
+        backoff = super(RenderRetry, self).get_backoff_time()
+        if backoff and self.jitter:
+            backoff *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(backoff, 0)
+
+
+def make_retry(max_retries, backoff_factor=None, jitter=None,
+               status_forcelist=None):
+    """create a retry policy for idempotent requests
+
+    Parameters
+    ----------
+    max_retries : int
+        maximum number of retries of a request
+    backoff_factor : float
+        seconds to sleep before the second retry, doubling
+        with each retry thereafter (default DEFAULT_BACKOFF_FACTOR)
+    jitter : float
+        fraction by which backoff times are randomized
+        (default DEFAULT_RETRY_JITTER)
+    status_forcelist : :obj:`list` of :obj:`int`
+        response status codes to retry
+        (default DEFAULT_RETRY_STATUSES)
+
+    Returns
+    -------
+    RenderRetry
+        retry policy
+    """
+    return RenderRetry(
+        total=max_retries,
+        backoff_factor=(DEFAULT_BACKOFF_FACTOR if backoff_factor is None
+                        else backoff_factor),
+        jitter=DEFAULT_RETRY_JITTER if jitter is None else jitter,
+        status_forcelist=(DEFAULT_RETRY_STATUSES if status_forcelist is None
+                          else status_forcelist),
+        allowed_methods=IDEMPOTENT_METHODS,
+        # return the last response so callers raise a RenderError
+        raise_on_status=False)
+
+
+class RenderSession(requests.Session):
+    """:class:`requests.Session` with a connection pool sized for
+    many concurrent requests to a small number of render hosts.
+
+    A single RenderSession is intended to be shared by all threads
+    making requests through a :class:`renderapi.render.Render` object.
+    Connections are checked out of the urllib3 pool per request, so
+    threads do not contend for a connection beyond pool_maxsize.
+
+    Attributes
+    ----------
+    pool_connections : int
+        number of per-host connection pools to cache
+    pool_maxsize : int
+        maximum number of connections kept alive per host
+    pool_block : bool
+        whether to block when no free connection is available rather
+        than opening a connection which will not be returned to the pool
+    keep_alive : bool
+        whether to ask the server to keep connections alive
+    compress_threshold : int or None
+        size in bytes above which request bodies sent by
+        :func:`renderapi.utils.put_json` and
+        :func:`renderapi.utils.post_json` are gzip compressed.
+        None disables compression.
+    compress_level : int
+        gzip compression level of request bodies
+    accept_encoding : str
+        Accept-Encoding header to send with requests
+    max_retries : int
+        maximum number of retries of failed requests.  Requests with
+        retryable status codes are only retried for idempotent methods.
+    backoff_factor : float or None
+        base of exponential backoff between retries in seconds
+    retry_jitter : float or None
+        fraction by which backoff times are randomized
+    retry_statuses : :obj:`list` of :obj:`int` or None
+        response status codes to retry
+    cache : :class:`renderapi.cache.ResponseCache` or None
+        cache of stack metadata responses
+    call_hooks : :obj:`list` of callable
+        functions called with a record of every call made through
+        :mod:`renderapi.utils` (see :func:`renderapi.utils.record_call`).
+        Hooks are not pickled with the session.
+    """
+
+    __attrs__ = requests.Session.__attrs__ + [
+        'pool_connections', 'pool_maxsize', 'pool_block', 'keep_alive',
+        'compress_threshold', 'compress_level', 'accept_encoding',
+        'max_retries', 'backoff_factor', 'retry_jitter', 'retry_statuses',
+        'cache']
+
+    def __init__(self, pool_connections=None, pool_maxsize=None,
+                 pool_block=False, keep_alive=True, compress_threshold=None,
+                 compress_level=None, accept_encoding=None, max_retries=0,
+                 backoff_factor=None, retry_jitter=None,
+                 retry_statuses=None, cache=None, call_hooks=None):
+        """Initialize RenderSession
+
+        Parameters
+        ----------
+        pool_connections : int
+            number of per-host connection pools to cache
+            (default DEFAULT_POOL_CONNECTIONS)
+        pool_maxsize : int
+            maximum number of connections kept alive per host
+            (default DEFAULT_POOL_MAXSIZE)
+        pool_block : bool
+            whether to block when the per-host limit is reached
+        keep_alive : bool
+            whether to keep connections alive between requests
+        compress_threshold : int, optional
+            size in bytes above which request bodies are gzip
+            compressed (default None, no compression)
+        compress_level : int
+            gzip compression level of request bodies
+            (default DEFAULT_COMPRESS_LEVEL)
+        accept_encoding : str
+            Accept-Encoding header to send with requests
+            (default DEFAULT_ACCEPT_ENCODING)
+        max_retries : int
+            maximum number of retries of failed requests
+            (default 0, no retries)
+        backoff_factor : float, optional
+            base of exponential backoff between retries in seconds
+            (default DEFAULT_BACKOFF_FACTOR)
+        retry_jitter : float, optional
+            fraction by which backoff times are randomized
+            (default DEFAULT_RETRY_JITTER)
+        retry_statuses : :obj:`list` of :obj:`int`, optional
+            response status codes to retry
+            (default DEFAULT_RETRY_STATUSES)
+        cache : :class:`renderapi.cache.ResponseCache`, optional
+            cache from which to serve stack metadata requests
+        call_hooks : :obj:`list` of callable, optional
+            list of call hooks, which is used (not copied) so that
+            hooks added to it later are also called
+        """
+        super(RenderSession, self).__init__()
+        self.pool_connections = (DEFAULT_POOL_CONNECTIONS
+                                 if pool_connections is None
+                                 else pool_connections)
+        self.pool_maxsize = (DEFAULT_POOL_MAXSIZE if pool_maxsize is None
+                             else pool_maxsize)
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.compress_threshold = compress_threshold
+        self.compress_level = (DEFAULT_COMPRESS_LEVEL if compress_level is None
+                               else compress_level)
+        self.accept_encoding = (DEFAULT_ACCEPT_ENCODING
+                                if accept_encoding is None
+                                else accept_encoding)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_jitter = retry_jitter
+        self.retry_statuses = retry_statuses
+        self.cache = cache
+        self.call_hooks = [] if call_hooks is None else call_hooks
+        self.configure()
+
+    def configure(self):
+        """mount pooled adapters and set connection headers
+        according to the attributes of this session"""
+        max_retries = (make_retry(self.max_retries, self.backoff_factor,
+                                  self.retry_jitter, self.retry_statuses)
+                       if self.max_retries else 0)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block,
+                              max_retries=max_retries)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self.headers['Connection'] = ('keep-alive' if self.keep_alive
+                                      else 'close')
+        self.headers['Accept-Encoding'] = self.accept_encoding
+        logger.debug('configured session with pool_connections={}, '
+                     'pool_maxsize={}, pool_block={}, keep_alive={}, '
+                     'max_retries={}'.format(
+                         self.pool_connections, self.pool_maxsize,
+                         self.pool_block, self.keep_alive, self.max_retries))
+
+
+def make_session(**kwargs):
+    """create a :class:`RenderSession`
+
+    Parameters
+    ----------
+    **kwargs
+        keyword arguments passed to :class:`RenderSession`
+
+    Returns
+    -------
+    RenderSession
+        pooled session
+    """
+    return RenderSession(**kwargs)
+
+
+__all__ = ['RenderSession', 'RenderRetry', 'make_session', 'make_retry']
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+'''
+in-memory spatial index of tile bounding boxes for overlap and
+location queries without requests to render
+'''
+import logging
+
+import numpy as np
+
+from .tilespec import bbox_transformed_batch
+from .transform import TransformResolver
+from .utils import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# the grid is coarsened until it has at most this many cells per box
+MAX_CELLS_PER_BOX = 4
+MIN_CELLS = 1024
+
+
+def _tilespec_box(ts):
+    # tilespecs created without bounds have no minX, ... attributes
+    box = [getattr(ts, k, None) for k in ('minX', 'minY', 'maxX', 'maxY')]
+    return [np.nan if v is None else v for v in box]
+
+
+class SpatialIndex(object):
+    """uniform grid index of axis aligned bounding boxes.
+
+    Boxes are binned into square cells stored as a compressed sparse
+    row array, so that index construction and batch queries are
+    vectorized numpy operations.  All queries are inclusive of box
+    boundaries unless otherwise noted, and return indices into the
+    boxes the index was built from (use :attr:`items` to look up
+    the corresponding objects)::
+
+        index = SpatialIndex.from_tilespecs(tilespecs)
+        neighbors = [index.items[i] for i in index.query_box(ts.bbox)]
+        pairs = index.overlapping_pairs()
+
+    Attributes
+    ----------
+    boxes : numpy.ndarray
+        (N, 4) array of minX, minY, maxX, maxY of each box.  Boxes
+        with undefined (NaN) or inverted bounds are not indexed.
+    items : list or None
+        objects corresponding to each box
+    cell_size : float
+        width and height of grid cells
+    origin : numpy.ndarray
+        x, y of the lower corner of the grid
+    shape : tuple of int
+        number of grid cells in x and y
+    """
+    def __init__(self, boxes, items=None, cell_size=None):
+        """Initialize SpatialIndex
+
+        Parameters
+        ----------
+        boxes : array_like
+            (N, 4) minX, minY, maxX, maxY of each box
+        items : list, optional
+            objects corresponding to each box
+        cell_size : float, optional
+            width and height of grid cells.  Defaults to the median
+            of the larger dimension of the boxes.
+        """
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.items = items
+        if items is not None and len(items) != len(self.boxes):
+            raise ValueError('{} items given for {} boxes'.format(
+                len(items), len(self.boxes)))
+        with np.errstate(invalid='ignore'):
+            valid = (np.all(np.isfinite(self.boxes), axis=1) &
+                     (self.boxes[:, 2] >= self.boxes[:, 0]) &
+                     (self.boxes[:, 3] >= self.boxes[:, 1]))
+        if not np.all(valid):
+            logger.warning('{} boxes with undefined bounds are not '
+                           'indexed'.format(np.count_nonzero(~valid)))
+        self._build(np.flatnonzero(valid), cell_size)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _build(self, ids, cell_size):
+        boxes = self.boxes[ids]
+        if len(ids):
+            self.origin = boxes[:, :2].min(axis=0)
+            extent = boxes[:, 2:].max(axis=0) - self.origin
+            if cell_size is None:
+                cell_size = np.median(np.maximum(
+                    boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]))
+        else:
+            self.origin = np.zeros(2)
+            extent = np.zeros(2)
+        if not cell_size or not np.isfinite(cell_size) or cell_size <= 0:
+            cell_size = max(extent.max(), 1.)
+        cell_size = float(cell_size)
+        # avoid grids much sparser than the boxes they hold
+        max_cells = max(MAX_CELLS_PER_BOX * len(ids), MIN_CELLS)
+        while np.prod(np.floor(extent / cell_size) + 1) > max_cells:
+            cell_size *= 2
+        self.cell_size = cell_size
+
+        self._cell_lo = np.zeros((len(self.boxes), 2), dtype=np.int64)
+        self._cell_lo[ids] = self._cells(boxes[:, :2])
+        cell_hi = self._cells(boxes[:, 2:])
+        self.shape = (tuple(int(v) for v in cell_hi.max(axis=0) + 1)
+                      if len(ids) else (1, 1))
+        nx = self.shape[0]
+
+        # expand each box to the cells it covers
+        lo = self._cell_lo[ids]
+        span = cell_hi - lo + 1
+        counts = span[:, 0] * span[:, 1]
+        entry_box = np.repeat(ids, counts)
+        local = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        width = np.repeat(span[:, 0], counts)
+        entry_cell = ((np.repeat(lo[:, 1], counts) + local // width) * nx +
+                      np.repeat(lo[:, 0], counts) + local % width)
+        order = np.argsort(entry_cell, kind='stable')
+        self._entry_cell = entry_cell[order]
+        self._entry_box = entry_box[order]
+        self._entry_xy = np.column_stack([self._entry_cell % nx,
+                                          self._entry_cell // nx])
+        self._cell_offsets = np.zeros(nx * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._entry_cell, minlength=nx * self.shape[1]),
+                  out=self._cell_offsets[1:])
+
+    def _cells(self, xy):
+        """(N, 2) integer cell coordinates of points"""
+        return np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+
+    @classmethod
+    def from_tilespecs(cls, tilespecs, transformed=False, ndiv_inner=0,
+                       reference_tforms=None, cell_size=None):
+        """index of the bounding boxes of tilespecs
+
+        Parameters
+        ----------
+        tilespecs : :obj:`list` of :class:`renderapi.tilespec.TileSpec`
+            tilespecs to index
+        transformed : bool
+            whether to index the bounds of
+            :func:`renderapi.tilespec.bbox_transformed_batch` rather
+            than the minX, minY, maxX, maxY of the tilespecs
+        ndiv_inner : int
+            subdivisions of the tile boundary for transformed bounds
+        reference_tforms : list or :class:`.transform.TransformResolver`
+            transforms to which reference transforms of the
+            tilespecs refer, for transformed bounds
+        cell_size : float, optional
+            width and height of grid cells
+
+        Returns
+        -------
+        :class:`SpatialIndex`
+            index with tilespecs as items
+        """
+        tilespecs = list(tilespecs)
+        if transformed:
+            boxes = bbox_transformed_batch(
+                tilespecs, ndiv_inner=ndiv_inner,
+                reference_tforms=reference_tforms)[1]
+        else:
+            boxes = np.array([_tilespec_box(ts) for ts in tilespecs],
+                             dtype=np.float64)
+        return cls(boxes, items=tilespecs, cell_size=cell_size)
+
+    @classmethod
+    def from_resolvedtiles(cls, resolvedtiles, transformed=False,
+                           ndiv_inner=0, cell_size=None):
+        """index of the bounding boxes of the tilespecs of resolved tiles
+
+        Parameters
+        ----------
+        resolvedtiles : :class:`renderapi.resolvedtiles.ResolvedTiles`
+            resolved tiles to index
+        transformed : bool
+            whether to index transformed bounds, resolving
+            reference transforms with the shared transforms
+        ndiv_inner : int
+            subdivisions of the tile boundary for transformed bounds
+        cell_size : float, optional
+            width and height of grid cells
+
+        Returns
+        -------
+        :class:`SpatialIndex`
+            index with the tilespecs as items
+        """
+        return cls.from_tilespecs(
+            resolvedtiles.tilespecs, transformed=transformed,
+            ndiv_inner=ndiv_inner,
+            reference_tforms=TransformResolver.from_resolvedtiles(
+                resolvedtiles),
+            cell_size=cell_size)
+
+    @classmethod
+    def from_table(cls, table, cell_size=None):
+        """index of the bounds of the tiles of a table
+
+        Parameters
+        ----------
+        table : :class:`renderapi.tilespec_table.TileSpecTable`
+            table to index
+        cell_size : float, optional
+            width and height of grid cells
+
+        Returns
+        -------
+        :class:`SpatialIndex`
+            index of the rows of the table
+        """
+        return cls(table.bounds, cell_size=cell_size)
+
+    def _cell_range(self, boxes):
+        """clipped cell ranges of boxes and whether they overlap the grid"""
+        with np.errstate(invalid='ignore'):
+            lo = self._cells(boxes[:, :2])
+            hi = self._cells(boxes[:, 2:])
+            shape = np.array(self.shape)
+            hit = (np.all(np.isfinite(boxes), axis=1) &
+                   np.all(hi >= 0, axis=1) & np.all(lo < shape, axis=1) &
+                   np.all(hi >= lo, axis=1))
+        return np.clip(lo, 0, shape - 1), np.clip(hi, 0, shape - 1), hit
+
+    def _csr(self, query, found, num_queries):
+        order = np.argsort(query * len(self.boxes) + found)
+        offsets = np.zeros(num_queries + 1, dtype=np.int64)
+        np.cumsum(np.bincount(query, minlength=num_queries),
+                  out=offsets[1:])
+        return offsets, found[order]
+
+    def query_boxes(self, boxes):
+        """find the indexed boxes intersecting each of many boxes
+
+        Parameters
+        ----------
+        boxes : array_like
+            (Q, 4) minX, minY, maxX, maxY of query boxes
+
+        Returns
+        -------
+        offsets : numpy.ndarray
+            (Q + 1,) array such that the boxes intersecting query box q
+            are indices[offsets[q]:offsets[q + 1]]
+        indices : numpy.ndarray
+            indices of intersecting boxes, in ascending order per query
+        """
+        q = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        lo, hi, hit = self._cell_range(q)
+        nx = self.shape[0]
+        # one contiguous run of entries per row of cells of each query
+        qid = np.flatnonzero(hit)
+        rows = hi[qid, 1] - lo[qid, 1] + 1
+        row_q = np.repeat(qid, rows)
+        row_y = lo[row_q, 1] + np.arange(rows.sum()) - np.repeat(
+            np.cumsum(rows) - rows, rows)
+        start = self._cell_offsets[row_y * nx + lo[row_q, 0]]
+        stop = self._cell_offsets[row_y * nx + hi[row_q, 0] + 1]
+        lengths = stop - start
+        query = np.repeat(row_q, lengths)
+        entry = np.repeat(start, lengths) + np.arange(lengths.sum()) - (
+            np.repeat(np.cumsum(lengths) - lengths, lengths))
+        found = self._entry_box[entry]
+        # count each box once, in the lowest cell shared with the query
+        keep = np.all(self._entry_xy[entry] == np.maximum(
+            self._cell_lo[found], lo[query]), axis=1)
+        query = query[keep]
+        found = found[keep]
+        qb = q[query]
+        b = self.boxes[found]
+        keep = ((b[:, 0] <= qb[:, 2]) & (b[:, 2] >= qb[:, 0]) &
+                (b[:, 1] <= qb[:, 3]) & (b[:, 3] >= qb[:, 1]))
+        return self._csr(query[keep], found[keep], len(q))
+
+    def query_box(self, box):
+        """find the indexed boxes intersecting a box
+
+        Parameters
+        ----------
+        box : tuple
+            minX, minY, maxX, maxY of query box, as
+            :attr:`renderapi.tilespec.TileSpec.bbox`
+
+        Returns
+        -------
+        numpy.ndarray
+            ascending indices of intersecting boxes
+        """
+        return self.query_boxes([box])[1]
+
+    def query_points(self, points):
+        """find the indexed boxes containing each of many points
+
+        Parameters
+        ----------
+        points : array_like
+            (P, 2) x, y of query points
+
+        Returns
+        -------
+        offsets : numpy.ndarray
+            (P + 1,) array such that the boxes containing point p
+            are indices[offsets[p]:offsets[p + 1]]
+        indices : numpy.ndarray
+            indices of containing boxes, in ascending order per point
+        """
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        lo, hi, hit = self._cell_range(np.hstack([p, p]))
+        qid = np.flatnonzero(hit)
+        cell = lo[qid, 1] * self.shape[0] + lo[qid, 0]
+        start = self._cell_offsets[cell]
+        lengths = self._cell_offsets[cell + 1] - start
+        query = np.repeat(qid, lengths)
+        entry = np.repeat(start, lengths) + np.arange(lengths.sum()) - (
+            np.repeat(np.cumsum(lengths) - lengths, lengths))
+        found = self._entry_box[entry]
+        b = self.boxes[found]
+        xy = p[query]
+        keep = ((b[:, 0] <= xy[:, 0]) & (b[:, 2] >= xy[:, 0]) &
+                (b[:, 1] <= xy[:, 1]) & (b[:, 3] >= xy[:, 1]))
+        return self._csr(query[keep], found[keep], len(p))
+
+    def query_point(self, x, y):
+        """find the indexed boxes containing a point
+
+        Parameters
+        ----------
+        x : float
+            x coordinate of point
+        y : float
+            y coordinate of point
+
+        Returns
+        -------
+        numpy.ndarray
+            ascending indices of containing boxes
+        """
+        return self.query_points([[x, y]])[1]
+
+    def overlapping_pairs(self, inclusive=False):
+        """find all pairs of overlapping indexed boxes
+
+        Parameters
+        ----------
+        inclusive : bool
+            whether boxes which only touch along an edge or corner
+            overlap.  By default, overlaps must have positive area.
+
+        Returns
+        -------
+        numpy.ndarray
+            (M, 2) lexicographically sorted indices i < j of
+            overlapping boxes
+        """
+        entries = np.arange(len(self._entry_box))
+        remaining = self._cell_offsets[self._entry_cell + 1] - entries - 1
+        pairs = []
+        k = 1
+        # pair each entry with the entry k places later in the same cell
+        while True:
+            entries = entries[remaining[entries] >= k]
+            if not len(entries):
+                break
+            a = self._entry_box[entries]
+            b = self._entry_box[entries + k]
+            lo = np.maximum(self._cell_lo[a], self._cell_lo[b])
+            ba = self.boxes[a]
+            bb = self.boxes[b]
+            if inclusive:
+                overlap = ((ba[:, :2] <= bb[:, 2:]) &
+                           (bb[:, :2] <= ba[:, 2:])).all(axis=1)
+            else:
+                overlap = ((ba[:, :2] < bb[:, 2:]) &
+                           (bb[:, :2] < ba[:, 2:])).all(axis=1)
+            keep = overlap & np.all(self._entry_xy[entries] == lo, axis=1)
+            pairs.append(np.column_stack([a[keep], b[keep]]))
+            k += 1
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(pairs), axis=1)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+__all__ = ['SpatialIndex']
@@ -6,7 +6,7 @@ from .errors import RenderError
 from .utils import jbool, NullHandler, post_json, put_json, rest_delete
 from .render import (format_baseurl, format_preamble,
                      renderaccess)
-from .utils import get_json
+from .utils import get_json, evict_cached
 import json
 
 logger = logging.getLogger(__name__)
@@ -153,7 +153,7 @@ def get_full_stack_metadata(stack, host=None, port=None, owner=None,
     request_url = format_preamble(host, port, owner, project, stack)
 
     logger.debug(request_url)
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 def get_stack_metadata(*args, **kwargs):
@@ -229,6 +229,7 @@ def set_stack_state(stack, state='LOADING', host=None, port=None,
     logger.debug(request_url)
     r = session.put(request_url, data=None,
                     headers={"content-type": "application/json"})
+    evict_cached(session, request_url)
     if (r.status_code != 201):
         logger.error(r.text)
         raise RenderError(r.text)
@@ -568,7 +569,7 @@ def get_z_values_for_stack(stack, project=None, host=None, port=None,
     request_url = format_preamble(
         host, port, owner, project, stack) + "/zValues/"
     logger.debug(request_url)
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 # haven't fully supported this yet
@@ -615,7 +616,7 @@ def get_bounds_from_z(stack, z, host=None, port=None, owner=None,
     request_url = format_preamble(
         host, port, owner, project, stack) + '/z/%f/bounds' % (z)
 
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 @renderaccess
@@ -646,7 +647,7 @@ def get_stack_bounds(stack, host=None, port=None, owner=None, project=None,
     """
     request_url = format_preamble(
         host, port, owner, project, stack) + '/bounds'
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 @renderaccess
@@ -681,7 +682,7 @@ def get_tilebounds_for_z(stack, z, host=None, port=None, owner=None,
 
     request_url = format_preamble(
         host, port, owner, project, stack) + '/z/{}/tileBounds'.format(z)
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 @renderaccess
@@ -761,7 +762,7 @@ def get_stack_sectionData(stack, host=None, port=None, owner=None,
     """
     request_url = format_preamble(
         host, port, owner, project, stack) + '/sectionData'
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 @renderaccess
@@ -794,7 +795,7 @@ def get_section_z_value(stack, sectionId, host=None, port=None,
     """
     request_url = format_preamble(
         host, port, owner, project, stack) + "/section/%s/z" % sectionId
-    return get_json(session, request_url)
+    return get_json(session, request_url, cacheable=True)
 
 
 @renderaccess
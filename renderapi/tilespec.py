@@ -1,11 +1,13 @@
 #!/usr/bin/env python
+import collections
 import logging
 import requests
 import numpy as np
 from .render import format_preamble, renderaccess
-from .utils import NullHandler, get_json
+from .utils import NullHandler, get_json, get_json_iter, iter_concurrent
 from .stack import get_z_values_for_stack
-from .transform import TransformList, estimate_dstpts
+from .transform import (
+    TransformList, estimate_dstpts, estimate_dstpts_batch)
 from .image_pyramid import MipMap, ImagePyramid
 from .layout import Layout
 from .channel import Channel
@@ -63,15 +65,21 @@ class TileSpec:
     json : dict or None
         dictionary to initialize this object with
         (if not None overrides and ignores all keyword arguments)
+    lazy : bool
+        whether to defer deserializing the layout, image pyramid,
+        transforms and channels of json until they are first accessed.
+        :meth:`to_dict` returns a copy of json while the tilespec is
+        unmodified.
     '''
 
     def __init__(self, tileId=None, z=None, width=None, height=None,
                  imageUrl=None, maskUrl=None,
                  minint=0, maxint=65535, layout=None, tforms=None,
                  labels=None, groupId=None, inputfilters=None, json=None, channels=None,
-                 mipMapLevels=None, imagePyramid=None, **kwargs):
+                 mipMapLevels=None, imagePyramid=None, lazy=False, **kwargs):
+        self._json = None
         if json is not None:
-            self.from_dict(json)
+            self.from_dict(json, lazy=lazy)
         else:
             self.tileId = tileId
             self.z = z
@@ -105,6 +113,32 @@ class TileSpec:
                     imageUrl=imageUrl,
                     maskUrl=maskUrl)
 
+    def __getattr__(self, name):
+        # only called for attributes which are not set, such as those
+        # deferred by from_dict(d, lazy=True)
+        loader = _LAZY_LOADERS.get(name)
+        d = getattr(self, '_json', None) if loader is not None else None
+        if d is None:
+            raise AttributeError(
+                "'{}' object has no attribute '{}'".format(
+                    type(self).__name__, name))
+        value = loader(d)
+        setattr(self, name, value)
+        return value
+
+    def _is_unmodified(self):
+        """whether this tilespec still represents the dictionary it
+        was lazily loaded from"""
+        d = getattr(self, '_json', None)
+        if d is None:
+            return False
+        # deferred attributes are assumed modified once accessed
+        if any(name in self.__dict__ for name in _LAZY_LOADERS):
+            return False
+        return (self.labels == d.get('labels', []) and
+                all(getattr(self, attr) == d.get(key)
+                    for attr, key in _EAGER_FIELDS))
+
     @property
     def bbox(self):
         """bbox defined to fit shapely call"""
@@ -126,29 +160,15 @@ class TileSpec:
             1 returns the bounding box with the first transform applied
             ...
             None all transforms are applied
+        reference_tforms : list of transforms to which reference
+            transforms refer, or a
+            :class:`renderapi.transform.TransformResolver` of them
 
         Returns
         -------
         Nx2 array ready for input to shapely.Polygon()
         """
-        # start with closed Nx2 array of corners
-        xy = np.zeros((5, 2)).astype('float')
-        xy[0, :] = [0, 0]
-        xy[1, :] = [0, self.height]
-        xy[2, :] = [self.width, self.height]
-        xy[3, :] = [self.width, 0]
-        xy[4, :] = [0, 0]
-
-        # recursively add points to the boundary
-        while ndiv_inner > 0:
-            sz = 2 * xy.shape[0] - 1
-            newxy = np.zeros((sz, 2)).astype('float')
-            newxy[0::2, :] = xy[:, :]
-            newxy[1:sz:2, :] = 0.5 * \
-                (newxy[0:(sz - 2):2, :] + newxy[2:sz:2, :])
-            xy = newxy
-            ndiv_inner -= 1
-
+        xy = _boundary_points([self.width], [self.height], ndiv_inner)[0]
         xy = estimate_dstpts(self.tforms[0:tf_limit],
                              src=xy, reference_tforms=reference_tforms)
 
@@ -162,7 +182,11 @@ class TileSpec:
         -------
         dict
             json compatible dictionary representation of this object
+            (a copy of the dictionary this object was lazily loaded from
+            if it is unmodified)
         """
+        if self._is_unmodified():
+            return _copy_json(self._json)
         thedict = {}
         thedict['tileId'] = self.tileId
         thedict['z'] = self.z
@@ -208,42 +232,32 @@ class TileSpec:
         thedict = {k: v for k, v in thedict.items() if v is not None}
         return thedict
 
-    def from_dict(self, d):
+    def from_dict(self, d, lazy=False):
         """Method to load tilespec from json dictionary
 
         Paramters
         ---------
         d : dict
             dictionary to use to set properties of this object
+        lazy : bool
+            whether to keep d and defer deserializing the layout, image
+            pyramid, transforms and channels until they are accessed
         """
-        self.tileId = d['tileId']
-        self.z = d['z']
-        self.width = d['width']
-        self.height = d['height']
-        self.minint = d.get('minIntensity')
-        self.maxint = d.get('maxIntensity')
-        self.frameId = d.get('frameId')
-        self.layout = Layout()
-        self.layout.from_dict(d.get('layout', None))
-        self.minX = d.get('minX', None)
-        self.maxX = d.get('maxX', None)
-        self.maxY = d.get('maxY', None)
-        self.minY = d.get('minY', None)
-        mmld = d.get('mipmapLevels', {})
-        self.ip = ImagePyramid({l: MipMap(
-            imageUrl=v.get('imageUrl'), maskUrl=v.get('maskUrl'))
-            for l, v in mmld.items()})
-
-        tfl = TransformList(json=d['transforms'])
-        self.tforms = tfl.tforms
-        chd = d.get('channels', None)
-        if chd is None:
-            self.channels = None
-        else:
-            self.channels = [Channel(json=ch) for ch in chd]
-
+        for attr, key in _EAGER_FIELDS:
+            if key in _REQUIRED_KEYS and not lazy:
+                setattr(self, attr, d[key])
+            else:
+                setattr(self, attr, d.get(key))
         self.labels = d.get('labels', [])
-        self.groupId = d.get('groupId', None)
+        for name, loader in _LAZY_LOADERS.items():
+            if lazy:
+                try:
+                    delattr(self, name)
+                except AttributeError:
+                    pass
+            else:
+                setattr(self, name, loader(d))
+        self._json = d if lazy else None
 
         # TODO filters not implemented -- should skip
         '''
@@ -256,6 +270,123 @@ class TileSpec:
         '''
 
 
+def _boundary_points(width, height, ndiv_inner=0):
+    """closed boundaries of tiles
+
+    Parameters
+    ----------
+    width : array_like
+        N widths of tiles
+    height : array_like
+        N heights of tiles
+    ndiv_inner : int
+        starting with just corner points, add intermediate
+        points to the boundary, recursively, ndiv_inner times
+
+    Returns
+    -------
+    numpy.array
+        NxMx2 array of boundary points of each tile
+    """
+    # start with closed array of corners
+    wh = np.column_stack([width, height]).astype('float')
+    xy = np.array([[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]],
+                  dtype='float') * wh[:, np.newaxis, :]
+
+    # recursively add points to the boundary
+    while ndiv_inner > 0:
+        sz = 2 * xy.shape[1] - 1
+        newxy = np.zeros((xy.shape[0], sz, 2)).astype('float')
+        newxy[:, 0::2, :] = xy
+        newxy[:, 1:sz:2, :] = 0.5 * \
+            (newxy[:, 0:(sz - 2):2, :] + newxy[:, 2:sz:2, :])
+        xy = newxy
+        ndiv_inner -= 1
+    return xy
+
+
+def bbox_transformed_batch(tilespecs, ndiv_inner=0, tf_limit=None,
+                           reference_tforms=None):
+    """transformed boundaries and bounds of many tiles, as
+    :meth:`TileSpec.bbox_transformed`, evaluating each distinct transform
+    once over the boundary points of all tiles using it (see
+    :func:`renderapi.transform.estimate_dstpts_batch`)
+
+    Parameters
+    ----------
+    tilespecs : :obj:`list` of :class:`TileSpec`
+        tilespecs of tiles
+    ndiv_inner : int
+        starting with just corner points, add intermediate
+        points to the boundary, recursively, ndiv_inner times
+    tf_limit : int or None
+        number of transforms of each tile to apply (None for all)
+    reference_tforms : list or :class:`renderapi.transform.TransformResolver`
+        transforms to which reference transforms of the tiles refer
+
+    Returns
+    -------
+    polygons : numpy.array
+        NxMx2 array of transformed boundary points of each tile
+    bounds : numpy.array
+        Nx4 array of minX, minY, maxX, maxY of each polygon
+    """
+    tilespecs = list(tilespecs)
+    xy = _boundary_points([ts.width for ts in tilespecs],
+                          [ts.height for ts in tilespecs], ndiv_inner)
+    polygons = estimate_dstpts_batch(
+        [ts.tforms[0:tf_limit] for ts in tilespecs], xy,
+        reference_tforms=reference_tforms)
+    return polygons, np.hstack([polygons.min(axis=1), polygons.max(axis=1)])
+
+
+def _copy_json(obj):
+    # copy of the dicts and lists of a json compatible object, faster
+    #   than copy.deepcopy
+    if isinstance(obj, dict):
+        return {k: _copy_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_json(v) for v in obj]
+    return obj
+
+
+def _load_layout(d):
+    layout = Layout()
+    layout.from_dict(d.get('layout', None))
+    return layout
+
+
+def _load_image_pyramid(d):
+    mmld = d.get('mipmapLevels', {})
+    return ImagePyramid({l: MipMap(
+        imageUrl=v.get('imageUrl'), maskUrl=v.get('maskUrl'))
+        for l, v in mmld.items()})
+
+
+def _load_tforms(d):
+    return TransformList(json=d['transforms']).tforms
+
+
+def _load_channels(d):
+    chd = d.get('channels', None)
+    return None if chd is None else [Channel(json=ch) for ch in chd]
+
+
+# (attribute, json key) of fields always deserialized by from_dict
+_EAGER_FIELDS = (
+    ('tileId', 'tileId'), ('z', 'z'), ('width', 'width'),
+    ('height', 'height'), ('minint', 'minIntensity'),
+    ('maxint', 'maxIntensity'), ('frameId', 'frameId'),
+    ('minX', 'minX'), ('maxX', 'maxX'), ('minY', 'minY'), ('maxY', 'maxY'),
+    ('groupId', 'groupId'))
+# keys without which from_dict(d) raises KeyError
+_REQUIRED_KEYS = ('tileId', 'z', 'width', 'height')
+# attributes which from_dict(d, lazy=True) defers until first access
+_LAZY_LOADERS = collections.OrderedDict([
+    ('layout', _load_layout), ('ip', _load_image_pyramid),
+    ('tforms', _load_tforms), ('channels', _load_channels)])
+
+
 @renderaccess
 def get_tile_spec_renderparameters(stack, tile, host=None, port=None,
                                    owner=None, project=None,
@@ -456,7 +587,7 @@ def get_tile_specs_from_box(stack, z, x, y, width, height,
 @renderaccess
 def get_tile_specs_from_z(stack, z, host=None, port=None,
                           owner=None, project=None, session=requests.session(),
-                          render=None, **kwargs):
+                          render=None, lazy=False, **kwargs):
     """Get all TileSpecs in a specific z values. Returns referenced transforms.
 
     :func:`renderapi.render.renderaccess` decorated function
@@ -471,6 +602,9 @@ def get_tile_specs_from_z(stack, z, host=None, port=None,
         render connect object
     session : requests.sessions.Session
         sessions object to connect with
+    lazy : bool
+        whether to defer deserializing the transforms, image pyramid,
+        layout and channels of each tilespec until they are accessed
 
     Returns
     -------
@@ -485,15 +619,52 @@ def get_tile_specs_from_z(stack, z, host=None, port=None,
     if len(tilespecs_json) == 0:
         return None
     else:
-        return [TileSpec(json=tilespec_json)
+        return [TileSpec(json=tilespec_json, lazy=lazy)
                 for tilespec_json in tilespecs_json]
 
 
+@renderaccess
+def iter_tile_specs_from_z(stack, z, host=None, port=None,
+                           owner=None, project=None,
+                           session=requests.session(),
+                           render=None, lazy=False, **kwargs):
+    """iterate over the TileSpecs in a specific z value, decoding
+    them one at a time as the response is streamed from the server.
+    Returns referenced transforms.
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    z : float
+        render z
+    render : renderapi.render.Render
+        render connect object
+    session : requests.sessions.Session
+        sessions object to connect with
+    lazy : bool
+        whether to defer deserializing the transforms, image pyramid,
+        layout and channels of each tilespec until they are accessed
+
+    Returns
+    -------
+    generator
+        generator of :class:`TileSpec` objects from that stack at that z
+    """
+    request_url = format_preamble(
+        host, port, owner, project, stack) + '/z/%f/tile-specs' % (z)
+    logger.debug(request_url)
+    return (TileSpec(json=tilespec_json, lazy=lazy)
+            for tilespec_json in get_json_iter(session, request_url))
+
+
 @renderaccess
 def get_tile_specs_from_stack(stack, host=None, port=None,
                               owner=None, project=None,
                               session=requests.session(),
-                              render=None, **kwargs):
+                              render=None, lazy=False, **kwargs):
     """get flat list of tilespecs for stack using i for sl in l for i in sl
 
     :func:`renderapi.render.renderaccess` decorated function
@@ -506,6 +677,9 @@ def get_tile_specs_from_stack(stack, host=None, port=None,
         render connect object
     session : requests.sessions.Session
         sessions object to connect with
+    lazy : bool
+        whether to defer deserializing the transforms, image pyramid,
+        layout and channels of each tilespec until they are accessed
 
     Returns
     -------
@@ -514,10 +688,66 @@ def get_tile_specs_from_stack(stack, host=None, port=None,
     """
     return [i for sl in [
         get_tile_specs_from_z(stack, z, host=host, port=port,
-                              owner=owner, project=project, session=session)
+                              owner=owner, project=project, session=session,
+                              lazy=lazy)
         for z in get_z_values_for_stack(stack, host=host, port=port,
                                         owner=owner, project=project,
-                                        session=session)] for i in sl]
+                                        session=session)]
+            if sl is not None for i in sl]
+
+
+@renderaccess
+def iter_tile_specs_from_stack(stack, zValues=None, max_workers=8,
+                               max_pending=None, ordered=True, lazy=False,
+                               host=None, port=None, owner=None,
+                               project=None, session=requests.session(),
+                               render=None, **kwargs):
+    """iterate over the tilespecs of a stack one z at a time,
+    fetching sections concurrently
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    zValues : :obj:`list` of :obj:`float`, optional
+        z values to get (default all z values in stack)
+    max_workers : int
+        number of sections to request concurrently
+    max_pending : int, optional
+        maximum number of sections fetched ahead of the
+        consumer (default 2 * max_workers)
+    ordered : bool
+        whether to yield sections in the order of zValues rather
+        than as they arrive
+    lazy : bool
+        whether to defer deserializing the transforms, image pyramid,
+        layout and channels of each tilespec until they are accessed
+    render : renderapi.render.Render
+        render connect object
+    session : requests.sessions.Session
+        sessions object to connect with
+
+    Yields
+    ------
+    tuple
+        (z, :obj:`list` of :class:`TileSpec`) for each section
+    """
+    if zValues is None:
+        zValues = get_z_values_for_stack(
+            stack, host=host, port=port, owner=owner, project=project,
+            session=session)
+
+    def get_section(z):
+        return get_tile_specs_from_z(
+            stack, z, host=host, port=port, owner=owner, project=project,
+            session=session, lazy=lazy) or []
+
+    for z, tilespecs in iter_concurrent(
+            get_section, zValues, max_workers=max_workers,
+            max_pending=max_pending, ordered=ordered):
+        yield z, tilespecs
 
 # TODO: ADD FEATURES THAT REQUIRED THESE TO SUPPORT.. NOT YET FULLY IMPLEMENTED
 # class ResolvedTileSpecMap:
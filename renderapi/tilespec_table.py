@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+'''
+columnar tables of tilespecs for vectorized analysis of whole
+sections and stacks
+'''
+import json
+import logging
+
+import numpy as np
+import requests
+
+from .render import renderaccess
+from .resolvedtiles import ResolvedTiles
+from .tilespec import TileSpec, iter_tile_specs_from_stack
+from .utils import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# value of integer columns for fields missing from a tilespec
+MISSING_INT = -1
+
+# (column, dtype) of the columns of a TileSpecTable
+COLUMNS = (
+    ('tileId', object), ('z', np.float64),
+    ('width', np.int64), ('height', np.int64),
+    ('minX', np.float64), ('minY', np.float64),
+    ('maxX', np.float64), ('maxY', np.float64),
+    ('minint', np.float64), ('maxint', np.float64),
+    ('groupId', object), ('sectionId', object),
+    ('imageRow', np.int64), ('imageCol', np.int64))
+# (column, tilespec json key) of columns read from the top level
+_TOP_LEVEL_KEYS = (
+    ('tileId', 'tileId'), ('z', 'z'), ('width', 'width'),
+    ('height', 'height'), ('minX', 'minX'), ('minY', 'minY'),
+    ('maxX', 'maxX'), ('maxY', 'maxY'), ('minint', 'minIntensity'),
+    ('maxint', 'maxIntensity'), ('groupId', 'groupId'))
+_BOUNDS_KEYS = ('minX', 'minY', 'maxX', 'maxY')
+# columns read from the layout of a tilespec
+_LAYOUT_KEYS = ('sectionId', 'imageRow', 'imageCol')
+
+
+def _missing(dtype):
+    if dtype is object:
+        return None
+    return MISSING_INT if np.issubdtype(dtype, np.integer) else np.nan
+
+
+def _json_value(v):
+    """json compatible value of an element of a column, None if missing"""
+    if isinstance(v, np.integer):
+        return None if v == MISSING_INT else int(v)
+    if isinstance(v, np.floating):
+        if np.isnan(v):
+            return None
+        return int(v) if v.is_integer() else float(v)
+    return v
+
+
+def _sort_key(values, ascending=True):
+    """integer ranks of the values of a column in ascending or
+    descending order, with None (as in object columns) last"""
+    missing = np.zeros(len(values), dtype=bool)
+    if values.dtype == object:
+        missing[:] = [v is None for v in values]
+    _, inverse = np.unique(values[~missing], return_inverse=True)
+    key = np.full(len(values), len(values), dtype=np.intp)
+    key[~missing] = inverse if ascending else inverse.max(initial=0) - inverse
+    return key
+
+
+def _tilespec_dict(ts):
+    d = ts.to_dict()
+    # TileSpec.to_dict does not include bounds
+    bounds = {k: getattr(ts, k, None) for k in _BOUNDS_KEYS if k not in d}
+    bounds = {k: v for k, v in bounds.items() if v is not None}
+    return dict(d, **bounds) if bounds else d
+
+
+class TileSpecTable(object):
+    """columnar representation of a set of tilespecs, in which each
+    field is a numpy array with one element per tile.
+
+    Transforms are stored once in a deduplicated table of transform
+    specifications, and the transforms of tile i are the entries
+    ``tform_indices[tform_offsets[i]:tform_offsets[i + 1]]`` of that table.
+    Fields of tilespecs which are not columns, such as image pyramids,
+    are kept in :attr:`extras` so that tilespecs can be recreated.
+
+    Integer columns hold :data:`MISSING_INT` and float columns NaN for
+    fields missing from a tilespec.
+
+    Attributes
+    ----------
+    columns : dict
+        numpy array of each column in :data:`COLUMNS`
+    transform_specs : :obj:`list` of :obj:`dict`
+        json specifications of the distinct transforms
+    tform_offsets : numpy.ndarray
+        (N+1,) offsets into tform_indices of the transforms of each tile
+    tform_indices : numpy.ndarray
+        indices into transform_specs of the transforms of all tiles
+    extras : numpy.ndarray
+        (N,) object array of dicts of the other fields of each tilespec
+    shared_transforms : :obj:`list` of :class:`renderapi.transform.Transform`
+        transforms referenced by the tilespecs (as in :class:`ResolvedTiles`)
+    """
+    def __init__(self, columns, transform_specs, tform_offsets,
+                 tform_indices, extras, shared_transforms=None):
+        self.columns = columns
+        self.transform_specs = transform_specs
+        self.tform_offsets = tform_offsets
+        self.tform_indices = tform_indices
+        self.extras = extras
+        self.shared_transforms = (
+            [] if shared_transforms is None else shared_transforms)
+
+    @classmethod
+    def from_dicts(cls, tilespec_dicts, shared_transforms=None):
+        """create a table from json tilespecs
+
+        Parameters
+        ----------
+        tilespec_dicts : iterable of dict
+            json compatible tilespecs
+        shared_transforms : :obj:`list` of :class:`Transform`, optional
+            transforms referenced by the tilespecs
+
+        Returns
+        -------
+        TileSpecTable
+            table of the tilespecs
+        """
+        values = {name: [] for name, dtype in COLUMNS}
+        missing = {name: _missing(dtype) for name, dtype in COLUMNS}
+        transform_specs = []
+        transform_keys = {}
+        offsets = [0]
+        indices = []
+        extras = []
+        for d in tilespec_dicts:
+            for name, key in _TOP_LEVEL_KEYS:
+                v = d.get(key)
+                values[name].append(missing[name] if v is None else v)
+            layout = d.get('layout') or {}
+            for name in _LAYOUT_KEYS:
+                v = layout.get(name)
+                values[name].append(missing[name] if v is None else v)
+
+            for spec in (d.get('transforms') or {}).get('specList', []):
+                key = json.dumps(spec, sort_keys=True)
+                i = transform_keys.get(key)
+                if i is None:
+                    i = transform_keys[key] = len(transform_specs)
+                    transform_specs.append(spec)
+                indices.append(i)
+            offsets.append(len(indices))
+
+            extra = {k: v for k, v in d.items()
+                     if k not in _EXTRA_EXCLUDED_KEYS}
+            layout_extra = {k: v for k, v in layout.items()
+                            if k not in _LAYOUT_KEYS}
+            if layout_extra:
+                extra['layout'] = layout_extra
+            extras.append(extra)
+
+        columns = {}
+        for name, dtype in COLUMNS:
+            if dtype is object:
+                a = np.empty(len(values[name]), dtype=object)
+                a[:] = values[name]
+            else:
+                a = np.array(values[name], dtype=dtype)
+            columns[name] = a
+        extras_array = np.empty(len(extras), dtype=object)
+        extras_array[:] = extras
+        return cls(columns, transform_specs,
+                   np.array(offsets, dtype=np.int64),
+                   np.array(indices, dtype=np.int64),
+                   extras_array, shared_transforms)
+
+    @classmethod
+    def from_tilespecs(cls, tilespecs, shared_transforms=None):
+        """create a table from :class:`TileSpec` objects, such as
+        those returned by :func:`renderapi.tilespec.get_tile_specs_from_z`.
+        Unmodified tilespecs loaded with lazy=True are not serialized again.
+
+        Parameters
+        ----------
+        tilespecs : iterable of :class:`TileSpec`
+            tilespecs
+        shared_transforms : :obj:`list` of :class:`Transform`, optional
+            transforms referenced by the tilespecs
+
+        Returns
+        -------
+        TileSpecTable
+            table of the tilespecs
+        """
+        return cls.from_dicts((_tilespec_dict(ts) for ts in tilespecs),
+                              shared_transforms)
+
+    @classmethod
+    def from_resolvedtiles(cls, resolvedtiles):
+        """create a table from a :class:`ResolvedTiles`
+
+        Parameters
+        ----------
+        resolvedtiles : :class:`ResolvedTiles`
+            tilespecs and shared transforms
+
+        Returns
+        -------
+        TileSpecTable
+            table of the tilespecs and shared transforms
+        """
+        return cls.from_tilespecs(resolvedtiles.tilespecs,
+                                  list(resolvedtiles.transforms))
+
+    @classmethod
+    def concatenate(cls, tables):
+        """concatenate tables, for example of different sections
+
+        Parameters
+        ----------
+        tables : :obj:`list` of :class:`TileSpecTable`
+            tables to concatenate
+
+        Returns
+        -------
+        TileSpecTable
+            table with the tiles of all tables in order
+        """
+        tables = list(tables)
+        if not tables:
+            return cls.from_dicts([])
+        columns = {name: np.concatenate([t.columns[name] for t in tables])
+                   for name, dtype in COLUMNS}
+        transform_specs = []
+        transform_keys = {}
+        offsets = [np.zeros(1, dtype=np.int64)]
+        indices = []
+        shared = {}
+        base = 0
+        for t in tables:
+            remap = np.empty(len(t.transform_specs), dtype=np.int64)
+            for i, spec in enumerate(t.transform_specs):
+                key = json.dumps(spec, sort_keys=True)
+                j = transform_keys.get(key)
+                if j is None:
+                    j = transform_keys[key] = len(transform_specs)
+                    transform_specs.append(spec)
+                remap[i] = j
+            indices.append(remap[t.tform_indices])
+            offsets.append(t.tform_offsets[1:] + base)
+            base += len(t.tform_indices)
+            for tform in t.shared_transforms:
+                shared.setdefault(tform.transformId, tform)
+        return cls(columns, transform_specs, np.concatenate(offsets),
+                   np.concatenate(indices),
+                   np.concatenate([t.extras for t in tables]),
+                   list(shared.values()))
+
+    def __len__(self):
+        return len(self.extras)
+
+    def __getitem__(self, key):
+        """column by name, or table of the selected tiles for an
+        index, index array, boolean mask or slice"""
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.take(np.atleast_1d(np.arange(len(self))[key]))
+
+    def __getattr__(self, name):
+        # columns are also available as attributes
+        columns = self.__dict__.get('columns')
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+
+    @property
+    def bounds(self):
+        """(N, 4) array of minX, minY, maxX, maxY of each tile"""
+        return np.column_stack([self.columns[name]
+                                for name in _BOUNDS_KEYS])
+
+    @property
+    def tform_counts(self):
+        """(N,) number of transforms of each tile"""
+        return np.diff(self.tform_offsets)
+
+    def take(self, indices):
+        """table of a subset of tiles
+
+        Parameters
+        ----------
+        indices : array_like of int
+            indices of tiles, in the order in which to take them
+
+        Returns
+        -------
+        TileSpecTable
+            table of the selected tiles sharing the transform table
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = self.tform_counts[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # positions in tform_indices of the transforms of each taken tile
+        positions = (np.repeat(self.tform_offsets[indices] - offsets[:-1],
+                               counts) + np.arange(offsets[-1]))
+        return TileSpecTable(
+            {name: a[indices] for name, a in self.columns.items()},
+            self.transform_specs, offsets, self.tform_indices[positions],
+            self.extras[indices], self.shared_transforms)
+
+    def filter(self, mask):
+        """table of the tiles for which mask is True
+
+        Parameters
+        ----------
+        mask : numpy.ndarray
+            (N,) boolean array, e.g. ``table.z == 1``
+
+        Returns
+        -------
+        TileSpecTable
+            table of the selected tiles
+        """
+        return self.take(np.flatnonzero(mask))
+
+    def argsort(self, by, ascending=True):
+        """stable order of the tiles sorted by one or more columns,
+        with missing values of object columns (None) last
+
+        Parameters
+        ----------
+        by : str or :obj:`list` of :obj:`str`
+            columns to sort by, the first being the primary key
+        ascending : bool
+            whether to sort in ascending order
+
+        Returns
+        -------
+        numpy.ndarray
+            indices of tiles in sorted order
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        if not by:
+            return np.arange(len(self))
+        # lexsort is stable and sorts by its last key first
+        return np.lexsort([_sort_key(self.columns[name], ascending)
+                           for name in reversed(by)])
+
+    def sort(self, by, ascending=True):
+        """table sorted by one or more columns
+
+        Parameters
+        ----------
+        by : str or :obj:`list` of :obj:`str`
+            columns to sort by, the first being the primary key
+        ascending : bool
+            whether to sort in ascending order
+
+        Returns
+        -------
+        TileSpecTable
+            sorted table
+        """
+        return self.take(self.argsort(by, ascending))
+
+    def groupby(self, by):
+        """iterate over the tiles grouped by the values of a column
+
+        Parameters
+        ----------
+        by : str
+            column to group by
+
+        Yields
+        ------
+        tuple
+            (value, :class:`TileSpecTable`) for each distinct value
+            in sorted order, with None last
+        """
+        key = _sort_key(self.columns[by])
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        values = self.columns[by][order]
+        if not len(values):
+            return
+        starts = np.flatnonzero(np.concatenate(
+            [[True], key[1:] != key[:-1]]))
+        ends = np.append(starts[1:], len(values))
+        for start, end in zip(starts, ends):
+            yield values[start], self.take(order[start:end])
+
+    def groupby_z(self):
+        """iterate over the tiles of each section
+
+        Yields
+        ------
+        tuple
+            (z, :class:`TileSpecTable`) for each z in ascending order
+        """
+        return self.groupby('z')
+
+    def tile_transform_specs(self, i):
+        """json specifications of the transforms of a tile
+
+        Parameters
+        ----------
+        i : int
+            index of tile
+
+        Returns
+        -------
+        :obj:`list` of :obj:`dict`
+            transform specifications
+        """
+        return [self.transform_specs[j] for j in self.tform_indices[
+            self.tform_offsets[i]:self.tform_offsets[i + 1]]]
+
+    def tile_dict(self, i):
+        """json tilespec of a tile
+
+        Parameters
+        ----------
+        i : int
+            index of tile
+
+        Returns
+        -------
+        dict
+            json compatible tilespec
+        """
+        d = dict(self.extras[i])
+        for name, key in _TOP_LEVEL_KEYS:
+            v = _json_value(self.columns[name][i])
+            if v is not None:
+                d[key] = v
+        layout = dict(d.get('layout', {}))
+        for name in _LAYOUT_KEYS:
+            v = _json_value(self.columns[name][i])
+            if v is not None:
+                layout[name] = v
+        if layout:
+            d['layout'] = layout
+        d['transforms'] = {'type': 'list',
+                           'specList': self.tile_transform_specs(i)}
+        return d
+
+    def to_tilespecs(self, lazy=False):
+        """create :class:`TileSpec` objects of the tiles
+
+        Parameters
+        ----------
+        lazy : bool
+            whether to defer deserializing the transforms and image
+            pyramids of the tilespecs until they are accessed
+
+        Returns
+        -------
+        :obj:`list` of :class:`TileSpec`
+            tilespecs
+        """
+        return [TileSpec(json=self.tile_dict(i), lazy=lazy)
+                for i in range(len(self))]
+
+    def to_resolvedtiles(self):
+        """create a :class:`ResolvedTiles` of the tiles and shared transforms
+
+        Returns
+        -------
+        ResolvedTiles
+            tilespecs and shared transforms
+        """
+        return ResolvedTiles(tilespecs=self.to_tilespecs(),
+                             transformList=list(self.shared_transforms))
+
+
+_EXTRA_EXCLUDED_KEYS = frozenset(
+    [key for name, key in _TOP_LEVEL_KEYS] + ['layout', 'transforms'])
+
+
+@renderaccess
+def get_tile_spec_table_from_stack(stack, zValues=None, max_workers=8,
+                                   max_pending=None, host=None, port=None,
+                                   owner=None, project=None,
+                                   session=requests.session(),
+                                   render=None, **kwargs):
+    """get a :class:`TileSpecTable` of the tilespecs of a stack,
+    fetching sections concurrently
+
+    :func:`renderapi.render.renderaccess` decorated function
+
+    Parameters
+    ----------
+    stack : str
+        render stack
+    zValues : :obj:`list` of :obj:`float`, optional
+        z values to get (default all z values in stack)
+    max_workers : int
+        number of sections to request concurrently
+    max_pending : int, optional
+        maximum number of sections fetched ahead of the
+        consumer (default 2 * max_workers)
+    render : renderapi.render.Render
+        render connect object
+    session : requests.sessions.Session
+        sessions object to connect with
+
+    Returns
+    -------
+    TileSpecTable
+        table of the tilespecs of the stack in the order of zValues
+    """
+    return TileSpecTable.concatenate(
+        [TileSpecTable.from_tilespecs(tilespecs)
+         for z, tilespecs in iter_tile_specs_from_stack(
+             stack, zValues=zValues, max_workers=max_workers,
+             max_pending=max_pending, lazy=True, host=host, port=port,
+             owner=owner, project=project, session=session)])
+
+
+__all__ = ['TileSpecTable', 'get_tile_spec_table_from_stack',
+           'COLUMNS', 'MISSING_INT']
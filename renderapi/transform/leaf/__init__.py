@@ -2,4 +2,5 @@ from .transform import *
 from .affine_models import *
 from .polynomial_models import *
 from .thin_plate_spline import *
+from .approximate import *
 from .utils import *
@@ -1,5 +1,6 @@
 from .transform import Transform, logger
-from .common import calc_first_order_properties
+from .common import (
+    calc_first_order_properties, points_array, output_array, affine_into)
 import numpy as np
 from renderapi.errors import ConversionError, EstimationError
 
@@ -86,7 +87,6 @@ class AffineModel(Transform):
             self.M11 = M11
             self.B0 = B0
             self.B1 = B1
-            self.className = 'mpicbg.trakem2.transform.AffineModel2D'
             self.labels = labels
             self.load_M()
             self.transformId = transformId
@@ -141,21 +141,53 @@ class AffineModel(Transform):
                 'shape mismatch! A shape: {}, B shape {}'.format(
                     A.shape, B.shape))
 
-        N = A.shape[0]  # total points
-
-        M = np.zeros((2 * N, 6))
-        Y = np.zeros((2 * N, 1))
-        for i in range(N):
-            M[2 * i, :] = [A[i, 0], A[i, 1], 0, 0, 1, 0]
-            M[2 * i + 1, :] = [0, 0, A[i, 0], A[i, 1], 0, 1]
-            Y[2 * i] = B[i, 0]
-            Y[2 * i + 1] = B[i, 1]
-
-        (Tvec, residuals, rank, s) = np.linalg.lstsq(M, Y)
+        # the x' and y' rows of the 2Nx6 system share the Nx3 design
+        #   matrix [x, y, 1], so solve both as columns of one system
+        X = np.ones((A.shape[0], 3))
+        X[:, :2] = A
+        (coeffs, residuals, rank, s) = np.linalg.lstsq(X, B, rcond=None)
+        Tvec = np.empty((6, 1))
+        Tvec[[0, 1, 4], 0] = coeffs[:, 0]
+        Tvec[[2, 3, 5], 0] = coeffs[:, 1]
         if return_all:
-            return Tvec, residuals, rank, s
+            # report as for the equivalent block diagonal 2Nx6 system
+            return (Tvec, residuals.sum(keepdims=True) if residuals.size
+                    else residuals, 2 * rank, np.repeat(s, 2))
         return Tvec
 
+    @staticmethod
+    def fit_batch(src, dst, counts=None):
+        """fit independent affine transforms to many sets of
+        corresponding points at once
+
+        Parameters
+        ----------
+        src : numpy.array or list of numpy.array
+            Nx2 matrix of source points of all sets concatenated, or
+            a list of Nix2 matrices, one per set if counts is None
+        dst : numpy.array or list of numpy.array
+            destination points laid out as src
+        counts : numpy.array of int, optional
+            number of points in each set of the concatenated src and dst
+
+        Returns
+        -------
+        numpy.array
+            a Kx3x3 array of homogeneous matrices, one per set
+        """
+        g = _PointGroups(src, dst, counts)
+        C = np.empty((g.K, 2, 2))
+        C[:, 0, 0] = g.Sxx
+        C[:, 0, 1] = C[:, 1, 0] = g.Sxy
+        C[:, 1, 1] = g.Syy
+        D = np.empty((g.K, 2, 2))
+        D[:, 0, 0] = g.Sux
+        D[:, 0, 1] = g.Suy
+        D[:, 1, 0] = g.Svx
+        D[:, 1, 1] = g.Svy
+        # minimum norm solution like lstsq where points are collinear
+        return g.homogeneous(np.matmul(D, np.linalg.pinv(C)))
+
     def estimate(self, A, B, return_params=True, **kwargs):
         """method for setting this transformation with the best fit
         given the corresponding points A,B
@@ -244,15 +276,15 @@ class AffineModel(Transform):
         numpy.array
             a Nx3 array of x,y,1 points used for transformations
         """
-        Np = points.shape[0]
-        onevec = np.ones((Np, 1), np.double)
-
         if points.shape[1] != 2:
             raise ConversionError('Points must be of shape (:, 2) '
                                   '-- got {}'.format(points.shape))
         Nd = 2
-        points = np.concatenate((points, onevec), axis=1)
-        return points, Nd
+        vectors = np.empty((points.shape[0], 3),
+                           np.result_type(points.dtype, np.double))
+        vectors[:, :2] = points
+        vectors[:, 2] = 1.
+        return vectors, Nd
 
     @staticmethod
     def convert_points_vector_to_array(points, Nd=2):
@@ -269,42 +301,54 @@ class AffineModel(Transform):
         -------
         numpy.array: a Nx2 array of x,y points
         """
-        points = points[:, 0:Nd] / np.tile(points[:, 2], (Nd, 1)).T
+        points = points[:, 0:Nd] / points[:, 2:3]
         return points
 
-    def tform(self, points):
+    def tform(self, points, out=None, dtype=None):
         """transform a set of points through this transformation
 
         Parameters
         ----------
         points : numpy.array
             a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
 
         Returns
         -------
         numpy.array
             a Nx2 array of x,y points after transformation
         """
-        points, Nd = self.convert_to_point_vector(points)
-        pt = np.dot(self.M, points.T).T
-        return self.convert_points_vector_to_array(pt, Nd)
+        points = points_array(points)
+        # the homogeneous coordinate of an affine is always 1
+        return affine_into(points, self.M[:2, :2], self.M[:2, 2],
+                           output_array(points, out, dtype))
 
-    def inverse_tform(self, points):
+    def inverse_tform(self, points, out=None, dtype=None):
         """transform a set of points through the inverse of this transformation
 
         Parameters
         ----------
         points : numpy.array
             a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
 
         Returns
         -------
         numpy.array
             a Nx2 array of x,y points after inverse transformation
         """
-        points, Nd = self.convert_to_point_vector(points)
-        pt = np.dot(np.linalg.inv(self.M), points.T).T
-        return self.convert_points_vector_to_array(pt, Nd)
+        points = points_array(points)
+        Minv = np.linalg.inv(self.M)
+        return affine_into(points, Minv[:2, :2], Minv[:2, 2],
+                           output_array(points, out, dtype))
 
     def calc_properties(self):
         return calc_first_order_properties(
@@ -413,6 +457,29 @@ class TranslationModel(AffineModel):
         T[:2, 2] = t
         return T
 
+    @staticmethod
+    def fit_batch(src, dst, counts=None):
+        """fit independent translations to many sets of
+        corresponding points at once
+
+        Parameters
+        ----------
+        src : numpy.array or list of numpy.array
+            Nx2 matrix of source points of all sets concatenated, or
+            a list of Nix2 matrices, one per set if counts is None
+        dst : numpy.array or list of numpy.array
+            destination points laid out as src
+        counts : numpy.array of int, optional
+            number of points in each set of the concatenated src and dst
+
+        Returns
+        -------
+        numpy.array
+            a Kx3x3 array of homogeneous matrices, one per set
+        """
+        g = _PointGroups(src, dst, counts)
+        return g.homogeneous(np.broadcast_to(np.eye(2), (g.K, 2, 2)))
+
     def estimate(self, src, dst, return_params=True):
         """method for setting this transformation with the best fit
         given the corresponding points src,dst
@@ -542,6 +609,56 @@ class RigidModel(AffineModel):
         T[:dim, :dim] *= fit_scale
         return T
 
+    @staticmethod
+    def fit_batch(src, dst, counts=None, rigid=True):
+        """fit independent rigid (or similarity) transforms to many sets
+        of corresponding points at once, using the closed form of the
+        2d Umeyama estimate
+
+        Parameters
+        ----------
+        src : numpy.array or list of numpy.array
+            Nx2 matrix of source points of all sets concatenated, or
+            a list of Nix2 matrices, one per set if counts is None
+        dst : numpy.array or list of numpy.array
+            destination points laid out as src
+        counts : numpy.array of int, optional
+            number of points in each set of the concatenated src and dst
+        rigid : bool
+            whether to constrain these transforms to be rigid
+
+        Returns
+        -------
+        numpy.array
+            a Kx3x3 array of homogeneous matrices, one per set
+
+        Raises
+        ------
+        EstimationError
+            if the points of any set are all coincident
+        """
+        g = _PointGroups(src, dst, counts)
+        # in 2d the best rotation maximizes a*cos(theta) + b*sin(theta)
+        a = g.Sux + g.Svy
+        b = g.Svx - g.Suy
+        r = np.hypot(a, b)
+        if not np.all(r > 0):
+            raise EstimationError(
+                'zero rank matrix A unacceptable for sets {} -- '
+                'likely poorly conditioned'.format(
+                    np.flatnonzero(~(r > 0)).tolist()))
+        c = a / r
+        s = b / r
+        if not rigid:
+            scale = r / (g.Sxx + g.Syy)
+            c *= scale
+            s *= scale
+        L = np.empty((g.K, 2, 2))
+        L[:, 0, 0] = L[:, 1, 1] = c
+        L[:, 0, 1] = -s
+        L[:, 1, 0] = s
+        return g.homogeneous(L)
+
     def estimate(self, A, B, return_params=True, **kwargs):
         """method for setting this transformation with the
         best fit given the corresponding points src,dst
@@ -636,3 +753,96 @@ class SimilarityModel(RigidModel):
             ordered M00,M01,M10,M11,B0,B1
         """
         return RigidModel.fit(src, dst, rigid=rigid)
+
+    @staticmethod
+    def fit_batch(src, dst, counts=None, rigid=False):
+        """fit independent similarity transforms to many sets of
+        corresponding points at once
+
+        Parameters
+        ----------
+        src : numpy.array or list of numpy.array
+            Nx2 matrix of source points of all sets concatenated, or
+            a list of Nix2 matrices, one per set if counts is None
+        dst : numpy.array or list of numpy.array
+            destination points laid out as src
+        counts : numpy.array of int, optional
+            number of points in each set of the concatenated src and dst
+        rigid : bool
+            whether to constrain these transforms to be rigid
+
+        Returns
+        -------
+        numpy.array
+            a Kx3x3 array of homogeneous matrices, one per set
+        """
+        return RigidModel.fit_batch(src, dst, counts, rigid=rigid)
+
+
+class _PointGroups(object):
+    """per set means and centered second moments of ragged sets of
+    corresponding points, accumulated for all sets at once
+
+    Attributes
+    ----------
+    K : int
+        number of sets
+    src_mean : numpy.array
+        Kx2 means of the source points of each set
+    dst_mean : numpy.array
+        Kx2 means of the destination points of each set
+    Sxx, Sxy, Syy : numpy.array
+        sums of products of centered source coordinates x, y
+    Sux, Suy, Svx, Svy : numpy.array
+        sums of products of centered destination coordinates u, v
+        with centered source coordinates
+    """
+
+    def __init__(self, src, dst, counts=None):
+        if counts is None:
+            counts = [len(p) for p in src]
+            src = np.concatenate(src) if len(src) else np.empty((0, 2))
+            dst = np.concatenate(dst) if len(dst) else np.empty((0, 2))
+        src = np.asarray(src, dtype=float)
+        dst = np.asarray(dst, dtype=float)
+        counts = np.asarray(counts, dtype=int)
+        if not (src.shape == dst.shape and src.ndim == 2 and
+                src.shape[1] == 2 and counts.sum() == src.shape[0]):
+            raise EstimationError(
+                'shape mismatch! src shape: {}, dst shape {}, '
+                '{} points in sets'.format(
+                    src.shape, dst.shape, counts.sum()))
+        if np.any(counts < 1):
+            raise EstimationError('cannot fit sets without points: {}'.format(
+                np.flatnonzero(counts < 1).tolist()))
+        self.K = len(counts)
+        group = np.repeat(np.arange(self.K), counts)
+
+        def sums(w):
+            return np.bincount(group, weights=w, minlength=self.K)
+
+        self.src_mean = np.stack(
+            [sums(src[:, 0]), sums(src[:, 1])], axis=-1) / counts[:, None]
+        self.dst_mean = np.stack(
+            [sums(dst[:, 0]), sums(dst[:, 1])], axis=-1) / counts[:, None]
+        # center before accumulating products to keep the precision of
+        #   sets far from the origin
+        x, y = (src - self.src_mean[group]).T
+        u, v = (dst - self.dst_mean[group]).T
+        self.Sxx = sums(x * x)
+        self.Sxy = sums(x * y)
+        self.Syy = sums(y * y)
+        self.Sux = sums(u * x)
+        self.Suy = sums(u * y)
+        self.Svx = sums(v * x)
+        self.Svy = sums(v * y)
+
+    def homogeneous(self, L):
+        """Kx3x3 matrices with linear parts L mapping the source means
+        of each set onto the destination means"""
+        T = np.zeros((self.K, 3, 3))
+        T[:, :2, :2] = L
+        T[:, :2, 2] = self.dst_mean - np.einsum(
+            'kij,kj->ki', L, self.src_mean)
+        T[:, 2, 2] = 1
+        return T
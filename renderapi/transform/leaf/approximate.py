@@ -0,0 +1,196 @@
+import numpy as np
+import scipy.ndimage
+from renderapi.errors import EstimationError
+from .common import points_array, output_array, chunk_slices
+__all__ = ['ApproximateTransform']
+
+
+class ApproximateTransform(object):
+    """approximation of a transform within a bounding box by interpolating
+    its displacements sampled on a regular lattice, as render does with
+    meshes when rendering.  Points outside of the bounding box are
+    transformed exactly.
+
+    Parameters
+    ----------
+    transform : renderapi.transform.Transform
+        transform to approximate
+    bounds : tuple of float
+        (xmin, ymin, xmax, ymax) of the region in which to approximate
+    spacing : float
+        largest distance between lattice nodes in x and y
+    order : int
+        1 for bilinear or 3 for bicubic (spline) interpolation
+    tolerance : float, optional
+        largest acceptable max_error.  The lattice spacing is halved
+        until the approximation is within tolerance.
+    min_spacing : float
+        smallest spacing tried to reach tolerance
+    check_points : numpy.array, optional
+        a Nx2 array of points at which to also measure the error,
+        such as where the transform is least smooth
+
+    Attributes
+    ----------
+    transform : renderapi.transform.Transform
+        the approximated transform
+    bounds : tuple of float
+        (xmin, ymin, xmax, ymax) of the approximated region
+    spacing : tuple of float
+        distance between lattice nodes in x and y
+    shape : tuple of int
+        number of lattice nodes in y and x
+    order : int
+        order of the interpolation
+    max_error : float
+        largest distance between approximated and exact points at the
+        cell centers and edge midpoints of the lattice, where
+        interpolation errors are largest for smooth transforms, and at
+        check_points within bounds
+
+    Raises
+    ------
+    EstimationError
+        if bounds are empty or tolerance cannot be reached
+    """
+
+    # nodes beyond the bounds for the boundary conditions of splines
+    _padding = {1: 0, 3: 2}
+
+    def __init__(self, transform, bounds, spacing=64., order=1,
+                 tolerance=None, min_spacing=1., check_points=None):
+        if order not in self._padding:
+            raise EstimationError(
+                'order must be 1 or 3 -- got {}'.format(order))
+        xmin, ymin, xmax, ymax = map(float, bounds)
+        if not (xmax > xmin and ymax > ymin):
+            raise EstimationError(
+                'cannot approximate in empty bounds {}'.format(bounds))
+        self.transform = transform
+        self.bounds = (xmin, ymin, xmax, ymax)
+        self.order = order
+        if check_points is not None:
+            check_points = np.asarray(check_points, dtype=np.float64)
+            check_points = check_points[self._inside(check_points)]
+        while True:
+            self._sample(spacing)
+            self.max_error = self._check_error(check_points)
+            if tolerance is None or self.max_error <= tolerance:
+                break
+            spacing = max(self.spacing) / 2.
+            if spacing < min_spacing:
+                raise EstimationError(
+                    'approximation error {} exceeds tolerance {} '
+                    'at spacing {}'.format(
+                        self.max_error, tolerance, max(self.spacing)))
+
+    def _sample(self, spacing):
+        xmin, ymin, xmax, ymax = self.bounds
+        nx = max(2, int(np.ceil((xmax - xmin) / spacing)) + 1)
+        ny = max(2, int(np.ceil((ymax - ymin) / spacing)) + 1)
+        self.spacing = ((xmax - xmin) / (nx - 1), (ymax - ymin) / (ny - 1))
+        self.shape = (ny, nx)
+        pad = self._padding[self.order]
+        x = xmin + np.arange(-pad, nx + pad) * self.spacing[0]
+        y = ymin + np.arange(-pad, ny + pad) * self.spacing[1]
+        nodes = np.stack(np.meshgrid(x, y), axis=-1).reshape(-1, 2)
+        disp = (np.asarray(self.transform.tform(nodes), dtype=np.float64) -
+                nodes).reshape(len(y), len(x), 2)
+        self._origin = (x[0], y[0])
+        if self.order == 1:
+            # a + b*fx + c*fy + d*fx*fy in each cell for x and y, so that
+            #   interpolation gathers a coefficient per point from each row
+            d00 = disp[:-1, :-1]
+            d10 = disp[:-1, 1:]
+            d01 = disp[1:, :-1]
+            d11 = disp[1:, 1:]
+            self._coefficients = np.ascontiguousarray(np.concatenate(
+                [d00, d10 - d00, d01 - d00, d11 - d10 - d01 + d00],
+                axis=-1).reshape(-1, 8).T)
+        else:
+            self._coefficients = [scipy.ndimage.spline_filter(
+                np.ascontiguousarray(disp[:, :, dim]), order=self.order,
+                mode='nearest') for dim in range(2)]
+
+    def _inside(self, points):
+        xmin, ymin, xmax, ymax = self.bounds
+        return ((points[:, 0] >= xmin) & (points[:, 0] <= xmax) &
+                (points[:, 1] >= ymin) & (points[:, 1] <= ymax))
+
+    def _check_error(self, check_points=None):
+        xmin, ymin, xmax, ymax = self.bounds
+        ny, nx = self.shape
+        x = np.linspace(xmin, xmax, 2 * nx - 1)
+        y = np.linspace(ymin, ymax, 2 * ny - 1)
+        ij = np.indices((len(y), len(x))).reshape(2, -1)
+        between = (ij[0] % 2 == 1) | (ij[1] % 2 == 1)
+        points = np.column_stack([x[ij[1][between]], y[ij[0][between]]])
+        if check_points is not None:
+            points = np.vstack([points, check_points])
+        exact = np.asarray(self.transform.tform(points), dtype=np.float64)
+        approx = points + self._displacement(points)
+        return float(np.sqrt(((approx - exact) ** 2).sum(axis=1)).max())
+
+    def _displacement(self, points):
+        u = (points[:, 0] - self._origin[0]) / self.spacing[0]
+        v = (points[:, 1] - self._origin[1]) / self.spacing[1]
+        disp = np.empty((len(points), 2))
+        if self.order == 1:
+            ny, nx = self.shape
+            i = np.clip(u.astype(np.intp), 0, nx - 2)
+            j = np.clip(v.astype(np.intp), 0, ny - 2)
+            fx = u - i
+            fy = v - j
+            cell = j * (nx - 1) + i
+            c = self._coefficients
+            for dim in range(2):
+                d = c[6 + dim].take(cell)
+                d *= fx
+                d += c[4 + dim].take(cell)
+                d *= fy
+                d += c[dim].take(cell)
+                t = c[2 + dim].take(cell)
+                t *= fx
+                d += t
+                disp[:, dim] = d
+            return disp
+        coordinates = np.stack([v, u])
+        for dim in range(2):
+            disp[:, dim] = scipy.ndimage.map_coordinates(
+                self._coefficients[dim], coordinates, order=self.order,
+                mode='nearest', prefilter=False)
+        return disp
+
+    def tform(self, points, out=None, dtype=None):
+        """transform a set of points through the approximation
+
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
+
+        Returns
+        -------
+        numpy.array
+            a Nx2 array of x,y points after transformation
+        """
+        points = points_array(points)
+        out = output_array(points, out, dtype)
+        for sl in chunk_slices(len(points)):
+            chunk = np.array(points[sl], dtype=np.float64)
+            inside = self._inside(chunk)
+            if inside.all():
+                chunk += self._displacement(chunk)
+            else:
+                chunk[inside] += self._displacement(chunk[inside])
+                chunk[~inside] = self.transform.tform(chunk[~inside])
+            out[sl] = chunk
+        return out
+
+    def __call__(self, points):
+        return self.tform(points)
@@ -1,4 +1,9 @@
 import numpy as np
+from renderapi.errors import ConversionError
+
+# rows of points transformed at a time by transforms whose
+# evaluation needs per-point work arrays
+DEFAULT_CHUNK_SIZE = 65536
 
 
 def calc_first_order_properties(M, force_shear='x'):
@@ -55,3 +60,104 @@ def calc_first_order_properties(M, force_shear='x'):
     # room for other cases, for example cx = cy
 
     return sx, sy, cx, cy, theta
+
+
+def points_array(points):
+    """validate a set of points to transform
+
+    Parameters
+    ----------
+    points : array_like
+        a Nx2 array of x,y points
+
+    Returns
+    -------
+    numpy.array
+        points as an array (not copied)
+    """
+    points = np.asarray(points)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ConversionError('Points must be of shape (:, 2) '
+                              '-- got {}'.format(points.shape))
+    return points
+
+
+def output_array(points, out=None, dtype=None, default_dtype=np.float64):
+    """array in which to store transformed points.
+
+    Transforms compute in float64 and store results in out if given,
+    otherwise in a new array of the requested dtype.
+
+    Parameters
+    ----------
+    points : numpy.array
+        a Nx2 array of x,y points to transform
+    out : numpy.array, optional
+        Nx2 array in which to store the result (may be points itself)
+    dtype : numpy.dtype, optional
+        dtype of the result, must match out if both are given
+    default_dtype : numpy.dtype
+        dtype of the result if neither out nor dtype are given
+
+    Returns
+    -------
+    numpy.array
+        Nx2 array for the result
+    """
+    if out is None:
+        return np.empty(points.shape,
+                        dtype=default_dtype if dtype is None else dtype)
+    if out.shape != points.shape:
+        raise ConversionError('out must be of shape {} -- got {}'.format(
+            points.shape, out.shape))
+    if dtype is not None and np.dtype(dtype) != out.dtype:
+        raise ConversionError('out must be of dtype {} -- got {}'.format(
+            np.dtype(dtype), out.dtype))
+    return out
+
+
+def chunk_slices(n, chunk_size=DEFAULT_CHUNK_SIZE):
+    """slices splitting n rows into chunks
+
+    Parameters
+    ----------
+    n : int
+        number of rows
+    chunk_size : int
+        maximum number of rows per chunk
+
+    Returns
+    -------
+    :obj:`list` of :obj:`slice`
+        slices of consecutive chunks
+    """
+    return [slice(i, min(i + chunk_size, n))
+            for i in range(0, n, chunk_size)]
+
+
+def affine_into(points, A, b, out):
+    """out = points A^T + b, without temporaries where the arrays allow
+
+    Parameters
+    ----------
+    points : numpy.array
+        a Nx2 array of x,y points
+    A : numpy.array
+        2x2 linear part
+    b : numpy.array
+        translation of length 2
+    out : numpy.array
+        Nx2 array for the result (may be points itself)
+
+    Returns
+    -------
+    numpy.array
+        out
+    """
+    if (out.dtype == np.float64 and points.dtype == np.float64 and
+            out.flags.c_contiguous and not np.may_share_memory(points, out)):
+        np.dot(points, A.T, out=out)
+        out += b
+    else:
+        out[...] = np.dot(points, A.T) + b
+    return out
@@ -1,7 +1,9 @@
 from .transform import Transform, logger
 from .affine_models import AffineModel
 import numpy as np
-from .common import calc_first_order_properties
+from .common import (
+    calc_first_order_properties, points_array, output_array, chunk_slices)
+from .approximate import ApproximateTransform
 from renderapi.errors import ConversionError, EstimationError, RenderError
 
 try:
@@ -17,6 +19,80 @@ __all__ = [
         'NonLinearTransform', 'LensCorrection']
 
 
+# rows of points evaluated at a time by Polynomial2DTransform.tform,
+# keeping the monomial basis of a chunk in cache
+POLYNOMIAL_CHUNK_SIZE = 16384
+# size in bytes of the feature expansion of a chunk of points
+# evaluated at a time by NonLinearCoordinateTransform.tform
+NONLINEAR_CHUNK_BYTES = 1 << 20
+
+# polynomial orders by number of coefficients
+_polynomial_orders = {}
+
+
+def polynomial_order(no_params):
+    """order of a 2d polynomial
+
+    Parameters
+    ----------
+    no_params : int
+        number of coefficients for both x and y
+
+    Returns
+    -------
+    int
+        order of the polynomial (the terms beyond a complete
+        polynomial of this order are ignored)
+    """
+    order = _polynomial_orders.get(no_params)
+    if order is None:
+        order = _polynomial_orders[no_params] = int(
+            (-3 + np.sqrt(9 - 4 * (2 - no_params))) / 2)
+    return order
+
+
+def monomial_basis(x, y, order, out=None):
+    """monomials of points up to an order, in the order of
+    the coefficients of :class:`Polynomial2DTransform`:
+    1, x, y, x**2, x*y, y**2, ...
+
+    Each monomial is computed from one of lower degree with a single
+    multiplication, so that no power is computed more than once.
+
+    Parameters
+    ----------
+    x : numpy.array
+        N x coordinates
+    y : numpy.array
+        N y coordinates
+    order : int
+        order of polynomial
+    out : numpy.array, optional
+        (order+1)*(order+2)/2 x M array with M >= N in which
+        to store the basis
+
+    Returns
+    -------
+    numpy.array
+        (order+1)*(order+2)/2 x M array whose first N columns
+        are the monomials of each point
+    """
+    n = len(x)
+    no_coeffs = (order + 1) * (order + 2) // 2
+    if out is None or out.shape[0] != no_coeffs or out.shape[1] < n:
+        out = np.empty((no_coeffs, n))
+    basis = out[:, :n]
+    basis[0] = 1.
+    for j in range(1, order + 1):
+        row = j * (j + 1) // 2
+        prev = (j - 1) * j // 2
+        # x**(j-i) * y**i from x**(j-1-i) * y**i, and y**j from y**(j-1)
+        for i in range(j):
+            np.multiply(basis[prev + i], x, out=basis[row + i])
+        np.multiply(basis[prev + j - 1], y, out=basis[row + j])
+    return out
+
+
 class Polynomial2DTransform(Transform):
     """Polynomial2DTransform implemented as in skimage
 
@@ -64,7 +140,6 @@ class Polynomial2DTransform(Transform):
         if json is not None:
             self.from_dict(json)
         else:
-            self.className = 'mpicbg.trakem2.transform.PolynomialTransform2D'
             if dataString is not None:
                 self._process_dataString(dataString)
             elif identity:
@@ -89,8 +164,7 @@ class Polynomial2DTransform(Transform):
     @property
     def order(self):
         """(int) order of polynomial"""
-        no_coeffs = len(self.params.ravel())
-        return int((abs(np.sqrt(4 * no_coeffs + 1)) - 3) / 2)
+        return polynomial_order(np.size(self.params))
 
     def calc_properties(self):
         if self.order == 0:
@@ -167,12 +241,9 @@ class Polynomial2DTransform(Transform):
                     order, len(src)))
 
         A = np.zeros([rows * 2, no_coeff + 1])
-        pidx = 0
-        for j in range(order + 1):
-            for i in range(j + 1):
-                A[:rows, pidx] = xs ** (j - i) * ys ** i
-                A[rows:, pidx + no_coeff // 2] = xs ** (j - i) * ys ** i
-                pidx += 1
+        V = monomial_basis(xs, ys, order).T
+        A[:rows, :no_coeff // 2] = V
+        A[rows:, no_coeff // 2:no_coeff] = V
 
         A[:rows, -1] = xd
         A[rows:, -1] = yd
@@ -293,31 +364,68 @@ class Polynomial2DTransform(Transform):
             [[float(d) for d in raveled_params[:halfway]],
              [float(d) for d in raveled_params[halfway:]]])
 
-    def tform(self, points):
+    def tform(self, points, out=None, dtype=None):
         """transform a set of points through this transformation
 
         Parameters
         ----------
         points : numpy.array
             a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
 
         Returns
         -------
         numpy.array
             a Nx2 array of x,y points after transformation
         """
-        dst = np.zeros(points.shape)
-        x = points[:, 0]
-        y = points[:, 1]
-
-        o = int((-3 + np.sqrt(9 - 4 * (2 - len(self.params.ravel())))) / 2)
-        pidx = 0
-        for j in range(o + 1):
-            for i in range(j + 1):
-                dst[:, 0] += self.params[0, pidx] * x ** (j - i) * y ** i
-                dst[:, 1] += self.params[1, pidx] * x ** (j - i) * y ** i
-                pidx += 1
-        return dst
+        points = points_array(points)
+        out = output_array(points, out, dtype)
+        o = polynomial_order(np.size(self.params))
+        no_coeffs = (o + 1) * (o + 2) // 2
+        coeffs = np.ascontiguousarray(
+            np.asarray(self.params, dtype=np.float64)[:, :no_coeffs].T)
+        direct = out.dtype == np.float64 and out.flags.c_contiguous
+        basis = None
+        for sl in chunk_slices(len(points), POLYNOMIAL_CHUNK_SIZE):
+            basis = monomial_basis(points[sl, 0], points[sl, 1], o,
+                                   out=basis)
+            # the basis of the chunk is complete before out is written,
+            # so that out may be points
+            V = basis[:, :sl.stop - sl.start].T
+            if direct:
+                np.dot(V, coeffs, out=out[sl])
+            else:
+                out[sl] = np.dot(V, coeffs)
+        return out
+
+    def approximate(self, bounds, spacing=64., order=1, tolerance=None):
+        """approximation of this transform by interpolation of its
+        displacements on a regular lattice (see
+        :class:`renderapi.transform.ApproximateTransform`)
+
+        Parameters
+        ----------
+        bounds : tuple of float
+            (xmin, ymin, xmax, ymax) of the region in which to
+            approximate
+        spacing : float
+            largest distance between lattice nodes in x and y
+        order : int
+            1 for bilinear or 3 for bicubic (spline) interpolation
+        tolerance : float, optional
+            largest acceptable maximum error of the approximation
+
+        Returns
+        -------
+        :class:`renderapi.transform.ApproximateTransform`
+            the approximation, with its max_error
+        """
+        return ApproximateTransform(self, bounds, spacing=spacing,
+                                    order=order, tolerance=tolerance)
 
     def coefficients(self, order=None):
         """determine number of coefficient terms in transform for a given order
@@ -425,8 +533,6 @@ class NonLinearCoordinateTransform(Transform):
             if labels is not None:
                 self.labels = labels
             self.transformId = transformId
-            self.className = (
-                'mpicbg.trakem2.transform.NonLinearCoordinateTransform')
 
     def _process_dataString(self, dataString):
 
@@ -477,16 +583,10 @@ class NonLinearCoordinateTransform(Transform):
         numpy.array
             a (N x self.length) array of coefficents
         """
-        x = src[:, 0]
-        y = src[:, 1]
-
-        expanded = np.zeros([len(x), self.length])
-        pidx = 0
-        for i in range(1, self.dimension + 1):
-            for j in range(i, -1, -1):
-                expanded[:, pidx] = (
-                    np.power(x, j) * np.power(y, i - j))
-                pidx += 1
+        expanded = np.zeros([len(src), self.length])
+        nterms = min(self._number_of_terms(), self.length)
+        expanded[:, :nterms] = monomial_basis(
+            src[:, 0], src[:, 1], self.dimension)[1:nterms + 1].T
 
         if normMean is None:
             normMean = self.normMean
@@ -498,6 +598,32 @@ class NonLinearCoordinateTransform(Transform):
         expanded[:, -1] = 100.0
         return expanded
 
+    def _number_of_terms(self):
+        # monomials of degree 1 to dimension in the expansion
+        return (self.dimension + 1) * (self.dimension + 2) // 2 - 1
+
+    def folded_coefficients(self):
+        """coefficients of the unnormalized monomials of points
+        equivalent to beta applied to the normalized expansion of
+        :meth:`kernelExpand`.  These are computed from the current beta,
+        normMean and normVar on each call, so that changes to them in
+        place are reflected.
+
+        Returns
+        -------
+        W : numpy.array
+            a (self.length - 1) x 2 array of coefficients
+        c : numpy.array
+            the constant term for x and y
+        """
+        beta = np.asarray(self.beta, dtype=np.float64)
+        normMean = np.asarray(self.normMean, dtype=np.float64)
+        normVar = np.asarray(self.normVar, dtype=np.float64)
+        # ((f - normMean) / normVar) . beta == f . W + c
+        W = beta[:-1] / normVar[:-1, None]
+        c = 100.0 * beta[-1] - np.dot(normMean[:-1], W)
+        return W, c
+
     def fit(self, A, B):
         """function to fit this transform given the corresponding sets of points A & B
         Parameters
@@ -565,13 +691,18 @@ class NonLinearCoordinateTransform(Transform):
         if return_params:
             return self.dataString
 
-    def tform(self, src):
+    def tform(self, src, out=None, dtype=None):
         """transform a set of points through this transformation
 
         Parameters
         ----------
         points : numpy.array
             a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default the dtype of points)
 
         Returns
         -------
@@ -581,14 +712,57 @@ class NonLinearCoordinateTransform(Transform):
 
         # final double[] featureVector = kernelExpand(position);
         # return multiply(beta, featureVector);
-        nsrc = np.array(src, dtype=np.float64)
-        featureVector = self.kernelExpand(nsrc)
-
-        dst = np.zeros(src.shape)
-        for i in range(0, featureVector.shape[1]):
-            dst[:, 0] = dst[:, 0] + (featureVector[:, i] * self.beta[i, 0])
-            dst[:, 1] = dst[:, 1] + (featureVector[:, i] * self.beta[i, 1])
-        return np.array(dst, dtype=src.dtype)
+        # with the normalization folded into the coefficients, so that
+        # each chunk of points is one product with the monomial basis
+        src = points_array(src)
+        out = output_array(src, out, dtype, default_dtype=src.dtype)
+        W, c = self.folded_coefficients()
+        nterms = min(self._number_of_terms(), len(W))
+        W = np.ascontiguousarray(W[:nterms])
+        direct = out.dtype == np.float64 and out.flags.c_contiguous
+        chunk_size = max(1024, NONLINEAR_CHUNK_BYTES // (8 * (nterms + 1)))
+        basis = None
+        for sl in chunk_slices(len(src), chunk_size):
+            basis = monomial_basis(src[sl, 0], src[sl, 1], self.dimension,
+                                   out=basis)
+            # the basis of the chunk is complete before out is written,
+            # so that out may be src
+            V = basis[1:nterms + 1, :sl.stop - sl.start].T
+            if direct:
+                np.dot(V, W, out=out[sl])
+                out[sl] += c
+            else:
+                out[sl] = np.dot(V, W) + c
+        return out
+
+    def approximate(self, bounds=None, spacing=64., order=1,
+                    tolerance=None):
+        """approximation of this transform by interpolation of its
+        displacements on a regular lattice (see
+        :class:`renderapi.transform.ApproximateTransform`)
+
+        Parameters
+        ----------
+        bounds : tuple of float, optional
+            (xmin, ymin, xmax, ymax) of the region in which to
+            approximate (default
+            the width x height image of this transform)
+        spacing : float
+            largest distance between lattice nodes in x and y
+        order : int
+            1 for bilinear or 3 for bicubic (spline) interpolation
+        tolerance : float, optional
+            largest acceptable maximum error of the approximation
+
+        Returns
+        -------
+        :class:`renderapi.transform.ApproximateTransform`
+            the approximation, with its max_error
+        """
+        if bounds is None:
+            bounds = (0, 0, self.width, self.height)
+        return ApproximateTransform(self, bounds, spacing=spacing,
+                                    order=order, tolerance=tolerance)
 
     @property
     def dataString(self):
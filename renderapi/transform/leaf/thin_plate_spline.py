@@ -1,16 +1,30 @@
 import numpy as np
 from renderapi.errors import RenderError, EstimationError
-from renderapi.utils import encodeBase64, decodeBase64
+from renderapi.utils import encodeBase64, decodeBase64, iter_concurrent
 from .transform import Transform
+from .approximate import ApproximateTransform
+from .common import points_array, output_array, chunk_slices, \
+    DEFAULT_CHUNK_SIZE
+import scipy.linalg
 import scipy.spatial
 import logging
 import sys
+import threading
+import warnings
+from numpy.linalg import LinAlgError
 __all__ = ['ThinPlateSplineTransform']
 
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 
+# default bytes of work space for evaluating the kernel of
+# ThinPlateSplineTransform.apply, shared by all of its threads
+TPS_MEMORY_BUDGET = 1 << 24
+# nodes per axis of the lattice of forward mapped points used for
+# initial guesses of ThinPlateSplineTransform.inverse_tform
+INVERSE_GRID_SIZE = 32
+
 
 class ThinPlateSplineTransform(Transform):
     """
@@ -41,8 +55,6 @@ class ThinPlateSplineTransform(Transform):
                 self._process_dataString(dataString)
             self.labels = labels
             self.transformId = transformId
-            self.className = (
-                'mpicbg.trakem2.transform.ThinPlateSplineTransform')
 
     def _process_dataString(self, dataString):
         fields = dataString.split(" ")
@@ -75,40 +87,338 @@ class ThinPlateSplineTransform(Transform):
                 "inconsistent sizes and array lengths, \
                  in ThinPlateSplineTransform dataString")
 
-    def tform(self, points):
+    def tform(self, points, out=None, dtype=None, memory_budget=None,
+              threads=1):
         """transform a set of points through this transformation
 
         Parameters
         ----------
         points : numpy.array
             a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
+        memory_budget : int, optional
+            bytes of work space for evaluating the kernel
+            (default TPS_MEMORY_BUDGET)
+        threads : int
+            number of threads evaluating chunks of points
 
         Returns
         -------
         numpy.array
             a Nx2 array of x,y points after transformation
         """
-        return self.apply(points)
+        return self.apply(points, out=out, dtype=dtype,
+                          memory_budget=memory_budget, threads=threads)
+
+    def apply(self, points, out=None, dtype=None, memory_budget=None,
+              threads=1):
+        """transform a set of points through this transformation,
+        evaluating the kernel for chunks of points at a time
+
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        out : numpy.array, optional
+            a Nx2 array in which to store the result
+            (may be points itself)
+        dtype : numpy.dtype, optional
+            dtype of the result (default float64)
+        memory_budget : int, optional
+            bytes of work space for evaluating the kernel, which bounds
+            the number of points in a chunk to about
+            memory_budget / (16 * nLm * threads)
+            (default TPS_MEMORY_BUDGET)
+        threads : int
+            number of threads evaluating chunks of points
 
-    def apply(self, points):
+        Returns
+        -------
+        numpy.array
+            a Nx2 array of x,y points after transformation
+        """
         if not hasattr(self, 'dMtxDat'):
-            return points
+            if out is None and dtype is None:
+                return points
+            points = points_array(points)
+            out = output_array(points, out, dtype)
+            out[...] = points
+            return out
+
+        points = points_array(points)
+        out = output_array(points, out, dtype)
+        if memory_budget is None:
+            memory_budget = TPS_MEMORY_BUDGET
+        threads = max(1, threads)
+        chunk_size = int(min(DEFAULT_CHUNK_SIZE, max(
+            1, memory_budget // (16 * max(1, self.nLm) * threads))))
+        local = threading.local()
+
+        def apply_chunk(sl):
+            # work space of each thread, reused for all of its chunks
+            work = getattr(local, 'work', None)
+            if work is None:
+                work = local.work = self._work_arrays(chunk_size)
+            # a copy, so that out may be points
+            chunk = np.array(points[sl], dtype=np.float64)
+            result = self.computeDeformationContribution(chunk, work=work)
+            result += chunk
+            if self.aMtx is not None:
+                result += chunk.dot(self.aMtx.T)
+            if self.bVec is not None:
+                result += self.bVec
+            out[sl] = result
+
+        slices = chunk_slices(len(points), chunk_size)
+        if threads > 1 and len(points) > chunk_size:
+            # numpy releases the GIL in the kernel, and chunks write
+            #   disjoint rows of out
+            for _ in iter_concurrent(apply_chunk, slices,
+                                     max_workers=threads, ordered=False):
+                pass
+        else:
+            for sl in slices:
+                apply_chunk(sl)
+        return out
+
+    def _work_arrays(self, n, count=2):
+        return [np.empty(n * self.nLm) for i in range(count)]
 
-        result = points + self.computeDeformationContribution(points)
+    def computeDeformationContribution(self, points, work=None):
+        """displacement of points by the nonlinear (kernel) part of
+        this transformation
+
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        work : list of numpy.array, optional
+            two arrays of at least N * nLm float64 elements
+            to use as work space
+
+        Returns
+        -------
+        numpy.array
+            a Nx2 array of displacements
+        """
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        if work is None:
+            work = self._work_arrays(n)
+        r2 = work[0][:n * self.nLm].reshape(n, self.nLm)
+        t = work[1][:n * self.nLm].reshape(n, self.nLm)
+        np.subtract.outer(points[:, 0], self.srcPts[0], out=r2)
+        r2 *= r2
+        np.subtract.outer(points[:, 1], self.srcPts[1], out=t)
+        t *= t
+        r2 += t
+        # r**2 * log(r) == r2 * log(r2) / 2, which is 0 at r == 0
+        #   (as the finite log of the smallest positive float times 0)
+        np.maximum(r2, np.finfo(np.float64).tiny, out=t)
+        np.log(t, out=t)
+        r2 *= t
+        return r2.dot(0.5 * self.dMtxDat.T)
+
+    def _affine_matrix(self):
+        # linear part of the transformation without the kernel
+        A = np.eye(2)
         if self.aMtx is not None:
-            result += self.aMtx.dot(points.transpose()).transpose()
+            A += self.aMtx
+        return A
+
+    def tform_and_jacobian(self, points, memory_budget=None):
+        """transform a set of points through this transformation and
+        compute its Jacobian at each point
+
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        memory_budget : int, optional
+            bytes of work space for evaluating the kernel
+            (default TPS_MEMORY_BUDGET)
+
+        Returns
+        -------
+        values : numpy.array
+            a Nx2 array of x,y points after transformation
+        jacobian : numpy.array
+            a Nx2x2 array of the derivatives of x', y' (rows)
+            with respect to x, y (columns)
+        """
+        points = np.asarray(points_array(points), dtype=np.float64)
+        A = self._affine_matrix()
+        values = points.dot(A.T)
         if self.bVec is not None:
-            result += self.bVec
+            values += self.bVec
+        jacobian = np.empty((len(points), 2, 2))
+        jacobian[...] = A
+        if not hasattr(self, 'dMtxDat'):
+            return values, jacobian
+        if memory_budget is None:
+            memory_budget = TPS_MEMORY_BUDGET
+        chunk_size = int(min(DEFAULT_CHUNK_SIZE, max(
+            1, memory_budget // (32 * max(1, self.nLm)))))
+        work = self._work_arrays(chunk_size, 4)
+        D = np.ascontiguousarray(self.dMtxDat.T)
+        for sl in chunk_slices(len(points), chunk_size):
+            n = sl.stop - sl.start
+            dx, dy, r2, t = [w[:n * self.nLm].reshape(n, self.nLm)
+                             for w in work]
+            np.subtract.outer(points[sl, 0], self.srcPts[0], out=dx)
+            np.subtract.outer(points[sl, 1], self.srcPts[1], out=dy)
+            np.multiply(dx, dx, out=r2)
+            np.multiply(dy, dy, out=t)
+            r2 += t
+            np.maximum(r2, np.finfo(np.float64).tiny, out=t)
+            np.log(t, out=t)
+            # U = r2 * log(r2) / 2 and grad U = (log(r2) + 1) * (p - s),
+            #   both 0 at r == 0 where p - s is 0
+            r2 *= t
+            values[sl] += r2.dot(0.5 * D)
+            t += 1.
+            dx *= t
+            dy *= t
+            jacobian[sl, :, 0] += dx.dot(D)
+            jacobian[sl, :, 1] += dy.dot(D)
+        return values, jacobian
+
+    def jacobian(self, points, memory_budget=None):
+        """Jacobian of this transformation at a set of points
 
-        return result
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        memory_budget : int, optional
+            bytes of work space for evaluating the kernel
+            (default TPS_MEMORY_BUDGET)
 
-    def computeDeformationContribution(self, points):
-        disp = scipy.spatial.distance.cdist(
-                points,
-                self.srcPts.transpose(),
-                metric='sqeuclidean')
-        disp *= np.ma.log(np.sqrt(disp)).filled(0.0)
-        return disp.dot(self.dMtxDat.transpose())
+        Returns
+        -------
+        numpy.array
+            a Nx2x2 array of the derivatives of x', y' (rows)
+            with respect to x, y (columns)
+        """
+        return self.tform_and_jacobian(points, memory_budget)[1]
+
+    @staticmethod
+    def _solve2x2(J, r):
+        # J^-1 r for stacked 2x2 J, or r where J is singular
+        det = J[:, 0, 0] * J[:, 1, 1] - J[:, 0, 1] * J[:, 1, 0]
+        singular = np.abs(det) <= np.finfo(np.float64).tiny
+        det[singular] = 1.
+        delta = np.empty_like(r)
+        delta[:, 0] = (J[:, 1, 1] * r[:, 0] - J[:, 0, 1] * r[:, 1]) / det
+        delta[:, 1] = (J[:, 0, 0] * r[:, 1] - J[:, 1, 0] * r[:, 0]) / det
+        delta[singular] = r[singular]
+        return delta
+
+    def _initial_inverse(self, pts, initial='affine'):
+        if initial == 'affine':
+            # inverse of the affine part of the transformation
+            b = self.bVec if self.bVec is not None else 0.
+            return np.linalg.solve(self._affine_matrix(), (pts - b).T).T
+        if initial == 'grid':
+            # a Newton step from the lattice node mapped nearest to
+            #   each point
+            mn = self.srcPts.min(axis=1)
+            mx = self.srcPts.max(axis=1)
+            nodes = self.src_array(mn[0], mn[1], mx[0], mx[1],
+                                   INVERSE_GRID_SIZE, INVERSE_GRID_SIZE)
+            mapped, J = self.tform_and_jacobian(nodes)
+            nearest = scipy.spatial.cKDTree(mapped).query(pts)[1]
+            return nodes[nearest] + self._solve2x2(
+                J[nearest], pts - mapped[nearest])
+        raise EstimationError(
+            "initial must be 'affine' or 'grid' -- got {}".format(initial))
+
+    def newton(self, pts, precision=0.0001, max_iters=1000,
+               initial='affine', tolerance=None):
+        """damped Newton iteration for the inverse of this transformation,
+        iterating only on points that have not converged.  Steps that do
+        not reduce the distance of the transformed estimate to a point
+        are halved.
+
+        Parameters
+        ----------
+        pts : numpy array
+            a Nx2 array of x,y points
+        precision : float
+            criteria for stopping for the length of an undamped step
+        max_iters : int
+            limit for iterations, error if reached
+        initial : str
+            initial estimates from the inverse of the affine part
+            ('affine') or from a lattice of forward mapped points
+            ('grid')
+        tolerance : float, optional
+            largest acceptable distance of a transformed estimate to its
+            point (default precision)
+
+        Returns
+        -------
+        cur_pts : numpy array
+            a Nx2 array of x,y points, estimated inverse of pt
+
+        Raises
+        ------
+        EstimationError
+            if max_iters is reached or if the estimates of some points
+            stall farther than tolerance from their inverse, as when
+            this transformation folds
+        """
+        if tolerance is None:
+            tolerance = precision
+        pts = np.asarray(points_array(pts), dtype=np.float64)
+        cur_pts = self._initial_inverse(pts, initial)
+        values, J = self.tform_and_jacobian(cur_pts)
+        residual = values - pts
+        error = np.sqrt((residual ** 2).sum(axis=1))
+        delta = self._solve2x2(J, residual)
+        damping = np.ones(len(pts))
+        active = np.arange(len(pts))
+        iters = 0
+        while True:
+            step = damping[:, None] * delta
+            small = np.sqrt((step ** 2).sum(axis=1)) < precision
+            # only an undamped step from an accepted estimate converges,
+            #   a damped step that became small has stalled
+            done = small & (damping == 1.)
+            cur_pts[active[done]] -= step[done]
+            keep = ~small
+            active, delta, damping = active[keep], delta[keep], damping[keep]
+            if not active.size:
+                break
+            if iters == max_iters:
+                raise EstimationError(
+                    'Newton iteration for inversion of ThinPlateSpline '
+                    'reached maximum iterations: %d' % max_iters)
+            trial = cur_pts[active] - step[keep]
+            values, J = self.tform_and_jacobian(trial)
+            residual = values - pts[active]
+            trial_error = np.sqrt((residual ** 2).sum(axis=1))
+            better = trial_error < error[active]
+            accepted = active[better]
+            cur_pts[accepted] = trial[better]
+            error[accepted] = trial_error[better]
+            delta[better] = self._solve2x2(J[better], residual[better])
+            damping[better] = 1.
+            damping[~better] *= 0.5
+            iters += 1
+        error = np.sqrt(((self.tform(cur_pts) - pts) ** 2).sum(axis=1))
+        failed = np.flatnonzero(~(error <= tolerance))
+        if failed.size:
+            raise EstimationError(
+                'Newton iteration for inversion of ThinPlateSpline did '
+                'not converge for %d points, largest error %g at %s' % (
+                    failed.size, error[failed].max(),
+                    pts[failed[np.argmax(error[failed])]]))
+        return cur_pts
 
     def gradient_descent(
             self,
@@ -152,7 +462,10 @@ class ThinPlateSplineTransform(Transform):
             points,
             gamma=1.0,
             precision=0.0001,
-            max_iters=1000):
+            max_iters=1000,
+            method='newton',
+            initial='affine',
+            tolerance=None):
         """transform a set of points through the inverse of this transformation
         Parameters
         ----------
@@ -160,15 +473,35 @@ class ThinPlateSplineTransform(Transform):
             a Nx2 array of x,y points
         gamma : float
             step size is gamma fraction of current gradient
+            (gradient_descent only)
         precision : float
             criteria for stopping for differences between steps
         max_iters : int
             limit for iterations, error if reached
+        method : str
+            'newton' (see newton) or 'gradient_descent'
+            (see gradient_descent)
+        initial : str
+            initial estimates for newton, 'affine' or 'grid'
+        tolerance : float, optional
+            largest acceptable distance of a transformed estimate to its
+            point for newton (default precision)
         Returns
         -------
         numpy.array
             a Nx2 array of x,y points after inverse transformation
         """
+        if method == 'newton':
+            return self.newton(
+                    points,
+                    precision=precision,
+                    max_iters=max_iters,
+                    initial=initial,
+                    tolerance=tolerance)
+        if method != 'gradient_descent':
+            raise EstimationError(
+                "method must be 'newton' or 'gradient_descent' "
+                "-- got {}".format(method))
         newpts = self.gradient_descent(
                 points,
                 gamma=gamma,
@@ -176,6 +509,39 @@ class ThinPlateSplineTransform(Transform):
                 max_iters=max_iters)
         return newpts
 
+    def approximate(self, bounds=None, spacing=64., order=1,
+                    tolerance=None):
+        """approximation of this transform by interpolation of its
+        displacements on a regular lattice (see
+        :class:`renderapi.transform.ApproximateTransform`)
+
+        Parameters
+        ----------
+        bounds : tuple of float, optional
+            (xmin, ymin, xmax, ymax) of the region in which to
+            approximate (default
+            the bounding box of srcPts)
+        spacing : float
+            largest distance between lattice nodes in x and y
+        order : int
+            1 for bilinear or 3 for bicubic (spline) interpolation
+        tolerance : float, optional
+            largest acceptable maximum error of the approximation
+
+        Returns
+        -------
+        :class:`renderapi.transform.ApproximateTransform`
+            the approximation, with its max_error
+        """
+        if bounds is None:
+            mn = self.srcPts.min(axis=1)
+            mx = self.srcPts.max(axis=1)
+            bounds = (mn[0], mn[1], mx[0], mx[1])
+        # the kernel is least smooth at the landmarks
+        return ApproximateTransform(self, bounds, spacing=spacing,
+                                    order=order, tolerance=tolerance,
+                                    check_points=self.srcPts.T)
+
     @staticmethod
     def fit(A, B, computeAffine=True):
         """function to fit this transform given the corresponding sets of points A & B
@@ -202,54 +568,53 @@ class ThinPlateSplineTransform(Transform):
                 'shape mismatch! A shape: {}, B shape {}'.format(
                     A.shape, B.shape))
 
-        # build displacements
-        ndims = B.shape[1]
-        nLm = B.shape[0]
-        y = (B - A).flatten()
-
-        # compute K
-        # tempting to matricize this, but, nLm x nLm can get big
-        # settle for vectorize
-        kMatrix = np.zeros((ndims * nLm, ndims * nLm))
-        for i in range(nLm):
-            r = np.linalg.norm(A[i, :] - A, axis=1)
-            nrm = np.zeros_like(r)
-            ind = np.argwhere(r > 1e-8)
-            nrm[ind] = r[ind] * r[ind] * np.log(r[ind])
-            kMatrix[i * ndims, 0::2] = nrm
-            kMatrix[(i * ndims + 1)::2, 1::2] = nrm
-
-        # compute L
-        lMatrix = kMatrix
+        # the x and y displacements share the kernel system, so solve
+        #   one (nLm + 3) x (nLm + 3) system with two right hand sides
+        A = np.asarray(A, dtype=np.float64)
+        nLm, ndims = A.shape
+        nrows = nLm + ndims + 1 if computeAffine else nLm
+        lMatrix = np.zeros((nrows, nrows))
+        kMatrix = lMatrix[:nLm, :nLm]
+        t = np.empty((nLm, nLm))
+        np.subtract.outer(A[:, 0], A[:, 0], out=kMatrix)
+        kMatrix *= kMatrix
+        np.subtract.outer(A[:, 1], A[:, 1], out=t)
+        t *= t
+        kMatrix += t
+        # r**2 * log(r), which is 0 at r == 0
+        np.maximum(kMatrix, np.finfo(np.float64).tiny, out=t)
+        np.log(t, out=t)
+        kMatrix *= t
+        kMatrix *= 0.5
+        del t
+
+        y = np.zeros((nrows, ndims))
+        y[:nLm] = B - A
         if computeAffine:
-            pMatrix = np.tile(np.eye(ndims), (nLm, ndims + 1))
-            for d in range(ndims):
-                pMatrix[0::2, d*ndims] = A[:, d]
-                pMatrix[1::2, d*ndims + 1] = A[:, d]
-            lMatrix = np.zeros(
-                    (ndims * (nLm + ndims + 1), ndims * (nLm + ndims + 1)))
-            lMatrix[
-                    0: pMatrix.shape[0],
-                    kMatrix.shape[1]: kMatrix.shape[1] + pMatrix.shape[1]] = \
-                pMatrix
-            pMatrix = np.transpose(pMatrix)
-            lMatrix[
-                    kMatrix.shape[0]: kMatrix.shape[0] + pMatrix.shape[0],
-                    0: pMatrix.shape[1]] = pMatrix
-            lMatrix[0: ndims * nLm, 0: ndims * nLm] = kMatrix
-            y = np.append(y, np.zeros(ndims * (ndims + 1)))
-
-        wMatrix = np.linalg.solve(lMatrix, y)
-
-        dMatrix = np.reshape(wMatrix[0: ndims * nLm], (ndims, nLm), order='F')
+            lMatrix[:nLm, nLm:nLm + ndims] = A
+            lMatrix[:nLm, -1] = 1.
+            lMatrix[nLm:, :nLm] = lMatrix[:nLm, nLm:].T
+
+        try:
+            with warnings.catch_warnings():
+                # kernel systems of pixel coordinates are always poorly
+                #   conditioned by this estimate, and are solved as
+                #   accurately as by a general solver
+                warnings.simplefilter('ignore', scipy.linalg.LinAlgWarning)
+                wMatrix = scipy.linalg.solve(
+                    lMatrix, y, assume_a='sym', overwrite_a=True,
+                    overwrite_b=True, check_finite=False)
+        except (LinAlgError, ValueError) as e:
+            raise EstimationError(
+                'could not solve for ThinPlateSpline coefficients '
+                '-- are landmarks repeated? msg: {}'.format(e))
+
+        dMatrix = np.ascontiguousarray(wMatrix[:nLm].T)
         aMatrix = None
         bVector = None
         if computeAffine:
-            aMatrix = np.reshape(
-                    wMatrix[ndims * nLm: ndims * nLm + ndims * ndims],
-                    (ndims, ndims),
-                    order='F')
-            bVector = wMatrix[ndims * nLm + ndims * ndims:]
+            aMatrix = np.ascontiguousarray(wMatrix[nLm:nLm + ndims].T)
+            bVector = wMatrix[-1].copy()
 
         return dMatrix, aMatrix, bVector
 
@@ -271,6 +636,105 @@ class ThinPlateSplineTransform(Transform):
         (self.nLm, self.ndims) = B.shape
         self.srcPts = np.transpose(A)
 
+    @staticmethod
+    def _worst_per_cell(points, error, n):
+        # indices of up to n points with the largest error, at most one
+        #   from each cell of a grid of about n cells over points
+        side = int(np.ceil(np.sqrt(n)))
+        mn = points.min(axis=0)
+        size = np.maximum(points.max(axis=0) - mn, 1e-8) / side
+        ij = np.minimum(((points - mn) // size).astype(int), side - 1)
+        cells = ij[:, 1] * side + ij[:, 0]
+        order = np.lexsort((-error, cells))
+        _, first = np.unique(cells[order], return_index=True)
+        worst = order[first]
+        return worst[np.argsort(-error[worst])][:n]
+
+    def estimate_decimated(self, A, B, computeAffine=True, tol=1.0,
+                           starting_grid=7, nworst=10, growth=0.5,
+                           max_landmarks=5000, max_iter=50):
+        """method for setting this transformation to match many
+        corresponding points A,B within a tolerance, using a subset of
+        them as landmarks.  Starting from the points nearest the
+        centers of a starting_grid x starting_grid grid, the points
+        matched worst in different regions are added as landmarks until
+        all points are matched within tol.  The cost of each iteration
+        is a fit to the landmarks and an evaluation at all points, so
+        that tens of thousands of points can be matched.
+
+        Parameters
+        ----------
+        A : numpy.array
+            a Nx2 matrix of source points
+        B : numpy.array
+            a Nx2 matrix of destination points
+        computeAffine: boolean
+            whether to include an affine computation
+        tol : float
+            in units of pixels, how close should the points match
+        starting_grid : int
+            estimate will start with landmarks from an n x n grid
+        nworst : int
+            least number of landmarks added per iteration
+        growth : float
+            landmarks added per iteration as a fraction of the number
+            of landmarks, if more than nworst
+        max_landmarks : int
+            limit for the number of landmarks, error if exceeded
+        max_iter : int
+            limit for iterations, error if reached
+
+        Returns
+        -------
+        numpy.array
+            indices of the points of A used as landmarks
+
+        Raises
+        ------
+        EstimationError
+            if the points cannot be matched within tol
+        """
+        A = np.asarray(A, dtype=np.float64)
+        B = np.asarray(B, dtype=np.float64)
+        if not all([A.shape[0] == B.shape[0], A.shape[1] == B.shape[1] == 2]):
+            raise EstimationError(
+                'shape mismatch! A shape: {}, B shape {}'.format(
+                    A.shape, B.shape))
+        # the point nearest the center of each grid cell
+        mn = A.min(axis=0)
+        size = np.maximum(A.max(axis=0) - mn, 1e-8) / starting_grid
+        landmarks = np.unique(self._worst_per_cell(
+            A, -np.linalg.norm((A - mn) % size - size / 2, axis=1),
+            starting_grid ** 2))
+
+        for niter in range(max_iter + 1):
+            self.estimate(A[landmarks], B[landmarks],
+                          computeAffine=computeAffine)
+            error = np.linalg.norm(self.tform(A) - B, axis=1)
+            bad = np.flatnonzero(error > tol)
+            if bad.size == 0:
+                return landmarks
+            if niter == max_iter:
+                raise EstimationError(
+                    "Max number of iterations ({}) reached in"
+                    " ThinPlateSplineTransform.estimate_decimated()".format(
+                        max_iter))
+            add = bad[self._worst_per_cell(
+                A[bad], error[bad], max(nworst, int(growth * len(landmarks))))]
+            # points at landmarks cannot be matched any better
+            distance = scipy.spatial.cKDTree(A[landmarks]).query(A[add])[0]
+            add = add[distance > 1e-8]
+            if add.size == 0:
+                raise EstimationError(
+                    'points coinciding with landmarks are not matched '
+                    'within {} in ThinPlateSplineTransform.'
+                    'estimate_decimated()'.format(tol))
+            if len(landmarks) + len(add) > max_landmarks:
+                raise EstimationError(
+                    'more than {} landmarks needed in ThinPlateSpline'
+                    'Transform.estimate_decimated()'.format(max_landmarks))
+            landmarks = np.concatenate([landmarks, add])
+
     @property
     def dataString(self):
         header = 'ThinPlateSplineR2LogR {} {}'.format(self.ndims, self.nLm)
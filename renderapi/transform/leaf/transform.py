@@ -6,7 +6,7 @@ Currently only implemented to facilitate Affine and Polynomial2D
 """
 import logging
 
-from renderapi.utils import NullHandler
+from renderapi.utils import NullHandler, _intern
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
@@ -80,7 +80,11 @@ class Transform(object):
         d : dict
             json compatible representation of this transform
         """
-        self.className = d['className']
+        className = d['className']
+        # subclasses define className as a class attribute, which is
+        # only stored per instance if it differs from that of the class
+        if className != getattr(type(self), 'className', None):
+            self.className = _intern(className)
         self.transformId = d.get('id', None)
         self._process_dataString(d['dataString'])
         md = d.get('metaData', None)
@@ -1,5 +1,6 @@
 import json
 from renderapi.errors import RenderError
+from renderapi.utils import _intern
 from renderapi.transform.leaf import load_leaf_json
 __all__ = [
         'TransformList',
@@ -87,6 +88,23 @@ class TransformList:
                 self.tforms.append(load_transform_json(td))
         return self.tforms
 
+    def compile(self, reference_tforms=None):
+        """compile this TransformList into a reusable evaluator
+        in which consecutive affine transforms are folded into one
+
+        Parameters
+        ----------
+        reference_tforms : list or :class:`TransformResolver`, optional
+            transforms to which reference transforms refer
+
+        Returns
+        -------
+        :class:`renderapi.transform.CompiledTransform`
+            evaluator of this TransformList
+        """
+        from .utils import compile_transforms
+        return compile_transforms(self.tforms, reference_tforms)
+
 
 class InterpolatedTransform:
     """Transform spec defined by linear interpolation of
@@ -198,7 +216,8 @@ class ReferenceTransform:
         d : dict
             json compatible representation of this transform
         """
-        self.refId = d['refId']
+        # many tiles refer to the same transform
+        self.refId = _intern(d['refId'])
 
     def __str__(self):
         return 'ReferenceTransform(%s)' % self.refId
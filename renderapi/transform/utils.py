@@ -1,11 +1,181 @@
 from collections.abc import Iterable
-from renderapi.errors import RenderError
+import numpy as np
+from renderapi.errors import ConversionError, RenderError
 from .leaf import AffineModel, Polynomial2DTransform
 from .transform import TransformList, ReferenceTransform
-__all__ = ['estimate_dstpts',
+try:
+    from inspect import getfullargspec
+except ImportError:
+    from inspect import getargspec as getfullargspec
+__all__ = ['CompiledTransform',
+           'TransformResolver',
+           'compile_transforms',
+           'estimate_dstpts',
+           'estimate_dstpts_batch',
            'estimate_transformsum']
 
 
+class TransformResolver(object):
+    """index of the transforms to which reference transforms refer,
+    resolving transform lists into the chains of leaf transforms
+    they apply.
+
+    Build a resolver once, e.g. from the shared transforms of
+    :class:`renderapi.resolvedtiles.ResolvedTiles`, and pass it as the
+    reference_tforms of :func:`estimate_dstpts` and
+    :meth:`renderapi.tilespec.TileSpec.bbox_transformed` to avoid
+    searching the reference transforms for every tile.  Resolved chains
+    of reference transforms are memoized, so the referenced transforms
+    should not be modified while the resolver is in use.
+
+    Attributes
+    ----------
+    transforms : dict
+        referenced transforms keyed by transformId
+    """
+    def __init__(self, reference_tforms=None):
+        """Initialize TransformResolver
+
+        Parameters
+        ----------
+        reference_tforms : :obj:`list` of :obj:`Transform`, optional
+            transforms to which reference transforms refer.  The first
+            of several transforms with the same transformId is used.
+        """
+        self._supplied = reference_tforms is not None
+        self.transforms = {}
+        for tform in (reference_tforms or []):
+            self.transforms.setdefault(tform.transformId, tform)
+        self._chains = {}
+
+    @classmethod
+    def from_resolvedtiles(cls, resolvedtiles):
+        """resolver of the shared transforms of resolved tiles
+
+        Parameters
+        ----------
+        resolvedtiles : :class:`renderapi.resolvedtiles.ResolvedTiles`
+            resolved tiles
+
+        Returns
+        -------
+        :class:`TransformResolver`
+            resolver of resolvedtiles.transforms
+        """
+        return cls(resolvedtiles.transforms)
+
+    def __len__(self):
+        return len(self.transforms)
+
+    def __contains__(self, refId):
+        return refId in self.transforms
+
+    def __getitem__(self, refId):
+        try:
+            return self.transforms[refId]
+        except KeyError:
+            if not self._supplied:
+                raise RenderError(
+                    "you supplied a set of tranforms that includes a "
+                    "reference transform, but didn't supply a set of "
+                    "reference transforms to enable dereferencing")
+            raise RenderError(
+                "the list of transforms you provided references "
+                "transorm {} but that transform could not be found "
+                "in the list of reference transforms".format(refId))
+
+    def resolve(self, refId):
+        """leaf transforms applied by a referenced transform
+
+        Parameters
+        ----------
+        refId : str
+            transformId of referenced transform
+
+        Returns
+        -------
+        :obj:`list` of :obj:`Transform`
+            leaf transforms in order of application
+
+        Raises
+        ------
+        RenderError
+            if the transform or a transform it refers to cannot be
+            found, or if reference transforms refer to each other
+            in a cycle
+        """
+        return list(self._resolve(refId, ()))
+
+    def flatten(self, transformlist):
+        """leaf transforms applied by a list of transforms, resolving
+        nested lists, :class:`TransformList` and
+        :class:`ReferenceTransform` objects
+
+        Parameters
+        ----------
+        transformlist : :obj:`list` of :obj:`Transform`
+            transforms
+
+        Returns
+        -------
+        :obj:`list` of :obj:`Transform`
+            leaf transforms in order of application
+        """
+        return self._flatten(transformlist, (), [])
+
+    def _resolve(self, refId, visiting):
+        chain = self._chains.get(refId)
+        if chain is None:
+            if refId in visiting:
+                raise RenderError(
+                    "reference transforms form a cycle: {}".format(
+                        ' -> '.join(visiting + (refId,))))
+            chain = tuple(self._flatten(
+                [self[refId]], visiting + (refId,), []))
+            self._chains[refId] = chain
+        return chain
+
+    def _flatten(self, transformlist, visiting, out):
+        for tform in transformlist:
+            if isinstance(tform, list):
+                self._flatten(tform, visiting, out)
+            elif isinstance(tform, TransformList):
+                self._flatten(tform.tforms, visiting, out)
+            elif isinstance(tform, ReferenceTransform):
+                out.extend(self._resolve(tform.refId, visiting))
+            else:
+                out.append(tform)
+        return out
+
+
+class _ListResolver(TransformResolver):
+    """resolver searching a list of reference transforms, for single
+    use where indexing all of them would cost more than the search"""
+    def __init__(self, reference_tforms=None):
+        self._supplied = reference_tforms is not None
+        self._reference_tforms = reference_tforms or []
+        self._chains = {}
+
+    @property
+    def transforms(self):
+        transforms = {}
+        for tform in self._reference_tforms:
+            transforms.setdefault(tform.transformId, tform)
+        return transforms
+
+    def __getitem__(self, refId):
+        for tform in self._reference_tforms:
+            if tform.transformId == refId:
+                return tform
+        return super(_ListResolver, self).__getitem__(refId)
+
+
+def _get_resolver(reference_tforms):
+    if isinstance(reference_tforms, TransformResolver):
+        return reference_tforms
+    return _ListResolver(reference_tforms)
+
+
 def estimate_dstpts(transformlist, src=None, reference_tforms=None):
     """estimate destination points for list of transforms.  Recurses
     through lists.
@@ -16,6 +186,8 @@ def estimate_dstpts(transformlist, src=None, reference_tforms=None):
         transforms that have a tform method implemented
     src : numpy.array
         a Nx2  array of source points
+    reference_tforms : list or :class:`TransformResolver`, optional
+        :obj:`Transform` objects to which reference transforms refer
 
     Returns
     -------
@@ -23,28 +195,196 @@ def estimate_dstpts(transformlist, src=None, reference_tforms=None):
         Nx2 array of destination points
     """
     dstpts = src
-    for tform in transformlist:
-        if isinstance(tform, list):
-            dstpts = estimate_dstpts(tform, dstpts, reference_tforms)
-        elif isinstance(tform, TransformList):
-            dstpts = estimate_dstpts(tform.tforms, dstpts, reference_tforms)
-        elif isinstance(tform, ReferenceTransform):
-            try:
-                tform_deref = next((tf for tf in reference_tforms
-                                    if tf.transformId == tform.refId))
-            except TypeError:
-                raise RenderError(
-                    "you supplied a set of tranforms that includes a "
-                    "reference transform, but didn't supply a set of "
-                    "reference transforms to enable dereferencing")
-            except StopIteration:
-                raise RenderError(
-                    "the list of transforms you provided references "
-                    "transorm {} but that transform could not be found "
-                    "in the list of reference transforms".format(tform.refId))
-            dstpts = estimate_dstpts([tform_deref], dstpts, reference_tforms)
+    for tform in _get_resolver(reference_tforms).flatten(transformlist):
+        dstpts = tform.tform(dstpts)
+    return dstpts
+
+
+def _fold_affines(tforms):
+    """fold consecutive affine transforms in a list of leaf transforms
+    into single affines, following :meth:`AffineModel.concatenate`"""
+    folded = []
+    for tform in tforms:
+        if (isinstance(tform, AffineModel) and folded and
+                isinstance(folded[-1], AffineModel)):
+            folded[-1] = tform.concatenate(folded[-1])
         else:
-            dstpts = tform.tform(dstpts)
+            folded.append(tform)
+    return folded
+
+
+def _accepts_out(tform):
+    """whether the tform method of a transform has an out argument"""
+    try:
+        arginfo = getfullargspec(tform.tform)
+    except TypeError:
+        return False
+    return 'out' in arginfo.args + getattr(arginfo, 'kwonlyargs', [])
+
+
+class CompiledTransform(object):
+    """reusable evaluator of a chain of leaf transforms, in which
+    consecutive affine transforms (including
+    :class:`TranslationModel`, :class:`RigidModel` and
+    :class:`SimilarityModel`) are folded into one.
+
+    Affine stages write into preallocated output buffers rather than
+    allocating arrays of homogeneous coordinates, and leaf transforms
+    accepting an out argument write into the output array.  The
+    transforms are captured when compiled, so compile again after
+    modifying them.
+
+    Attributes
+    ----------
+    tforms : :obj:`list` of :obj:`Transform`
+        leaf transforms applied, with folded affines
+    """
+    def __init__(self, tforms):
+        """Initialize CompiledTransform
+
+        Parameters
+        ----------
+        tforms : :obj:`list` of :obj:`Transform`
+            leaf transforms in order of application
+            (see :meth:`TransformResolver.flatten`)
+        """
+        self.tforms = _fold_affines(tforms)
+        self._stages = [
+            (np.ascontiguousarray(tform.M[:2, :2].T), tform.M[:2, 2].copy())
+            if isinstance(tform, AffineModel) else
+            (tform, _accepts_out(tform))
+            for tform in self.tforms]
+
+    def __len__(self):
+        return len(self.tforms)
+
+    def __call__(self, points, out=None):
+        return self.tform(points, out=out)
+
+    def tform(self, points, out=None):
+        """transform points through the chain of transforms
+
+        Parameters
+        ----------
+        points : numpy.array
+            a Nx2 array of x,y points
+        out : numpy.array, optional
+            C-contiguous Nx2 float64 array in which to store the result
+            (may be points itself)
+
+        Returns
+        -------
+        numpy.array
+            a Nx2 array of x,y points after transformation
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ConversionError('Points must be of shape (:, 2) '
+                                  '-- got {}'.format(points.shape))
+        if out is None:
+            out = np.empty(points.shape)
+        elif (out.shape != points.shape or out.dtype != np.float64 or
+                not out.flags.c_contiguous):
+            raise ConversionError(
+                'out must be a C-contiguous float64 array of shape {} '
+                '-- got {} {}'.format(points.shape, out.dtype, out.shape))
+        scratch = None
+        src = points
+        for stage, arg in self._stages:
+            if isinstance(stage, np.ndarray):
+                # alternate between out and a scratch buffer so that
+                # the product never overwrites its input
+                if np.may_share_memory(src, out):
+                    if scratch is None:
+                        scratch = np.empty(points.shape)
+                    dst = scratch
+                else:
+                    dst = out
+                np.dot(src, stage, out=dst)
+                dst += arg
+                src = dst
+            elif arg:
+                # leaf transforms accepting out allow it to be src
+                src = stage.tform(src, out=out)
+            else:
+                src = stage.tform(src)
+        if src is not out:
+            out[...] = src
+        return out
+
+
+def compile_transforms(transformlist, reference_tforms=None):
+    """compile a list of transforms into a reusable evaluator
+
+    Parameters
+    ----------
+    transformlist : :obj:`list` of :obj:`Transform`
+        transforms, which may include lists, :class:`TransformList`
+        and :class:`ReferenceTransform` objects, such as the tforms
+        of a :class:`renderapi.tilespec.TileSpec`
+    reference_tforms : list or :class:`TransformResolver`, optional
+        :obj:`Transform` objects to which reference transforms refer
+
+    Returns
+    -------
+    :class:`CompiledTransform`
+        evaluator of the chain of transforms
+    """
+    return CompiledTransform(
+        _get_resolver(reference_tforms).flatten(transformlist))
+
+
+def estimate_dstpts_batch(transformlists, src, reference_tforms=None):
+    """estimate destination points of many sets of points, each
+    with its own list of transforms.
+
+    The transforms at each position of the lists are applied together:
+    affine transforms by stacking their matrices, and transforms shared
+    by several lists (such as a common reference transform) once to
+    the concatenated points of those lists.
+
+    Parameters
+    ----------
+    transformlists : :obj:`list` of :obj:`list` of :obj:`Transform`
+        N lists of transforms that have a tform method implemented
+    src : numpy.array
+        a NxMx2 array of M source points for each list of transforms
+    reference_tforms : list or :class:`TransformResolver`, optional
+        :obj:`Transform` objects to which reference transforms refer
+
+    Returns
+    -------
+    numpy.array
+        NxMx2 array of destination points
+    """
+    src = np.asarray(src, dtype=float)
+    if src.ndim != 3 or len(src) != len(transformlists):
+        raise RenderError(
+            "source points of shape {} do not match {} lists of "
+            "transforms".format(src.shape, len(transformlists)))
+    resolver = _get_resolver(reference_tforms)
+    chains = [_fold_affines(resolver.flatten(tforms))
+              for tforms in transformlists]
+    dstpts = src.copy()
+    for step in range(max([len(c) for c in chains] + [0])):
+        affine = []
+        shared = {}
+        for i, chain in enumerate(chains):
+            if len(chain) <= step:
+                continue
+            tform = chain[step]
+            if isinstance(tform, AffineModel):
+                affine.append(i)
+            else:
+                shared.setdefault(id(tform), (tform, []))[1].append(i)
+        if affine:
+            M = np.array([chains[i][step].M for i in affine])
+            dstpts[affine] = (
+                np.einsum('nij,nkj->nki', M[:, :2, :2], dstpts[affine]) +
+                M[:, np.newaxis, :2, 2])
+        for tform, idx in shared.values():
+            dstpts[idx] = tform.tform(
+                dstpts[idx].reshape(-1, 2)).reshape(len(idx), src.shape[1], 2)
     return dstpts
 
 
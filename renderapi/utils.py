@@ -4,18 +4,38 @@ utilities to make render/java/web/life interfacing easier
 '''
 import tempfile
 import logging
-import copy
+import codecs
+import collections
+import itertools
+import math
+import re
+import struct
+import sys
+import threading
 import json
 import base64
 import zlib
+from timeit import default_timer
 
 import numpy
 import requests
+from six.moves.urllib.parse import urlsplit
+from decorator import decorate
+try:
+    from sys import intern
+except ImportError:  # python 2 builtin
+    pass
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 try:
     from inspect import getfullargspec
 except ImportError:
     from inspect import getargspec as getfullargspec
 
+try:
+    from os import cpu_count
+except ImportError:  # python 2
+    from multiprocessing import cpu_count
+
 from .errors import RenderError
 
 # use ujson if installed for faster json
@@ -25,6 +45,16 @@ except ImportError:
     import json as requests_json
 requests.models.complexjson = requests_json
 
+# optional json backends for request payloads
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 
 class NullHandler(logging.Handler):
     """handler to avoid logging errors for, e.g., missing logger setup"""
@@ -35,6 +65,12 @@ class NullHandler(logging.Handler):
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
 
+DEFAULT_CHUNK_SIZE = 1 << 16
+GZIP_BLOCK_SIZE = 1 << 20
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# characters which may continue a json number, as in 1.5 or 2.5e3
+_JSON_NUMBER_CONTINUATION = frozenset('.eE+-0123456789')
+
 
 class RenderEncoder(json.JSONEncoder):
     """json Encoder in the following hierarchy for serialization:
@@ -78,6 +114,392 @@ class RenderEncoder(json.JSONEncoder):
                     return obj.__dict__
 
 
+_render_encoder = RenderEncoder()
+
+
+def _intern(s):
+    """intern s so that equal strings share memory.  Only native
+    strings can be interned, so e.g. the unicode strings decoded
+    from json on python 2 are returned as they are."""
+    return intern(s) if isinstance(s, str) else s
+
+
+def _json_default(obj):
+    """fallback serializer for json backends which adds numpy
+    support to :meth:`RenderEncoder.default`"""
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    if isinstance(obj, numpy.generic):
+        return obj.item()
+    return _render_encoder.default(obj)
+
+
+def _has_nonfinite(obj):
+    """whether obj, serialized with :func:`_json_default`, contains
+    NaN or infinite floats"""
+    if isinstance(obj, float):
+        return math.isnan(obj) or math.isinf(obj)
+    if isinstance(obj, dict):
+        return any(_has_nonfinite(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_nonfinite(v) for v in obj)
+    if isinstance(obj, numpy.ndarray):
+        return (obj.dtype.kind == 'f' and
+                not numpy.isfinite(obj).all())
+    if isinstance(obj, numpy.generic):
+        return _has_nonfinite(obj.item())
+    if obj is None or isinstance(obj, (str, bytes, int)):
+        return False
+    return _has_nonfinite(_json_default(obj))
+
+
+def _orjson_dumps(obj):
+    s = orjson.dumps(
+        obj, default=_json_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    # orjson writes non-finite floats as null, so only
+    #   payloads with nulls need to be checked for them
+    if b'null' in s and _has_nonfinite(obj):
+        raise ValueError(
+            'Out of range float values are not JSON compliant')
+    return s
+
+
+# options of the installed ujson.  Versions without default cannot
+#   serialize render objects, and versions without allow_nan always
+#   reject non-finite floats.
+_ujson_options = None
+if ujson is not None:
+    try:
+        ujson.dumps(0., default=str)
+        _ujson_options = {}
+        ujson.dumps(0., allow_nan=False)
+        _ujson_options['allow_nan'] = False
+    except TypeError:
+        pass
+
+
+def _ujson_dumps(obj):
+    try:
+        s = ujson.dumps(obj, default=_json_default, ensure_ascii=False,
+                        escape_forward_slashes=False, **_ujson_options)
+    except OverflowError as e:
+        raise ValueError(str(e))
+    return s.encode('utf-8')
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=_json_default, ensure_ascii=False,
+                      allow_nan=False).encode('utf-8')
+
+
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+_json_backends = {
+    'orjson': (orjson is not None,
+               _orjson_dumps, getattr(orjson, 'loads', None)),
+    'ujson': (_ujson_options is not None,
+              _ujson_dumps, getattr(ujson, 'loads', None)),
+    'json': (True, _json_dumps, json.loads)}
+
+
+def available_json_backends():
+    """json backends which can be used in this environment
+
+    Returns
+    -------
+    :obj:`list` of :obj:`str`
+        names of installed backends, fastest first
+    """
+    return [name for name in JSON_BACKENDS if _json_backends[name][0]]
+
+
+def set_json_backend(name=None):
+    """select the json library used to encode request payloads
+    and decode responses
+
+    Parameters
+    ----------
+    name : str, optional
+        one of 'orjson', 'ujson', or 'json'.
+        If None, the fastest installed backend is used.
+
+    Raises
+    ------
+    ValueError
+        if name is not an available backend
+    """
+    global _json_backend, _backend_dumps, _backend_loads
+    available = available_json_backends()
+    name = available[0] if name is None else name
+    if name not in available:
+        raise ValueError('json backend {} is not one of {}'.format(
+            name, available))
+    _, _backend_dumps, _backend_loads = _json_backends[name]
+    _json_backend = name
+    logger.debug('using json backend {}'.format(name))
+
+
+def get_json_backend():
+    """name of the json backend in use
+
+    Returns
+    -------
+    str
+        json backend name
+    """
+    return _json_backend
+
+
+def json_dumps(obj):
+    """serialize obj with the selected json backend.  Objects are
+    converted as by :class:`RenderEncoder` and numpy arrays and
+    scalars are supported.  NaN and infinite floats, which are not
+    valid json, are rejected by all backends.
+
+    Parameters
+    ----------
+    obj : obj
+        object to serialize
+
+    Returns
+    -------
+    bytes
+        utf-8 encoded json
+
+    Raises
+    ------
+    ValueError
+        if obj contains NaN or infinite floats
+    """
+    return _backend_dumps(obj)
+
+
+def json_loads(s):
+    """deserialize json with the selected json backend
+
+    Parameters
+    ----------
+    s : bytes or str
+        json to decode
+
+    Returns
+    -------
+    obj
+        decoded object
+    """
+    return _backend_loads(s)
+
+
+set_json_backend()
+
+
+_gzip_executor = None
+_gzip_executor_lock = threading.Lock()
+# bytes of preceding data used as a dictionary for each block
+_GZIP_WINDOW = 1 << 15
+# zlib compression dictionaries need python 3.3
+_ZLIB_ZDICT = sys.version_info >= (3, 3)
+
+
+def _get_gzip_executor():
+    global _gzip_executor
+    with _gzip_executor_lock:
+        if _gzip_executor is None:
+            _gzip_executor = ThreadPoolExecutor(
+                max_workers=cpu_count() or 1)
+    return _gzip_executor
+
+
+def gzip_compress(data, level=6, block_size=GZIP_BLOCK_SIZE):
+    """gzip compress data, compressing blocks of data in parallel in
+    worker threads.  The blocks form a single deflate stream, so the
+    output is a standard single member gzip file.
+
+    Parameters
+    ----------
+    data : bytes
+        data to compress
+    level : int
+        compression level
+    block_size : int
+        size of blocks compressed by each worker.  Blocks are not
+        compressed in parallel on python versions before 3.3.
+
+    Returns
+    -------
+    bytes
+        gzip compressed data
+    """
+    if _ZLIB_ZDICT:
+        data = memoryview(data)
+    else:
+        # without dictionaries, blocks would compress poorly
+        block_size = max(len(data), 1)
+    starts = range(0, len(data), block_size)
+
+    def compress_block(start):
+        end = start + block_size
+        # prime each block with the end of the previous one
+        #   to compress as well as a single stream
+        kwargs = ({'zdict': data[max(start - _GZIP_WINDOW, 0):start]}
+                  if start else {})
+        c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                             **kwargs)
+        return c.compress(data[start:end]) + c.flush(
+            zlib.Z_FINISH if end >= len(data) else zlib.Z_SYNC_FLUSH)
+
+    if len(starts) > 1:
+        blocks = list(_get_gzip_executor().map(compress_block, starts))
+    else:
+        blocks = [compress_block(0)]
+    # gzip header with no mtime and unknown os followed by crc and size
+    header = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+    trailer = struct.pack('<II', zlib.crc32(data) & 0xffffffff,
+                          len(data) & 0xffffffff)
+    return b''.join([header] + blocks + [trailer])
+
+
+def _compress_payload(session, payload, headers):
+    """gzip payload if it is larger than the session's
+    compress_threshold, setting Content-Encoding in headers"""
+    threshold = getattr(session, 'compress_threshold', None)
+    if (payload is None or threshold is None or
+            len(payload) < threshold):
+        return payload
+    headers['Content-Encoding'] = 'gzip'
+    return gzip_compress(payload, level=getattr(session, 'compress_level', 6))
+
+
+def response_retries(r):
+    """number of times the request answered by a response was retried
+
+    Parameters
+    ----------
+    r : requests.Response
+        server response
+
+    Returns
+    -------
+    int
+        number of retries made by the session's retry policy
+    """
+    retries = getattr(getattr(r, 'raw', None), 'retries', None)
+    return len(getattr(retries, 'history', None) or ())
+
+
+def _log_retries(r):
+    retries = response_retries(r)
+    if retries:
+        logger.info('{} {} returned {} after {} retries'.format(
+            r.request.method, r.url, r.status_code, retries))
+
+
+_ENDPOINT_KEYWORDS = frozenset([
+    'owner', 'project', 'stack', 'z', 'tile', 'tileIds', 'section',
+    'matchCollection', 'group', 'id', 'matchesWith', 'pGroup', 'qGroup',
+    'box', 'state', 'cloneTo', 'sectionId'])
+_NUMERIC_SEGMENT = re.compile(r'^-?[0-9.,]+$')
+
+
+def endpoint_template(request_url):
+    """template of the render endpoint a request url refers to,
+    with owner, project, stack, z and other identifiers replaced by
+    placeholders so that calls to the same endpoint can be aggregated
+
+    Parameters
+    ----------
+    request_url : str
+        url of request
+
+    Returns
+    -------
+    str
+        path of the endpoint, e.g.
+        /render-ws/v1/owner/{owner}/project/{project}/stack/{stack}/z/{z}/tile-specs
+    """  # noqa: E501
+    path = urlsplit(request_url).path
+    parts = path.split('/')
+    template = parts[:1]
+    for previous, part in zip(parts, parts[1:]):
+        if previous in _ENDPOINT_KEYWORDS and part:
+            template.append('{' + previous + '}')
+        elif _NUMERIC_SEGMENT.match(part):
+            template.append('{n}')
+        else:
+            template.append(part)
+    return '/'.join(template)
+
+
+def record_call(session, method, request_url, r, duration, bytes_sent=0,
+                bytes_received=None, decode_time=None):
+    """pass a record of a completed http call to the call hooks
+    of a session
+
+    Each hook in ``session.call_hooks`` is called with a dict with keys
+    method, url, endpoint (see :func:`endpoint_template`), status,
+    bytes_sent, bytes_received, ttfb (seconds until the response headers
+    were received), duration (seconds until the body was read), decode_time
+    (seconds spent decoding the body, None if not measured) and retries.
+
+    Parameters
+    ----------
+    session : requests.session.Session
+        session which made the call
+    method : str
+        http method of the call
+    request_url : str
+        url of request
+    r : requests.Response
+        server response
+    duration : float
+        seconds from making the call until the response body was read
+    bytes_sent : int
+        size of request body
+    bytes_received : int, optional
+        size of response body (default len(r.content))
+    decode_time : float or None
+        seconds spent decoding the response body
+    """
+    hooks = getattr(session, 'call_hooks', None)
+    if not hooks:
+        return
+    elapsed = getattr(r, 'elapsed', None)
+    record = {
+        'method': method,
+        'url': request_url,
+        'endpoint': endpoint_template(request_url),
+        'status': r.status_code,
+        'bytes_sent': bytes_sent or 0,
+        'bytes_received': (len(r.content or b'') if bytes_received is None
+                           else bytes_received),
+        'ttfb': (duration if elapsed is None
+                 else elapsed.total_seconds()),
+        'duration': duration,
+        'decode_time': decode_time,
+        'retries': response_retries(r)}
+    for hook in list(hooks):
+        try:
+            hook(record)
+        except Exception as e:
+            logger.warning('call hook {} failed: {}'.format(hook, e))
+
+
+def evict_cached(session, request_url):
+    """evict responses affected by a modifying request from
+    the :class:`renderapi.cache.ResponseCache` of a session
+
+    Parameters
+    ----------
+    session : requests.session.Session
+        requests session which may have a cache attribute
+    request_url : str
+        url of modifying request
+    """
+    cache = getattr(session, 'cache', None)
+    if cache is not None:
+        cache.evict(request_url)
+
+
 def post_json(session, request_url, d, params=None):
     """POST requests with RenderError handling
 
@@ -88,7 +510,7 @@ def post_json(session, request_url, d, params=None):
     request_url : str
         url
     d : dict
-        data payload (will be json dumps-ed)
+        data payload (will be serialized by :func:`json_dumps`)
     params : dict
         requests parameters
 
@@ -104,12 +526,18 @@ def post_json(session, request_url, d, params=None):
 
     headers = {"content-type": "application/json"}
     if d is not None:
-        payload = json.dumps(d)
+        payload = json_dumps(d)
     else:
         payload = None
         headers['Accept'] = "application/json"
+    payload = _compress_payload(session, payload, headers)
+    start = default_timer()
     r = session.post(request_url, data=payload, params=params,
                      headers=headers)
+    record_call(session, 'POST', request_url, r, default_timer() - start,
+                bytes_sent=len(payload or b''))
+    evict_cached(session, request_url)
+    _log_retries(r)
     if r.status_code not in [200, 201, 204]:
         raise RenderError(
             'cannot post {} to {} with params {} returned status_code '
@@ -132,7 +560,11 @@ def rest_delete(session, request_url, params=None):
     requests.response
         server response
     """
+    start = default_timer()
     r = session.delete(request_url)
+    record_call(session, 'DELETE', request_url, r, default_timer() - start)
+    evict_cached(session, request_url)
+    _log_retries(r)
     if r.status_code not in [200, 202, 204]:
         raise RenderError("delete of {} returned {} with message {}".format(
             r.url, r.status_code, r.text))
@@ -149,7 +581,7 @@ def put_json(session, request_url, d, params=None):
     request_url : str
         url
     d : dict
-        data payload (will be json dumps-ed)
+        data payload (will be serialized by :func:`json_dumps`)
     params : dict
         requests parameters
 
@@ -166,12 +598,18 @@ def put_json(session, request_url, d, params=None):
 
     headers = {"content-type": "application/json"}
     if d is not None:
-        payload = renderdumps(d)
+        payload = json_dumps(d)
     else:
         payload = None
         headers['Accept'] = "application/json"
+    payload = _compress_payload(session, payload, headers)
+    start = default_timer()
     r = session.put(request_url, data=payload, params=params,
                     headers=headers)
+    record_call(session, 'PUT', request_url, r, default_timer() - start,
+                bytes_sent=len(payload or b''))
+    evict_cached(session, request_url)
+    _log_retries(r)
     if r.status_code not in [200, 201, 204]:
         raise RenderError(
             'put {} to {} returned status code {} with message {}'.format(
@@ -179,7 +617,8 @@ def put_json(session, request_url, d, params=None):
     return r
 
 
-def get_json(session, request_url, params=None, stream=False, **kwargs):
+def get_json(session, request_url, params=None, stream=False,
+             cacheable=False, **kwargs):
     """get_json wrapper for requests to handle errors
 
     Parameters
@@ -192,6 +631,9 @@ def get_json(session, request_url, params=None, stream=False, **kwargs):
         requests parameters
     stream: bool
         requests whether to stream
+    cacheable : bool
+        whether the response may be served from and stored in the
+        :class:`renderapi.cache.ResponseCache` of the session, if any
     kwargs: dict
         kwargs to shout into the dark
     Returns
@@ -205,16 +647,195 @@ def get_json(session, request_url, params=None, stream=False, **kwargs):
         if cannot get json successfully
     """
 
+    cache = getattr(session, 'cache', None) if cacheable else None
+    if cache is not None:
+        content = cache.get(session, request_url, params)
+        if content is not None:
+            return json_loads(content)
+    start = default_timer()
     r = session.get(request_url, params=params, stream=stream)
+    content = r.content
+    duration = default_timer() - start
+    _log_retries(r)
     if r.status_code != 200:
+        record_call(session, 'GET', request_url, r, duration)
         message = "request to {} returned error code {} with message {}"
         raise RenderError(message.format(r.url, r.status_code, r.text))
+    start = default_timer()
     try:
-        return r.json()
+        d = json_loads(content)
     except Exception as e:
         logger.error(e)
         logger.error(r.text)
         raise RenderError(r.text)
+    finally:
+        record_call(session, 'GET', request_url, r, duration,
+                    decode_time=default_timer() - start)
+    if cache is not None:
+        cache.put(request_url, params, r.content)
+    return d
+
+
+def get_json_iter(session, request_url, params=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """streaming GET of a json array which decodes one element
+    at a time.  Only the current element and a chunk of the
+    response are held in memory.
+
+    Parameters
+    ----------
+    session : requests.session.Session
+        requests session
+    request_url : str
+        url
+    params : dict
+        requests parameters
+    chunk_size : int
+        number of bytes to read from the response at a time
+    kwargs: dict
+        kwargs to shout into the dark
+
+    Returns
+    -------
+    generator
+        generator of decoded elements of the json array response
+
+    Raises
+    ------
+    RenderError
+        if the request fails or the response is not a json array
+    """
+    start = default_timer()
+    r = session.get(request_url, params=params, stream=True)
+    _log_retries(r)
+    if r.status_code != 200:
+        record_call(session, 'GET', request_url, r, default_timer() - start)
+        message = "request to {} returned error code {} with message {}"
+        raise RenderError(message.format(r.url, r.status_code, r.text))
+    return _iter_response_json_array(session, request_url, r, chunk_size,
+                                     start)
+
+
+def _iter_response_json_array(session, request_url, r, chunk_size, start):
+    received = [0]
+
+    def chunks():
+        for chunk in r.iter_content(chunk_size):
+            received[0] += len(chunk)
+            yield chunk
+
+    try:
+        for element in iter_json_array(chunks()):
+            yield element
+    finally:
+        r.close()
+        # decoding is interleaved with reading and is not measured
+        record_call(session, 'GET', request_url, r, default_timer() - start,
+                    bytes_received=received[0])
+
+
+class _JSONChunkStream(object):
+    """text buffer over an iterable of utf-8 encoded chunks which
+    keeps only the unconsumed part of the stream"""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.textdecoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def read(self, minimum=1):
+        """discard consumed text and read at least minimum characters
+
+        Returns
+        -------
+        bool
+            whether any text was read
+        """
+        new = []
+        n = 0
+        while n < minimum and not self.exhausted:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.exhausted = True
+                chunk = self.textdecoder.decode(b'', final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self.textdecoder.decode(chunk)
+            new.append(chunk)
+            n += len(chunk)
+        self.buf = self.buf[self.pos:] + ''.join(new)
+        self.pos = 0
+        return n > 0
+
+    def peek(self):
+        """skip whitespace and return the next character
+        ('' at the end of the stream)"""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.read():
+                return self.buf[self.pos:self.pos + 1]
+
+
+def iter_json_array(chunks):
+    """incrementally decode the elements of a json array
+
+    Parameters
+    ----------
+    chunks : iterable
+        iterable of bytes (utf-8 encoded) or str which concatenate
+        to a json array, e.g. :meth:`requests.Response.iter_content`
+
+    Yields
+    ------
+    obj
+        decoded elements of the array
+
+    Raises
+    ------
+    RenderError
+        if chunks do not form a json array
+    """
+    decoder = json.JSONDecoder()
+    stream = _JSONChunkStream(chunks)
+    if stream.peek() != '[':
+        raise RenderError('json stream does not start with an array')
+    stream.pos += 1
+    if stream.peek() == ']':
+        return
+    while True:
+        # an element is only complete if followed by text which cannot
+        #   continue it, otherwise e.g. a number such as 1. or 2.5e may
+        #   continue in the next chunk
+        while True:
+            try:
+                element, end = decoder.raw_decode(stream.buf, stream.pos)
+            except ValueError:
+                end = None
+            else:
+                continued = (end < len(stream.buf) and
+                             stream.buf[end] in _JSON_NUMBER_CONTINUATION)
+                end = _JSON_WHITESPACE.match(stream.buf, end).end()
+            if end is not None and (stream.exhausted or (
+                    end < len(stream.buf) and not continued)):
+                break
+            # grow geometrically to avoid re-decoding large elements often
+            if (not stream.read(max(len(stream.buf) - stream.pos, 1)) and
+                    end is None):
+                raise RenderError(
+                    'cannot decode json array element from {}'.format(
+                        stream.buf[stream.pos:stream.pos + 100]))
+        stream.pos = end
+        yield element
+        c = stream.peek()
+        if c == ']':
+            return
+        elif c != ',':
+            raise RenderError(
+                'unexpected {!r} between json array elements'.format(c))
+        stream.pos += 1
+        stream.peek()
 
 
 def renderdumps(obj, *args, **kwargs):
@@ -332,6 +953,126 @@ def defaultifNone(val, default=None):
     return val if val is not None else default
 
 
+def iter_concurrent(func, iterable, max_workers=8, max_pending=None,
+                    ordered=True):
+    """map func over iterable in a thread pool, yielding results
+    as they are consumed.  At most max_pending calls are submitted
+    ahead of the consumer, so a slow consumer limits how many
+    results are held in memory.
+
+    Parameters
+    ----------
+    func : func
+        function of one argument to call for each item
+    iterable : iterable
+        items to call func on
+    max_workers : int
+        number of worker threads
+    max_pending : int, optional
+        maximum number of submitted calls whose results have not
+        been yielded (default 2 * max_workers)
+    ordered : bool
+        whether to yield results in the order of iterable.  If False,
+        results are yielded as they are completed.
+
+    Yields
+    ------
+    tuple
+        (item, func(item)) for each item in iterable
+
+    Raises
+    ------
+    ValueError
+        if max_pending is less than 1
+    """
+    max_pending = defaultifNone(max_pending, 2 * max_workers)
+    if max_pending < 1:
+        raise ValueError('max_pending must be at least 1')
+    items = iter(iterable)
+    futures = {}
+    order = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while True:
+                for item in itertools.islice(
+                        items, max_pending - len(futures)):
+                    future = executor.submit(func, item)
+                    futures[future] = item
+                    if ordered:
+                        order.append(future)
+                if not futures:
+                    break
+                if ordered:
+                    done = [order.popleft()]
+                else:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = futures.pop(future)
+                    yield item, future.result()
+        finally:
+            # do not start calls whose results will not be consumed
+            for future in futures:
+                future.cancel()
+
+
+class ArgSpecFitter(object):
+    """precomputed argument specification of a function which moves
+    positional arguments matching keyword arguments of the function
+    into the keyword arguments, as :func:`fitargspec`
+
+    Parameters
+    ----------
+    f : func
+        function to inspect
+
+    Attributes
+    ----------
+    num_expected_args : int
+        number of arguments without defaults
+    optional_args : tuple of str
+        names of arguments with defaults
+    defaults : dict
+        default values of optional arguments
+    varkw : str or None
+        name of the variable keyword argument of f
+    """
+    def __init__(self, f):
+        arginfo = getfullargspec(f)
+        defaults = arginfo.defaults or ()
+        self.num_args = len(arginfo.args)
+        self.num_expected_args = self.num_args - len(defaults)
+        self.optional_args = tuple(arginfo.args[self.num_expected_args:])
+        self.defaults = dict(zip(self.optional_args, defaults))
+        # getargspec, used on python 2, names it keywords
+        self.varkw = getattr(arginfo, 'varkw',
+                             getattr(arginfo, 'keywords', None))
+
+    def __call__(self, oldargs, oldkwargs):
+        """fit input args tuple and kwargs dict
+
+        Parameters
+        ----------
+        oldargs : tuple
+            arguments passed to func
+        oldkwargs : dict
+            keyword args passed to func
+
+        Returns
+        -------
+        new_args
+            args with values filled in according to f spec
+        new_kwargs
+            kwargs with values filled in according to f spec
+        """
+        if (len(oldargs) <= self.num_expected_args or
+                len(oldargs) > self.num_args):
+            return oldargs, oldkwargs
+        new_kwargs = dict(oldkwargs)
+        new_kwargs.update(zip(self.optional_args,
+                              oldargs[self.num_expected_args:]))
+        return tuple(oldargs[:self.num_expected_args]), new_kwargs
+
+
 def fitargspec(f, oldargs, oldkwargs):
     """fit function argspec given input args tuple and kwargs dict
 
@@ -352,20 +1093,44 @@ def fitargspec(f, oldargs, oldkwargs):
         kwargs with values filled in according to f spec
     """
     try:
-        arginfo = getfullargspec(f)
-        # args, varargs, keywords, defaults = inspect.getargspec(f)
-        num_expected_args = len(arginfo.args) - len(arginfo.defaults)
-        new_args = tuple(oldargs[:num_expected_args])
-        new_kwargs = copy.copy(oldkwargs)
-        for i, arg in enumerate(oldargs[num_expected_args:]):
-            new_kwargs.update({arginfo.args[i + num_expected_args]: arg})
-        return new_args, new_kwargs
+        return ArgSpecFitter(f)(oldargs, oldkwargs)
     except Exception as e:
         logger.error('Cannot fit argspec for {}'.format(f))
         logger.error(e)
         return oldargs, oldkwargs
 
 
+def argspec_decorator(caller):
+    """create a signature preserving decorator from a caller which
+    receives the :class:`ArgSpecFitter` of the decorated function.
+    The argspec is computed once when a function is decorated rather
+    than on every call.
+
+    Parameters
+    ----------
+    caller : func
+        function with signature caller(f, argspec, *args, **kwargs).
+        May be a coroutine function.
+
+    Returns
+    -------
+    func
+        decorator
+    """
+    def argspec_decorate(f):
+        extras = (ArgSpecFitter(f),)
+        try:
+            # do not bind arguments to the signature on each call
+            return decorate(f, caller, extras, kwsyntax=True)
+        except TypeError:  # pragma: no cover
+            # decorator<5 does not rebind arguments
+            return decorate(f, caller, extras)
+    argspec_decorate.__name__ = caller.__name__
+    argspec_decorate.__doc__ = caller.__doc__
+    argspec_decorate.__wrapped__ = caller
+    return argspec_decorate
+
+
 def encodeBase64(src):
     """encode an array or list of doubles
     in Base64 binary-to-text encoding
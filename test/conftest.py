@@ -0,0 +1,4 @@
+import sys
+
+# modules with syntax which python 2 cannot compile
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 5) else []
@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import io
+import json
+import numpy as np
+import pytest
+import threading
+from PIL import Image
+import renderapi
+import rendersettings
+
+
+class FakeResponse(object):
+    def __init__(self, url, content, status=200):
+        self.url = url
+        self.status = status
+        self._content = content
+
+    async def read(self):
+        return self._content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeSession(object):
+    def __init__(self, content, status=200, statuses=None):
+        self.content = content
+        # statuses of successive responses before status
+        self.statuses = list(statuses or [])
+        self.status = status
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        status = self.statuses.pop(0) if self.statuses else self.status
+        return FakeResponse(url, self.content, status)
+
+
+def run(coro):
+    # asyncio.run requires python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture(scope='module')
+def render():
+    return renderapi.connect(**rendersettings.DEFAULT_RENDER)
+
+
+@pytest.fixture(scope='module')
+def tilespec_dict():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        return json.load(f)[0]
+
+
+def test_aio_get_tile_specs_from_z(render, tilespec_dict):
+    session = FakeSession(json.dumps([tilespec_dict]).encode())
+    tilespecs = run(renderapi.aio.get_tile_specs_from_z(
+        'teststack', 1, render=render, session=session))
+    assert len(tilespecs) == 1
+    assert isinstance(tilespecs[0], renderapi.tilespec.TileSpec)
+    method, url, kwargs = session.calls[0]
+    assert method == 'GET'
+    assert url == renderapi.render.format_preamble(
+        render.DEFAULT_HOST, render.DEFAULT_PORT, render.DEFAULT_OWNER,
+        render.DEFAULT_PROJECT, 'teststack') + '/z/%f/tile-specs' % 1
+
+
+def test_aio_get_json_error(render):
+    session = FakeSession(b'not found', status=404)
+    with pytest.raises(renderapi.errors.RenderError):
+        run(renderapi.aio.get_matches_within_group(
+            'collection', 'group', render=render, session=session))
+
+
+def test_aio_gather_put(render):
+    session = FakeSession(b'[]')
+
+    async def put_all():
+        return await asyncio.gather(*[
+            renderapi.aio.import_matches(
+                'collection', [{'pId': str(i)}], render=render,
+                session=session)
+            for i in range(5)])
+
+    run(put_all())
+    assert len(session.calls) == 5
+    assert all(method == 'PUT' for method, url, kwargs in session.calls)
+    assert (sorted(json.loads(kwargs['data'])[0]['pId']
+                   for method, url, kwargs in session.calls) ==
+            [str(i) for i in range(5)])
+
+
+def test_aio_get_bb_image(render):
+    arr = np.arange(100, dtype=np.uint8).reshape(10, 10)
+    b = io.BytesIO()
+    Image.fromarray(arr).save(b, format='png')
+    session = FakeSession(b.getvalue())
+    img = run(renderapi.aio.get_bb_image(
+        'teststack', 1, 0, 0, 10, 10, binaryMask=True,
+        render=render, session=session))
+    assert np.array_equal(img, arr)
+    assert session.calls[0][2]['params']['binaryMask'] == 'true'
+
+    session = FakeSession(b'server error', status=500)
+    with pytest.raises(renderapi.errors.RenderError):
+        run(renderapi.aio.get_bb_image(
+            'teststack', 1, 0, 0, 10, 10, render=render, session=session))
+
+
+def test_aio_put_compression_and_call_hooks(render):
+    records = []
+    session = FakeSession(b'[]')
+    session.compress_threshold = 100
+    session.call_hooks = [records.append]
+    data = [{'pId': str(i)} for i in range(100)]
+    run(renderapi.aio.import_matches(
+        'collection', data, render=render, session=session))
+    method, url, kwargs = session.calls[0]
+    assert kwargs['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(kwargs['data'])) == data
+    assert len(records) == 1
+    assert records[0]['method'] == 'PUT'
+    assert records[0]['status'] == 200
+    assert records[0]['bytes_sent'] == len(kwargs['data'])
+    assert records[0]['retries'] == 0
+
+
+def test_aio_put_serializes_off_loop(render, monkeypatch):
+    threads = []
+
+    def json_dumps(d):
+        threads.append(threading.current_thread())
+        return renderapi.utils.json_dumps(d)
+
+    monkeypatch.setattr(renderapi.aio, 'json_dumps', json_dumps)
+    session = FakeSession(b'[]')
+    run(renderapi.aio.import_matches(
+        'collection', [{'pId': '0'}], render=render, session=session))
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
+    assert json.loads(session.calls[0][2]['data']) == [{'pId': '0'}]
+
+
+@pytest.mark.parametrize('max_retries', [1, 2])
+def test_aio_retries(render, tilespec_dict, max_retries):
+    records = []
+    session = FakeSession(json.dumps([tilespec_dict]).encode(),
+                          statuses=[503, 503])
+    session.max_retries = max_retries
+    session.backoff_factor = 0
+    session.call_hooks = [records.append]
+    get = renderapi.aio.get_tile_specs_from_z(
+        'teststack', 1, render=render, session=session)
+    if max_retries < 2:
+        with pytest.raises(renderapi.errors.RenderError):
+            run(get)
+    else:
+        assert len(run(get)) == 1
+    assert len(session.calls) == max_retries + 1
+    assert records[0]['retries'] == max_retries
+
+
+def test_aio_client_session_settings():
+    render = renderapi.connect(max_retries=3, compress_threshold=10,
+                               **rendersettings.DEFAULT_RENDER)
+
+    async def settings():
+        async with renderapi.aio.client_session(render) as session:
+            return renderapi.aio._settings(session)
+
+    settings = run(settings())
+    assert settings.max_retries == 3
+    assert settings.compress_threshold == 10
+    assert settings.call_hooks is render.session_kwargs['call_hooks']
@@ -1,5 +1,9 @@
 import os
+import pickle
+import threading
 import pytest
+import requests
+from six.moves import BaseHTTPServer
 import renderapi
 import rendersettings
 
@@ -164,3 +168,123 @@ def test_renderclientaccess_override(tmpdir):
 
     os.remove(renderapi.render.RenderClient.clientscript_from_clientscripts(
             str(tmpdir)))
+
+
+@renderapi.render.renderaccess
+def session_decorated(myparameter, host=None, port=None,
+                      session=requests.session(), render=None, **kwargs):
+    return session
+
+
+def test_render_session_pool():
+    r = renderapi.render.Render(pool_connections=2, pool_maxsize=32,
+                                pool_block=True, **args)
+    assert isinstance(r.session, renderapi.session.RenderSession)
+    assert r.session is r.session
+    adapter = r.session.get_adapter('http://renderhost')
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block
+
+
+def test_render_session_compression():
+    r = renderapi.connect(compress_threshold=1024, compress_level=1,
+                          accept_encoding='gzip', web_only=True, **args)
+    assert r.session.compress_threshold == 1024
+    assert r.session.compress_level == 1
+    assert r.session.headers['Accept-Encoding'] == 'gzip'
+    s = pickle.loads(pickle.dumps(r.session))
+    assert s.compress_threshold == 1024
+
+
+def test_renderaccess_session():
+    r = renderapi.connect(web_only=True, **args)
+    assert session_decorated(5, render=r) is r.session
+    assert session_decorated(5) is not r.session
+
+    s = requests.Session()
+    assert session_decorated(5, session=s, render=r) is s
+    assert renderapi.connect(session=s, **args).session is s
+    # positional arguments are fit to the decorated function's argspec
+    assert session_decorated(5, None, None, s, r) is s
+
+
+def test_argspec_fitter():
+    def f(a, b, c=None, d=1, **kwargs):
+        pass
+    argspec = renderapi.utils.ArgSpecFitter(f)
+    assert argspec.defaults == {'c': None, 'd': 1}
+    assert argspec((1, 2), {'d': 3}) == ((1, 2), {'d': 3})
+    assert argspec((1, 2, 3), {'e': 4}) == ((1, 2), {'c': 3, 'e': 4})
+    assert (renderapi.utils.fitargspec(f, (1, 2, 3, 4), {}) ==
+            ((1, 2), {'c': 3, 'd': 4}))
+
+
+def test_render_pickle_session():
+    r = renderapi.render.Render(pool_maxsize=4, **args)
+    s = r.session
+    new_r = pickle.loads(pickle.dumps(r))
+    assert new_r.session is not s
+    assert new_r.session.pool_maxsize == 4
+
+
+class FlakyHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # fail the first two requests of each method with 503
+    failures = {}
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        n = self.failures.get(self.command, 0)
+        self.failures[self.command] = n + 1
+        self.send_response(503 if n < 2 else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_GET = do_PUT = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    FlakyHandler.failures = {}
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), FlakyHandler)
+    t = threading.Thread(target=server.serve_forever)
+    t.daemon = True
+    t.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_render_session_retries(flaky_server):
+    r = renderapi.render.Render(max_retries=3, backoff_factor=0, **args)
+    assert renderapi.utils.get_json(r.session, flaky_server) == {}
+    resp = renderapi.utils.put_json(r.session, flaky_server, {'a': 1})
+    assert renderapi.utils.response_retries(resp) == 2
+    resp = r.session.get(flaky_server)
+    assert renderapi.utils.response_retries(resp) == 0
+    # POST is not idempotent and is not retried on error status
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.utils.post_json(r.session, flaky_server, {'a': 1})
+
+
+def test_render_session_no_retries(flaky_server):
+    r = renderapi.render.Render(**args)
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.utils.get_json(r.session, flaky_server)
+
+
+def test_retry_backoff_jitter():
+    retry = renderapi.session.make_retry(
+        5, backoff_factor=1, jitter=0.5).increment(
+            'GET', '/').increment('GET', '/').increment('GET', '/')
+    assert isinstance(retry, renderapi.session.RenderRetry)
+    assert retry.jitter == 0.5
+    backoffs = [retry.get_backoff_time() for i in range(20)]
+    assert all(2 <= b <= 6 for b in backoffs)
+    assert len(set(backoffs)) > 1
@@ -0,0 +1,97 @@
+import json
+import numpy as np
+import pytest
+import renderapi
+import rendersettings
+from renderapi.spatial_index import SpatialIndex
+
+
+@pytest.fixture(scope='module')
+def random_boxes():
+    rng = np.random.RandomState(0)
+    xy = rng.uniform(-5000, 5000, size=(500, 2))
+    wh = rng.uniform(100, 800, size=(500, 2))
+    # some tiles on a regular grid sharing edges, and one huge box
+    grid = np.array([[i * 500., j * 500., (i + 1) * 500., (j + 1) * 500.]
+                     for i in range(4) for j in range(4)])
+    return np.vstack([np.hstack([xy, xy + wh]), grid,
+                      [[-20000, -100, 20000, 100]]])
+
+
+def brute_force_boxes(boxes, q):
+    return np.flatnonzero((boxes[:, 0] <= q[2]) & (boxes[:, 2] >= q[0]) &
+                          (boxes[:, 1] <= q[3]) & (boxes[:, 3] >= q[1]))
+
+
+def test_query_boxes(random_boxes):
+    index = SpatialIndex(random_boxes)
+    rng = np.random.RandomState(1)
+    xy = rng.uniform(-8000, 8000, size=(200, 2))
+    queries = np.vstack([np.hstack([xy, xy + rng.uniform(
+        0, 3000, size=(200, 2))]), random_boxes[500:520],
+        [[1e6, 1e6, 1e6 + 1, 1e6 + 1], [np.nan, 0, 1, 1]]])
+    offsets, indices = index.query_boxes(queries)
+    assert len(offsets) == len(queries) + 1
+    for i, q in enumerate(queries):
+        expected = brute_force_boxes(random_boxes, q)
+        assert np.array_equal(indices[offsets[i]:offsets[i + 1]], expected)
+        assert np.array_equal(index.query_box(q), expected)
+    # shared edges are inclusive
+    assert {500, 501, 504, 505, 516} <= set(index.query_box(
+        random_boxes[500]))
+
+
+def test_query_points(random_boxes):
+    index = SpatialIndex(random_boxes, cell_size=300)
+    rng = np.random.RandomState(2)
+    points = np.vstack([rng.uniform(-6000, 6000, size=(300, 2)),
+                        [[500, 500], [2000, 2000], [-1e6, 0]]])
+    offsets, indices = index.query_points(points)
+    for i, (x, y) in enumerate(points):
+        expected = brute_force_boxes(random_boxes, [x, y, x, y])
+        assert np.array_equal(indices[offsets[i]:offsets[i + 1]], expected)
+        assert np.array_equal(index.query_point(x, y), expected)
+    assert {500, 501, 504, 505} <= set(index.query_point(500, 500))
+
+
+@pytest.mark.parametrize('inclusive', [False, True])
+def test_overlapping_pairs(random_boxes, inclusive):
+    b = random_boxes
+    lo = b[:, None, :2]
+    hi = b[:, None, 2:]
+    if inclusive:
+        overlap = ((lo <= b[None, :, 2:]) & (b[None, :, :2] <= hi)).all(-1)
+    else:
+        overlap = ((lo < b[None, :, 2:]) & (b[None, :, :2] < hi)).all(-1)
+    expected = np.argwhere(np.triu(overlap, 1))
+    for cell_size in [None, 50, 5000]:
+        pairs = SpatialIndex(b, cell_size=cell_size).overlapping_pairs(
+            inclusive=inclusive)
+        assert np.array_equal(pairs, expected)
+
+
+def test_spatial_index_from_tilespecs():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        tilespecs = [renderapi.tilespec.TileSpec(json=d)
+                     for d in json.load(f)]
+    undefined = renderapi.tilespec.TileSpec(tileId='undefined')
+    index = SpatialIndex.from_tilespecs(tilespecs + [undefined])
+    assert index.items[-1] is undefined
+    for i, ts in enumerate(tilespecs):
+        found = index.query_box(ts.bbox)
+        assert i in found
+        assert len(found) == len(index.query_box(np.array(ts.bbox) + 0.5))
+    assert len(index.query_box([-1e9, -1e9, 1e9, 1e9])) == len(tilespecs)
+
+    transformed = SpatialIndex.from_resolvedtiles(
+        renderapi.resolvedtiles.ResolvedTiles(tilespecs=tilespecs),
+        transformed=True)
+    for i, ts in enumerate(tilespecs):
+        xy = ts.bbox_transformed()
+        assert np.allclose(transformed.boxes[i],
+                           list(xy.min(axis=0)) + list(xy.max(axis=0)))
+
+    table = renderapi.tilespec_table.TileSpecTable.from_tilespecs(tilespecs)
+    assert np.array_equal(
+        SpatialIndex.from_table(table).overlapping_pairs(),
+        SpatialIndex.from_tilespecs(tilespecs).overlapping_pairs())
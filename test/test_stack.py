@@ -1,3 +1,6 @@
+import json
+import pickle
+import pytest
 import renderapi
 
 
@@ -7,3 +10,79 @@ def test_blank_stackversion():
     fd_sv = renderapi.stack.StackVersion()
     fd_sv.from_dict(sv.to_dict())
     assert(sv.to_dict() == der_sv.to_dict() == fd_sv.to_dict())
+
+
+class FakeResponse(object):
+    def __init__(self, d, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(d).encode('utf-8')
+        self.text = self.content.decode('utf-8')
+        self.url = ''
+
+
+class FakeStackSession(object):
+    def __init__(self, cache):
+        self.cache = cache
+        self.state = 'COMPLETE'
+        self.zvalues = [1.0, 2.0]
+        self.gets = []
+
+    def get(self, url, params=None, stream=False):
+        self.gets.append(url)
+        if url.endswith('/zValues/'):
+            return FakeResponse(self.zvalues)
+        return FakeResponse({'state': self.state})
+
+    def put(self, url, **kwargs):
+        if '/state/' in url:
+            self.state = url.split('/state/')[-1]
+        return FakeResponse({}, 201)
+
+
+@pytest.mark.parametrize('use_directory', [False, True])
+def test_response_cache(tmpdir, use_directory):
+    cache = renderapi.cache.ResponseCache(
+        directory=str(tmpdir) if use_directory else None)
+    session = FakeStackSession(cache)
+    r = renderapi.render.Render(
+        host='http://renderhost', port=8080, owner='owner',
+        project='project', session=session)
+
+    def zvalues():
+        return renderapi.stack.get_z_values_for_stack('stack', render=r)
+
+    assert zvalues() == [1.0, 2.0]
+    num_gets = len(session.gets)
+    session.zvalues = [3.0]
+    assert zvalues() == [1.0, 2.0]
+    assert renderapi.stack.get_full_stack_metadata(
+        'stack', render=r) == {'state': 'COMPLETE'}
+    assert len(session.gets) == num_gets
+
+    if use_directory:
+        new_cache = pickle.loads(pickle.dumps(cache))
+        assert len(new_cache) == 0
+        new_cache._states = cache._states
+        assert new_cache.get(
+            session, session.gets[-1]) == json.dumps([1.0, 2.0]).encode()
+
+    # writes evict cached responses of the stack
+    renderapi.stack.set_stack_state('stack', 'LOADING', render=r)
+    assert zvalues() == [3.0]
+    session.zvalues = [4.0]
+    assert zvalues() == [4.0]
+
+
+def test_response_cache_ttl():
+    cache = renderapi.cache.ResponseCache(ttl=0, state_ttl=0)
+    session = FakeStackSession(cache)
+    request_url = renderapi.render.format_preamble(
+        'http://renderhost', 8080, 'owner', 'project', 'stack') + '/zValues/'
+    assert renderapi.utils.get_json(
+        session, request_url, cacheable=True) == [1.0, 2.0]
+    session.zvalues = [3.0]
+    assert renderapi.utils.get_json(
+        session, request_url, cacheable=True) == [3.0]
+    assert renderapi.cache.stack_url(request_url + '?a=b').endswith(
+        '/stack/stack')
+    assert renderapi.cache.stack_url('http://renderhost/owner/o') is None
@@ -1,4 +1,7 @@
 import json
+import pickle
+import pytest
+import sys
 from operator import eq
 import renderapi
 import rendersettings
@@ -55,3 +58,116 @@ def test_bbox_shape():
         tilespecs = [renderapi.tilespec.TileSpec(json=d) for d in json.load(f)]
 
     assert(all([len(ts.bbox) == 4 for ts in tilespecs]))
+
+
+def test_tilespec_compact():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        ts_json = json.load(f)
+    tilespecs = [renderapi.tilespec.TileSpec(json=d) for d in ts_json]
+    # the classNames of leaf transforms are not stored per instance
+    for ts in tilespecs:
+        for tform in ts.tforms:
+            assert 'className' not in getattr(tform, '__dict__', {})
+    # url prefixes are shared between tiles (json decodes to
+    #   unicode strings on python 2, which are not interned)
+    if sys.version_info >= (3,):
+        assert (tilespecs[0].ip[0]._imagePrefix is
+                tilespecs[2].ip[0]._imagePrefix)
+    assert tilespecs[0].ip[0].imageUrl == ts_json[0]['mipmapLevels'][
+        '0']['imageUrl']
+    for ts in tilespecs + [renderapi.tilespec.TileSpec(json=d, lazy=True)
+                           for d in ts_json]:
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            assert pickle.loads(pickle.dumps(
+                ts, protocol=protocol)).to_dict() == ts.to_dict()
+
+    tform = renderapi.transform.Transform(json={
+        'className': 'some.UnknownModel', 'dataString': '1 2 3'})
+    assert tform.className == 'some.UnknownModel'
+
+
+def test_tilespec_lazy():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        ts_json = json.load(f)
+    eager = [renderapi.tilespec.TileSpec(json=d) for d in ts_json]
+    lazy = [renderapi.tilespec.TileSpec(json=d, lazy=True) for d in ts_json]
+    for e, ts, d in zip(eager, lazy, ts_json):
+        assert ts.tileId == e.tileId
+        assert ts.bbox == e.bbox
+        # untouched tilespecs serialize to a copy of the dictionary
+        #   they came from
+        assert ts.to_dict() == d
+        assert ts.to_dict() is not d
+        assert json.loads(renderapi.utils.renderdumps(ts)) == d
+
+    # deferred attributes are deserialized on access
+    ts = lazy[0]
+    assert [t.to_dict() for t in ts.tforms] == [
+        t.to_dict() for t in eager[0].tforms]
+    assert ts.ip[0] == eager[0].ip[0]
+    assert ts.to_dict() == eager[0].to_dict()
+
+    # modified tilespecs are serialized again
+    ts = lazy[1]
+    ts.z = 5
+    assert ts.to_dict()['z'] == 5
+    assert ts_json[1]['z'] != 5
+
+    ts = lazy[2]
+    ts.tforms = []
+    assert ts.to_dict()['transforms']['specList'] == []
+
+    ts = renderapi.tilespec.TileSpec(json=ts_json[0], lazy=True)
+    ts.labels.append('label')
+    assert ts.to_dict()['labels'] == ['label']
+    assert 'labels' not in ts_json[0]
+    assert renderapi.tilespec.TileSpec(json=ts_json[0]).labels == []
+
+    # changes to the serialized copy do not reach the tilespec
+    ts = renderapi.tilespec.TileSpec(json=ts_json[0], lazy=True)
+    d = ts.to_dict()
+    d['transforms']['specList'].append({})
+    d['tileId'] = 'other'
+    assert ts.to_dict() == ts_json[0]
+
+    # malformed tilespecs raise unless deferred
+    d = dict(ts_json[0])
+    del d['tileId']
+    with pytest.raises(KeyError):
+        renderapi.tilespec.TileSpec(json=d)
+    assert renderapi.tilespec.TileSpec(json=d, lazy=True).tileId is None
+
+
+class FakeTilespecResponse(object):
+    def __init__(self, d):
+        self.status_code = 200
+        self.content = json.dumps(d).encode('utf-8')
+
+
+class FakeTilespecSession(object):
+    def __init__(self, tilespecs_by_z):
+        self.tilespecs_by_z = tilespecs_by_z
+
+    def get(self, url, **kwargs):
+        z = float(url.split('/z/')[1].split('/')[0])
+        return FakeTilespecResponse(self.tilespecs_by_z.get(z, []))
+
+
+def test_iter_tile_specs_from_stack():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        ts_json = json.load(f)
+    tilespecs_by_z = {float(z): [ts] for z, ts in enumerate(ts_json)}
+    session = FakeTilespecSession(tilespecs_by_z)
+    zValues = list(range(len(ts_json) + 1))
+    r = renderapi.connect(**rendersettings.DEFAULT_RENDER)
+
+    sections = list(renderapi.tilespec.iter_tile_specs_from_stack(
+        'teststack', zValues, max_workers=3, render=r, session=session))
+    assert [z for z, tilespecs in sections] == zValues
+    assert sections[-1][1] == []
+    assert ([ts.tileId for z, tilespecs in sections for ts in tilespecs] ==
+            [ts['tileId'] for ts in ts_json])
+
+    unordered = renderapi.tilespec.iter_tile_specs_from_stack(
+        'teststack', zValues, ordered=False, render=r, session=session)
+    assert sorted(z for z, tilespecs in unordered) == zValues
@@ -0,0 +1,114 @@
+import copy
+import json
+import numpy as np
+import pytest
+import renderapi
+import rendersettings
+from renderapi.tilespec_table import TileSpecTable
+
+
+@pytest.fixture(scope='module')
+def tilespec_dicts():
+    with open(rendersettings.TEST_TILESPECS_FILE, 'r') as f:
+        ts_json = json.load(f)
+    dicts = []
+    for z in [3, 1, 2]:
+        for i, d in enumerate(ts_json):
+            d = copy.deepcopy(d)
+            d['tileId'] = '{}.{}'.format(d['tileId'], z)
+            d['z'] = z
+            d['layout']['imageRow'] = i
+            dicts.append(d)
+    return dicts
+
+
+def test_tilespec_table_columns(tilespec_dicts):
+    table = TileSpecTable.from_tilespecs(
+        [renderapi.tilespec.TileSpec(json=d, lazy=True)
+         for d in tilespec_dicts])
+    assert len(table) == len(tilespec_dicts)
+    assert list(table.tileId) == [d['tileId'] for d in tilespec_dicts]
+    assert np.array_equal(table.z, [d['z'] for d in tilespec_dicts])
+    assert np.array_equal(table['imageRow'], [0, 1, 2] * 3)
+    assert np.all(table.imageCol == renderapi.tilespec_table.MISSING_INT)
+    assert np.array_equal(table.bounds[0], [tilespec_dicts[0][k] for k in (
+        'minX', 'minY', 'maxX', 'maxY')])
+    # identical transforms are stored once
+    num_specs = sum(len(d['transforms']['specList'])
+                    for d in tilespec_dicts)
+    assert len(table.tform_indices) == num_specs
+    assert len(table.transform_specs) < num_specs
+
+
+def test_tilespec_table_roundtrip(tilespec_dicts):
+    tilespecs = [renderapi.tilespec.TileSpec(json=d) for d in tilespec_dicts]
+    table = TileSpecTable.from_tilespecs(tilespecs)
+    for ts, new_ts in zip(tilespecs, table.to_tilespecs()):
+        assert new_ts.to_dict() == ts.to_dict()
+        assert new_ts.bbox == ts.bbox
+    for i, (ts, new_ts) in enumerate(zip(
+            tilespecs, table.to_tilespecs(lazy=True))):
+        assert new_ts.to_dict() == table.tile_dict(i)
+        assert new_ts.bbox == ts.bbox
+        assert new_ts.tforms[0].M.tolist() == ts.tforms[0].M.tolist()
+
+
+def test_tilespec_table_select(tilespec_dicts):
+    table = TileSpecTable.from_dicts(tilespec_dicts)
+    subset = table.filter((table.z > 1) & (table.imageRow != 1))
+    assert len(subset) == 4
+    assert set(subset.z) == {2, 3}
+    for i, j in enumerate(np.flatnonzero(
+            (table.z > 1) & (table.imageRow != 1))):
+        assert subset.tile_dict(i) == table.tile_dict(j)
+    assert len(table[2:5]) == 3
+    assert table[4].tileId[0] == table.tileId[4]
+
+    ordered = table.sort(['z', 'imageRow'], ascending=False)
+    assert list(ordered.z) == [3] * 3 + [2] * 3 + [1] * 3
+    assert list(ordered.imageRow) == [2, 1, 0] * 3
+    assert ordered.tile_dict(0) == table.tile_dict(2)
+    # descending sorts keep the order of ties
+    assert list(table.argsort('z', ascending=False)) == [
+        0, 1, 2, 6, 7, 8, 3, 4, 5]
+
+    groups = list(table.groupby_z())
+    assert [z for z, t in groups] == [1, 2, 3]
+    for z, t in groups:
+        assert np.all(t.z == z)
+        assert [t.tile_dict(i) for i in range(len(t))] == [
+            d for d in tilespec_dicts if d['z'] == z]
+
+    # missing values of object columns sort and group last
+    dicts = copy.deepcopy(tilespec_dicts)
+    for d, groupId in zip(dicts, ['b', None, 'a'] * 3):
+        d['groupId'] = groupId
+    table = TileSpecTable.from_dicts(dicts)
+    assert list(table.argsort('groupId')) == [2, 5, 8, 0, 3, 6, 1, 4, 7]
+    assert list(table.argsort('groupId', ascending=False)) == [
+        0, 3, 6, 2, 5, 8, 1, 4, 7]
+    groups = list(table.groupby('groupId'))
+    assert [groupId for groupId, t in groups] == ['a', 'b', None]
+    assert [list(t.tileId) for groupId, t in groups][-1] == [
+        dicts[i]['tileId'] for i in [1, 4, 7]]
+
+
+def test_tilespec_table_concatenate(tilespec_dicts):
+    tables = [TileSpecTable.from_dicts([d for d in tilespec_dicts
+                                        if d['z'] == z]) for z in [1, 2, 3]]
+    table = TileSpecTable.concatenate(tables)
+    assert len(table) == len(tilespec_dicts)
+    expected = [d for z in [1, 2, 3] for d in tilespec_dicts if d['z'] == z]
+    assert [table.tile_dict(i) for i in range(len(table))] == expected
+    assert len(TileSpecTable.concatenate([])) == 0
+
+
+def test_tilespec_table_resolvedtiles(tilespec_dicts):
+    tform = renderapi.transform.AffineModel(transformId='shared')
+    rts = renderapi.resolvedtiles.ResolvedTiles(
+        tilespecs=[renderapi.tilespec.TileSpec(json=d)
+                   for d in tilespec_dicts],
+        transformList=[tform])
+    table = TileSpecTable.from_resolvedtiles(rts)
+    assert table.shared_transforms == [tform]
+    assert table.to_resolvedtiles().to_dict() == rts.to_dict()
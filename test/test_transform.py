@@ -484,6 +484,36 @@ def test_estimate_translation_transform():
         transformclass=renderapi.transform.TranslationModel)
 
 
+@pytest.mark.parametrize('transformclass', [
+    renderapi.transform.AffineModel,
+    renderapi.transform.RigidModel,
+    renderapi.transform.SimilarityModel,
+    renderapi.transform.TranslationModel])
+def test_fit_batch(transformclass):
+    rng = np.random.RandomState(3)
+    counts = rng.randint(3, 50, size=20)
+    src = [rng.uniform(0, 4000, size=(n, 2)) + rng.uniform(-1e5, 1e5, 2)
+           for n in counts]
+    dst = [s.dot(np.eye(2) + rng.normal(0, 0.05, size=(2, 2))) +
+           rng.normal(0, 100, 2) + rng.normal(0, 1, size=s.shape)
+           for s in src]
+    expected = []
+    for s, d in zip(src, dst):
+        tform = transformclass()
+        tform.estimate(s, d)
+        expected.append(tform.M)
+    T = transformclass.fit_batch(src, dst)
+    assert T.shape == (len(counts), 3, 3)
+    assert np.allclose(T, expected, atol=1e-6)
+    assert np.allclose(transformclass.fit_batch(
+        np.concatenate(src), np.concatenate(dst), counts), T)
+
+    with pytest.raises(renderapi.errors.EstimationError):
+        transformclass.fit_batch(src[0], dst[0], [len(src[0]), 0])
+    with pytest.raises(renderapi.errors.EstimationError):
+        transformclass.fit_batch(src[0], dst[0][:-1], [len(src[0])])
+
+
 def test_non_linear_transform():
     lens_tform = renderapi.transform.NonLinearTransform(dataString=(
         "6 28 535.9261337198133 -0.07156495284083819 "
@@ -567,10 +597,19 @@ def test_estimate_non_linear_transform():
     tf = renderapi.transform.NonLinearCoordinateTransform(
             dataString=dataString)
     dst = tf.tform(src)
+    # normalization folded into the coefficients
+    assert np.allclose(dst, tf.kernelExpand(src).dot(tf.beta), atol=1e-8)
     tf.estimate(src, dst)
     fdst = tf.tform(src)
 
     assert(np.abs(fdst-dst).max() < 1e-5)
+    assert np.allclose(fdst, tf.kernelExpand(src).dot(tf.beta), atol=1e-8)
+
+    # coefficients changed in place
+    tf.beta[1, 0] += 1
+    tf.normMean[0] += 1
+    assert np.allclose(tf.tform(src), tf.kernelExpand(src).dot(tf.beta),
+                       atol=1e-8)
 
 
 @pytest.mark.parametrize("transform_class,transform_json", [
@@ -642,6 +681,130 @@ def test_estimate_dstpoints_reference(referenced_tilespecs_and_transforms):
             tilespecs[0].tforms, xy, [transforms[2]])
 
 
+def test_transform_resolver(referenced_tilespecs_and_transforms):
+    tilespecs, transforms = referenced_tilespecs_and_transforms
+    resolver = renderapi.transform.TransformResolver(transforms)
+    assert len(resolver) == len(transforms)
+    xy = np.array([[0., 0.], [100., 0.], [50., 2000.]])
+    for ts in tilespecs:
+        assert np.allclose(
+            renderapi.transform.estimate_dstpts(ts.tforms, xy, resolver),
+            renderapi.transform.estimate_dstpts(ts.tforms, xy, transforms))
+        assert np.allclose(
+            ts.bbox_transformed(reference_tforms=resolver),
+            ts.bbox_transformed(reference_tforms=transforms))
+
+    # chains of references are flattened and memoized
+    affine = renderapi.transform.AffineModel(B0=5., transformId='affine')
+    poly = renderapi.transform.Polynomial2DTransform(
+        params=np.array([[1., 1., 0.], [2., 0., 1.]]), transformId='poly')
+    chain = renderapi.transform.TransformList(
+        [renderapi.transform.ReferenceTransform(refId='affine'), poly],
+        transformId='chain')
+    resolver = renderapi.transform.TransformResolver.from_resolvedtiles(
+        renderapi.resolvedtiles.ResolvedTiles(
+            transformList=[chain, affine, poly]))
+    ref = renderapi.transform.ReferenceTransform(refId='chain')
+    assert resolver.resolve('chain') == [affine, poly]
+    assert resolver.flatten([affine, [ref], ref]) == [
+        affine, affine, poly, affine, poly]
+    assert resolver.resolve('chain')[0] is resolver.resolve('chain')[0]
+    assert np.allclose(
+        renderapi.transform.estimate_dstpts([ref], xy, resolver),
+        poly.tform(affine.tform(xy)))
+
+    with pytest.raises(renderapi.errors.RenderError):
+        resolver.resolve('missing')
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.transform.TransformResolver().flatten([ref])
+    cycle = renderapi.transform.TransformResolver([
+        renderapi.transform.TransformList(
+            [renderapi.transform.ReferenceTransform(refId='b')],
+            transformId='a'),
+        renderapi.transform.TransformList(
+            [affine, renderapi.transform.ReferenceTransform(refId='a')],
+            transformId='b')])
+    with pytest.raises(renderapi.errors.RenderError, match='cycle'):
+        cycle.resolve('a')
+
+
+def test_compile_transforms(referenced_tilespecs_and_transforms):
+    tilespecs, transforms = referenced_tilespecs_and_transforms
+    poly = renderapi.transform.Polynomial2DTransform(
+        params=np.array([[10., 1., 0.01, 1e-5, 0., 0.],
+                         [-5., 0., 1.02, 0., 1e-5, 0.]]))
+    tforms = [renderapi.transform.TranslationModel(B0=3., B1=-2.),
+              renderapi.transform.RigidModel(B0=10., M00=np.cos(0.1),
+                                             M01=-np.sin(0.1),
+                                             M10=np.sin(0.1),
+                                             M11=np.cos(0.1)),
+              poly,
+              [renderapi.transform.SimilarityModel(M00=2., M11=2.),
+               renderapi.transform.TransformList(
+                   [renderapi.transform.AffineModel(M01=0.1, B1=7.)])],
+              renderapi.transform.AffineModel(M10=-0.2)]
+    xy = np.random.RandomState(0).uniform(0, 2000, size=(100, 2))
+    compiled = renderapi.transform.compile_transforms(tforms)
+    assert len(compiled) == 3
+    assert compiled.tforms[1] is poly
+    expected = renderapi.transform.estimate_dstpts(tforms, xy)
+    assert np.allclose(compiled.tform(xy), expected)
+    out = np.empty_like(xy)
+    assert compiled(xy, out=out) is out
+    assert np.allclose(out, expected)
+    inplace = xy.copy()
+    compiled.tform(inplace, out=inplace)
+    assert np.allclose(inplace, expected)
+    assert np.allclose(
+        renderapi.transform.TransformList(tforms).compile().tform(xy),
+        expected)
+    assert np.array_equal(
+        renderapi.transform.compile_transforms([]).tform(xy), xy)
+    with pytest.raises(renderapi.errors.ConversionError):
+        compiled.tform(xy.T)
+    with pytest.raises(renderapi.errors.ConversionError):
+        compiled.tform(xy, out=np.empty((100, 2), dtype=np.float32))
+
+    for ts in tilespecs:
+        compiled = renderapi.transform.compile_transforms(
+            ts.tforms, transforms)
+        assert np.allclose(compiled.tform(xy),
+                           renderapi.transform.estimate_dstpts(
+                               ts.tforms, xy, transforms))
+
+
+@pytest.mark.parametrize('ndiv_inner', [0, 2])
+def test_bbox_transformed_batch(referenced_tilespecs_and_transforms,
+                                ndiv_inner):
+    tilespecs, transforms = referenced_tilespecs_and_transforms
+    poly = renderapi.transform.Polynomial2DTransform(
+        params=np.array([[10., 1., 0.01, 1e-5, 0., 0.],
+                         [-5., 0., 1.02, 0., 1e-5, 0.]]))
+    tilespecs = list(tilespecs) + [
+        renderapi.tilespec.TileSpec(
+            tileId='poly', width=100, height=200,
+            tforms=[poly, [renderapi.transform.AffineModel(B0=3.)]]),
+        renderapi.tilespec.TileSpec(tileId='none', width=100, height=50)]
+    polygons, bounds = renderapi.tilespec.bbox_transformed_batch(
+        tilespecs, ndiv_inner=ndiv_inner, reference_tforms=transforms)
+    assert polygons.shape == (len(tilespecs), 4 * 2 ** ndiv_inner + 1, 2)
+    for ts, polygon, bound in zip(tilespecs, polygons, bounds):
+        xy = ts.bbox_transformed(ndiv_inner=ndiv_inner,
+                                 reference_tforms=transforms)
+        assert np.allclose(polygon, xy)
+        assert np.allclose(bound, np.concatenate([xy.min(0), xy.max(0)]))
+
+    polygons, bounds = renderapi.tilespec.bbox_transformed_batch(
+        tilespecs, tf_limit=1, reference_tforms=transforms)
+    assert np.allclose(polygons[-2], tilespecs[-2].bbox_transformed(
+        tf_limit=1))
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.tilespec.bbox_transformed_batch(tilespecs)
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.tilespec.bbox_transformed_batch(
+            tilespecs, reference_tforms=[transforms[2]])
+
+
 def test_fail_convert_points():
     points_in = np.array([[0, 0], [0, 1], [1, 0], [1, 1]], np.float)
     with pytest.raises(renderapi.errors.ConversionError):
@@ -820,7 +983,51 @@ def test_thinplatespline_inverse():
     with pytest.raises(renderapi.errors.EstimationError):
         src_inv_est = t.inverse_tform(
                 t.tform(src_pts),
-                max_iters=5)
+                max_iters=5,
+                method='gradient_descent')
+
+
+@pytest.mark.parametrize('initial', ['affine', 'grid'])
+def test_thinplatespline_newton_inverse(initial):
+    j = json.load(open(rendersettings.TEST_THINPLATESPLINE_FILE, 'r'))
+    t = renderapi.transform.ThinPlateSplineTransform(
+            dataString=j['dataString'])
+    theta = 0.3
+    t.aMtx = 1.1 * np.array([[np.cos(theta), -np.sin(theta)],
+                             [np.sin(theta), np.cos(theta)]]) - np.eye(2)
+    t.bVec = np.array([100., -50.])
+
+    # analytic against numerical derivatives, including at landmarks
+    rng = np.random.RandomState(6)
+    pts = np.vstack([rng.uniform(0, 3840, size=(100, 2)), t.srcPts.T[:5]])
+    h = 1e-3
+    numerical = np.stack([
+        (t.tform(pts + [h, 0]) - t.tform(pts - [h, 0])) / (2 * h),
+        (t.tform(pts + [0, h]) - t.tform(pts - [0, h])) / (2 * h)], axis=-1)
+    values, jacobian = t.tform_and_jacobian(pts, memory_budget=1)
+    assert np.allclose(values, t.tform(pts))
+    assert np.allclose(jacobian, numerical, rtol=1e-5,
+                       atol=1e-5 * np.abs(numerical).max())
+    assert np.allclose(t.jacobian(pts), jacobian)
+
+    inverse = t.inverse_tform(t.tform(pts), initial=initial)
+    assert np.allclose(inverse, pts, rtol=0, atol=1e-6)
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.inverse_tform(t.tform(pts), initial=initial, max_iters=0)
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.inverse_tform(pts, method='bisection')
+
+    # a fold has no inverse for some points, which must not be
+    #   reported as converged
+    x = np.linspace(0, 1000, 5)
+    src = np.stack(np.meshgrid(x, x), axis=-1).reshape(-1, 2)
+    dst = np.copy(src)
+    dst[12] += [600, 0]
+    t = renderapi.transform.ThinPlateSplineTransform()
+    t.estimate(src, dst)
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.inverse_tform(rng.uniform(0, 1000, size=(20000, 2)),
+                        initial=initial)
 
 
 def test_thinplatespline():
@@ -920,6 +1127,66 @@ def test_thinplatespline_estimate():
     thinplate_estimate_nojson(computeAffine=False)
 
 
+@pytest.mark.parametrize('order', [1, 3])
+def test_approximate_transform(order):
+    rng = np.random.RandomState(5)
+    src = rng.uniform(0, 1000, size=(20, 2))
+    tps = renderapi.transform.ThinPlateSplineTransform()
+    tps.estimate(src, src * 1.01 + rng.normal(0, 2, size=src.shape))
+    lens = renderapi.transform.NonLinearCoordinateTransform()
+    lens.dimension, lens.length, lens.width, lens.height = 3, 10, 1000, 800
+    grid = tps.src_array(0, 0, 1000, 800, 20, 20)
+    lens.estimate(grid, grid + 1e-6 * (grid - 500) ** 2,
+                  return_params=False)
+    poly = renderapi.transform.Polynomial2DTransform(params=np.array(
+        [[10., 1., 0.01, 1e-6, 2e-6, 0.], [-5., 0., 1.02, 0., 1e-6, 3e-6]]))
+    for tform, approx in [
+            (tps, tps.approximate(spacing=50, order=order)),
+            (lens, lens.approximate(spacing=128, order=order)),
+            (poly, poly.approximate((0, 0, 2000, 1000), order=order))]:
+        xmin, ymin, xmax, ymax = approx.bounds
+        inside = np.column_stack([rng.uniform(xmin, xmax, 1000),
+                                  rng.uniform(ymin, ymax, 1000)])
+        error = np.linalg.norm(approx.tform(inside) - tform.tform(inside),
+                               axis=1)
+        assert error.max() < 2 * approx.max_error
+        # exact outside of bounds
+        outside = inside + [xmax - xmin + 1, 0]
+        assert np.allclose(approx.tform(outside), tform.tform(outside))
+        # in place
+        points = np.vstack([inside, outside])
+        expected = approx.tform(points)
+        assert approx.tform(points, out=points) is points
+        assert np.array_equal(points, expected)
+
+    refined = tps.approximate(spacing=400, order=order, tolerance=0.01)
+    assert refined.max_error <= 0.01
+    assert max(refined.spacing) < 400
+    with pytest.raises(renderapi.errors.EstimationError):
+        tps.approximate(spacing=400, order=order, tolerance=1e-12)
+    with pytest.raises(renderapi.errors.EstimationError):
+        poly.approximate((0, 0, 0, 1000), order=order)
+
+
+@pytest.mark.parametrize('memory_budget,threads', [
+    (None, 1), (1, 1), (16 * 37 * 40, 2), (16 * 37 * 40, 3)])
+def test_thinplatespline_chunked_kernel(memory_budget, threads):
+    rng = np.random.RandomState(4)
+    src = rng.uniform(0, 1000, size=(37, 2))
+    tf = renderapi.transform.ThinPlateSplineTransform()
+    tf.estimate(src, src + rng.normal(0, 5, size=src.shape))
+    # including points on landmarks, where the kernel is 0
+    points = np.vstack([rng.uniform(-100, 1100, size=(500, 2)), src])
+    r2 = cdist(points, src, metric='sqeuclidean')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        U = np.where(r2 > 0, r2 * np.log(np.sqrt(r2)), 0.)
+    expected = (points + U.dot(tf.dMtxDat.T) + points.dot(tf.aMtx.T) +
+                tf.bVec)
+    result = tf.tform(points, memory_budget=memory_budget, threads=threads)
+    assert np.allclose(result, expected, rtol=0, atol=1e-8)
+    assert np.allclose(tf.tform(src), tf.tform(src, threads=threads))
+
+
 def thinplate_estimate_nojson(computeAffine=True):
     # an estimate test that does not depend on pre-computed json
     x = np.linspace(0, 1000, 40)
@@ -953,6 +1220,44 @@ def thinplate_estimate_nojson(computeAffine=True):
     assert delta.max() < 1.0
 
 
+@pytest.mark.parametrize('computeAffine', [True, False])
+def test_thinplatespline_estimate_decimated(computeAffine):
+    rng = np.random.RandomState(7)
+    src = rng.uniform(0, 4000, size=(5000, 2))
+    k = 2 * np.pi / 4000
+
+    def warp(p):
+        return p * 1.01 + 20 * np.column_stack([
+            np.sin(k * p[:, 1]), np.cos(1.5 * k * p[:, 0])])
+
+    tol = 0.1
+    t = renderapi.transform.ThinPlateSplineTransform()
+    landmarks = t.estimate_decimated(
+        src, warp(src), computeAffine=computeAffine, tol=tol)
+    assert len(landmarks) == len(np.unique(landmarks)) == t.nLm < 1000
+    assert np.array_equal(t.srcPts.T, src[landmarks])
+    assert np.linalg.norm(t.tform(src) - warp(src), axis=1).max() <= tol
+    assert (t.aMtx is not None) == computeAffine
+
+    # an ordinary transform
+    t2 = renderapi.transform.ThinPlateSplineTransform(
+        dataString=t.dataString)
+    assert np.allclose(t2.tform(src), t.tform(src))
+
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.estimate_decimated(src, warp(src), tol=tol, max_landmarks=100)
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.estimate_decimated(src, warp(src), tol=tol, max_iter=1)
+    # inconsistent matches of the same source point
+    with pytest.raises(renderapi.errors.EstimationError) as e:
+        t.estimate_decimated(np.vstack([src, src[:1]]),
+                             np.vstack([warp(src), warp(src[:1]) + 5]),
+                             tol=tol)
+    assert 'coinciding' in str(e.value)
+    with pytest.raises(renderapi.errors.EstimationError):
+        t.estimate_decimated(src, warp(src)[1:])
+
+
 def test_encode64():
     # case for Stephan's '@' character
     s = '@QAkh+fAbhm6/8AAAAAAAAA=='
@@ -1083,3 +1388,68 @@ def test_scale_thinplate(factor, computeAffine, preserve_srcPts, ngrid):
         # check that the original srcPts have a close neighbor still
         # in the scaled srcPts
         assert np.all(np.any(dist < 1e-3, axis=1))
+
+
+def leaf_transforms():
+    rng = np.random.RandomState(3)
+    src = rng.uniform(0, 2000, size=(40, 2))
+    tps = renderapi.transform.ThinPlateSplineTransform()
+    tps.estimate(src, src + rng.normal(scale=5., size=src.shape))
+    return [
+        renderapi.transform.AffineModel(M00=1.1, M01=0.2, M10=-0.1,
+                                        B0=5., B1=-3.),
+        renderapi.transform.Polynomial2DTransform(
+            params=np.array([[10., 1., 0.01, 1e-5, 2e-6, 3e-7],
+                             [-5., 0., 1.02, 1e-6, 1e-5, 0.]])),
+        renderapi.transform.NonLinearCoordinateTransform(
+            dataString=rendersettings.NONLINEAR_TRANSFORM_KWARGS[
+                'dataString']),
+        tps]
+
+
+@pytest.mark.parametrize('tform', leaf_transforms())
+def test_leaf_tform_out(tform):
+    rng = np.random.RandomState(4)
+    xy = rng.uniform(0, 2000, size=(1000, 2))
+    expected = tform.tform(xy)
+
+    out = np.empty_like(xy)
+    assert tform.tform(xy, out=out) is out
+    assert np.array_equal(out, expected)
+
+    inplace = xy.copy()
+    assert tform.tform(inplace, out=inplace) is inplace
+    assert np.array_equal(inplace, expected)
+
+    single = tform.tform(xy, dtype=np.float32)
+    assert single.dtype == np.float32
+    assert np.allclose(single, expected, rtol=1e-6)
+
+    with pytest.raises(renderapi.errors.ConversionError):
+        tform.tform(xy, out=np.empty((10, 2)))
+    with pytest.raises(renderapi.errors.ConversionError):
+        tform.tform(xy, out=out, dtype=np.float32)
+    with pytest.raises(renderapi.errors.ConversionError):
+        tform.tform(xy[:, :1])
+
+    # out is used by compiled chains
+    compiled = renderapi.transform.compile_transforms(
+        [renderapi.transform.TranslationModel(B0=1.), tform])
+    assert np.allclose(compiled.tform(xy), tform.tform(xy + [1., 0.]))
+
+
+@pytest.mark.parametrize('order', [0, 1, 2, 3, 5])
+def test_polynomial_monomial_basis(order):
+    from renderapi.transform.leaf.polynomial_models import (
+        monomial_basis, POLYNOMIAL_CHUNK_SIZE)
+    rng = np.random.RandomState(order)
+    xy = rng.uniform(0, 100, size=(POLYNOMIAL_CHUNK_SIZE + 10, 2))
+    x, y = xy[:, 0], xy[:, 1]
+    expected = [x ** (j - i) * y ** i
+                for j in range(order + 1) for i in range(j + 1)]
+    assert np.allclose(monomial_basis(x, y, order), expected)
+
+    params = rng.normal(size=(2, len(expected))) * 1e-3
+    tform = renderapi.transform.Polynomial2DTransform(params=params)
+    assert tform.order == order
+    assert np.allclose(tform.tform(xy), np.dot(params, expected).T)
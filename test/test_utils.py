@@ -1,4 +1,6 @@
+import gzip
 import importlib
+import io
 import json
 import renderapi
 import pytest
@@ -28,12 +30,19 @@ def test_json_load(use_ujson):
                 raise ImportError
             return realimport(name, globals, locals, fromlist, level)
         builtins.__import__ = noujson_import
-    cross_py23_reload(renderapi.utils)
-    assert (renderapi.utils.requests_json is ujson
-            if use_ujson else renderapi.utils.requests_json is json)
-    assert (
-        renderapi.utils.requests.models.complexjson is ujson
-        if use_ujson else renderapi.utils.requests.models.complexjson is json)
+    try:
+        cross_py23_reload(renderapi.utils)
+        assert (renderapi.utils.requests_json is ujson
+                if use_ujson else renderapi.utils.requests_json is json)
+        assert (
+            renderapi.utils.requests.models.complexjson is ujson
+            if use_ujson else
+            renderapi.utils.requests.models.complexjson is json)
+    finally:
+        if not use_ujson:
+            # later tests use the ujson backend
+            builtins.__import__ = realimport
+            cross_py23_reload(renderapi.utils)
 
 
 def test_jbool():
@@ -54,3 +63,228 @@ def test_renderdumps_simple():
 def test_renderdumps_fails():
     with pytest.raises(AttributeError):
         renderapi.utils.renderdumps(np.zeros(3))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_iter_concurrent(ordered):
+    items = list(range(20))
+    results = list(renderapi.utils.iter_concurrent(
+        lambda x: x ** 2, items, max_workers=4, ordered=ordered))
+    if ordered:
+        assert [i for i, r in results] == items
+    assert sorted(results) == [(i, i ** 2) for i in items]
+
+
+def test_iter_concurrent_backpressure():
+    submitted = []
+
+    def items():
+        for i in range(100):
+            submitted.append(i)
+            yield i
+    it = renderapi.utils.iter_concurrent(
+        lambda x: x, items(), max_workers=2, max_pending=3)
+    assert next(it) == (0, 0)
+    assert len(submitted) == 3
+    it.close()
+    assert len(submitted) == 3
+
+    with pytest.raises(ValueError):
+        next(renderapi.utils.iter_concurrent(
+            lambda x: x, items(), max_pending=0))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 1 << 20])
+def test_iter_json_array(chunk_size):
+    d = [{'tileId': u'tile\xe9\u2713{}'.format(i), 'z': i * 1.5,
+          'values': list(range(i)), 'n': 12345678901 * i}
+         for i in range(25)] + [123456, 'x', [], None]
+    b = json.dumps(d, ensure_ascii=False).encode('utf-8')
+    chunks = (b[i:i + chunk_size] for i in range(0, len(b), chunk_size))
+    assert list(renderapi.utils.iter_json_array(chunks)) == d
+
+
+@pytest.mark.parametrize("chunks,expected", [
+    ([b'[1.', b'5, 2]'], [1.5, 2]),
+    ([b'[2.5e', b'3]'], [2500.]),
+    ([b'[2.5E', b'-', b'3, -', b'1]'], [0.0025, -1]),
+    ([b'[1', b'2', b'.', b'0', b'e', b'+1', b'] '], [120.])])
+def test_iter_json_array_split_numbers(chunks, expected):
+    assert list(renderapi.utils.iter_json_array(chunks)) == expected
+
+
+@pytest.mark.parametrize("s", ['[1,2', '{"a": 1}', '[1 2]', '[1,]', ''])
+def test_iter_json_array_fails(s):
+    with pytest.raises(renderapi.errors.RenderError):
+        list(renderapi.utils.iter_json_array([s]))
+
+
+@pytest.mark.parametrize("backend", renderapi.utils.JSON_BACKENDS)
+def test_json_backend(backend):
+    if backend not in renderapi.utils.available_json_backends():
+        pytest.skip('{} is not installed'.format(backend))
+    d = {'a': np.arange(3), 'b': np.float32(1.5), 'c': np.int64(3),
+         'd': np.arange(6).reshape(2, 3)[:, ::2], 'e': u'\xe9/\u2713'}
+    expected = {'a': [0, 1, 2], 'b': 1.5, 'c': 3,
+                'd': [[0, 2], [3, 5]], 'e': u'\xe9/\u2713'}
+    old_backend = renderapi.utils.get_json_backend()
+    try:
+        renderapi.utils.set_json_backend(backend)
+        assert renderapi.utils.get_json_backend() == backend
+        s = renderapi.utils.json_dumps(d)
+        assert isinstance(s, bytes)
+        assert json.loads(s.decode('utf-8')) == expected
+        assert renderapi.utils.json_loads(s) == expected
+    finally:
+        renderapi.utils.set_json_backend(old_backend)
+
+
+@pytest.mark.parametrize("backend", renderapi.utils.JSON_BACKENDS)
+@pytest.mark.parametrize("d", [
+    [1., float('nan')], {'a': {'b': [float('inf')]}, 'c': None},
+    np.array([0., -np.inf]), np.array([[np.nan, 1.], [2., 3.]])[:, ::2],
+    np.float32('nan'), renderapi.tilespec.TileSpec(minint=float('nan'))])
+def test_json_backend_nonfinite(backend, d):
+    if backend not in renderapi.utils.available_json_backends():
+        pytest.skip('{} is not installed'.format(backend))
+    old_backend = renderapi.utils.get_json_backend()
+    try:
+        renderapi.utils.set_json_backend(backend)
+        with pytest.raises(ValueError):
+            renderapi.utils.json_dumps(d)
+        assert json.loads(renderapi.utils.json_dumps(
+            [None, 1.5]).decode('utf-8')) == [None, 1.5]
+    finally:
+        renderapi.utils.set_json_backend(old_backend)
+
+
+def test_json_backend_fails():
+    with pytest.raises(ValueError):
+        renderapi.utils.set_json_backend('notabackend')
+
+
+def gunzip(b):
+    # gzip.decompress requires python 3.2
+    return gzip.GzipFile(fileobj=io.BytesIO(b)).read()
+
+
+@pytest.mark.parametrize("block_size", [7, 1000, 1 << 20])
+def test_gzip_compress(block_size):
+    data = json.dumps([{'tileId': 'tile{}'.format(i), 'z': i * 1.5}
+                       for i in range(1000)]).encode('utf-8')
+    compressed = renderapi.utils.gzip_compress(data, block_size=block_size)
+    assert gunzip(compressed) == data
+    assert gunzip(renderapi.utils.gzip_compress(b'')) == b''
+
+
+class FakePutResponse(object):
+    status_code = 200
+
+
+class FakePutSession(object):
+    compress_threshold = 100
+    compress_level = 6
+
+    def put(self, url, data=None, params=None, headers=None):
+        self.data = data
+        self.headers = headers
+        return FakePutResponse()
+
+
+def test_put_json_compressed():
+    session = FakePutSession()
+    renderapi.utils.put_json(session, 'http://renderhost', {'a': 1})
+    assert 'Content-Encoding' not in session.headers
+    assert json.loads(session.data.decode('utf-8')) == {'a': 1}
+
+    d = {'values': list(range(100))}
+    renderapi.utils.put_json(session, 'http://renderhost', d)
+    assert session.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gunzip(session.data).decode('utf-8')) == d
+
+
+@pytest.mark.parametrize('url,template', [
+    ('http://renderhost:8080/render-ws/v1/owner/o/project/p/stack/s/'
+     'z/1.000000/tile-specs?a=b',
+     '/render-ws/v1/owner/{owner}/project/{project}/stack/{stack}/'
+     'z/{z}/tile-specs'),
+    ('http://renderhost/render-ws/v1/owner/o/matchCollection/c/'
+     'group/1.0/matchesOutsideGroup',
+     '/render-ws/v1/owner/{owner}/matchCollection/{matchCollection}/'
+     'group/{group}/matchesOutsideGroup'),
+    ('http://renderhost/render-ws/v1/owner/o/project/p/stack/s/'
+     'z/2/box/0,0,10,10,0.5/png-image',
+     '/render-ws/v1/owner/{owner}/project/{project}/stack/{stack}/'
+     'z/{z}/box/{box}/png-image')])
+def test_endpoint_template(url, template):
+    assert renderapi.utils.endpoint_template(url) == template
+
+
+class FakeGetResponse(object):
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.text = content.decode('utf-8')
+        self.status_code = status_code
+
+
+class FakeGetSession(object):
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.call_hooks = []
+
+    def get(self, url, params=None, stream=False):
+        return FakeGetResponse(url, self.content, self.status_code)
+
+
+def test_call_hooks_metrics(tmpdir):
+    records = []
+    metrics = renderapi.metrics.CallMetrics()
+    session = FakeGetSession(b'[1, 2, 3]')
+    session.call_hooks.extend([records.append, metrics])
+    url = 'http://renderhost/render-ws/v1/owner/o/project/p/stack/{}/zValues'
+    for stack in ['a', 'b']:
+        assert renderapi.utils.get_json(session, url.format(stack)) == [
+            1, 2, 3]
+    session.status_code = 500
+    with pytest.raises(renderapi.errors.RenderError):
+        renderapi.utils.get_json(session, url.format('c'))
+
+    assert len(records) == 3
+    assert records[0]['method'] == 'GET'
+    assert records[0]['bytes_received'] == len(session.content)
+    assert records[0]['decode_time'] >= 0
+    assert records[2]['status'] == 500
+
+    summary = metrics.to_dict()
+    assert len(summary) == 1
+    assert summary[0]['endpoint'] == renderapi.utils.endpoint_template(
+        url.format('a'))
+    assert summary[0]['count'] == 3
+    assert summary[0]['statuses'] == {'200': 2, '500': 1}
+    assert sum(summary[0]['duration']['counts']) == 3
+
+    outfile = str(tmpdir.join('metrics.json'))
+    metrics.export_json(outfile)
+    with open(outfile, 'r') as f:
+        assert json.load(f) == json.loads(json.dumps(summary))
+
+
+def test_call_hook_failure_ignored():
+    def failing_hook(record):
+        raise ValueError(record)
+    session = FakeGetSession(b'{}')
+    session.call_hooks.append(failing_hook)
+    assert renderapi.utils.get_json(session, 'http://renderhost/') == {}
+
+
+def test_histogram():
+    h = renderapi.metrics.Histogram(bounds=[1, 2, 4])
+    for v in [0.5, 1.5, 1.5, 3, 10]:
+        h.add(v)
+    assert h.counts == [1, 2, 1, 1]
+    assert h.quantile(0.5) == 2
+    assert h.quantile(1) == 10
+    assert h.mean == pytest.approx(3.3)
+    assert len(h.format()) == 4